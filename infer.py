@@ -24,10 +24,15 @@ including: individual images, a folder of images, a video, or a webcam stream.
 # =============================================================================
 
 
+import queue
 import sys
+import threading
+import time
 from argparse import ArgumentParser, Namespace
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import cv2 as cv
 import numpy as np
@@ -38,6 +43,11 @@ from ptlflow import get_model, get_model_reference
 from ptlflow.models.base_model.base_model import BaseModel
 from ptlflow.utils.flow_utils import flow_to_rgb, flow_write, flow_read
 from ptlflow.utils.io_adapter import IOAdapter
+from ptlflow.utils.tiling import (
+    TiledInference,
+    add_tiling_args_to_parser,
+    get_tiled_inference,
+)
 from ptlflow.utils.utils import get_list_of_available_models_list, tensor_dict_to_numpy
 
 
@@ -123,6 +133,36 @@ def _init_parser() -> ArgumentParser:
     parser.add_argument(
         "--fp16", action="store_true", help="If set, use half floating point precision."
     )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=1,
+        help=(
+            "Number of consecutive image pairs forwarded together in one batch. Pairs are never formed across different "
+            "folders, and each pair is still estimated independently of the others."
+        ),
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help=(
+            "If set, the frames are decoded by a background thread and the outputs are written by a pool of writer threads, "
+            "so that the model does not wait for disk I/O. The throughput of each stage is printed at the end."
+        ),
+    )
+    parser.add_argument(
+        "--prefetch_size",
+        type=int,
+        default=4,
+        help="Only used with --pipeline. Maximum number of frames waiting to be forwarded or written.",
+    )
+    parser.add_argument(
+        "--num_writers",
+        type=int,
+        default=2,
+        help="Only used with --pipeline. Number of threads used for writing the outputs.",
+    )
+    parser = add_tiling_args_to_parser(parser)
     return parser
 
 
@@ -170,7 +210,19 @@ def infer(args: Namespace, model: BaseModel) -> None:
             fp16=args.fp16,
         )
 
+    # The tiles are forwarded through the same interface as the model
+    tiled_inference = get_tiled_inference(model, args)
+    if tiled_inference is not None:
+        model = tiled_inference
+
+    if args.pipeline:
+        _infer_pipeline(
+            args, model, io_adapter, cap, img_paths, num_imgs, prev_img, flow_gt
+        )
+        return
+
     prev_dir_name = None
+    pairs = []
     for i in tqdm(range(1, num_imgs)):
         img, img_dir_name, img_name, is_img_valid = _read_image(cap, img_paths, i)
         if prev_dir_name is None:
@@ -180,51 +232,322 @@ def infer(args: Namespace, model: BaseModel) -> None:
             break
 
         if img_dir_name == prev_dir_name:
-            inputs = io_adapter.prepare_inputs([prev_img, img])
-            preds = model(inputs)
+            pairs.append((prev_img, img, img_name, img_dir_name))
+        if len(pairs) > 0 and (
+            len(pairs) >= args.batch_size or img_dir_name != prev_dir_name
+        ):
+            key = _forward_pairs(args, model, io_adapter, pairs, flow_gt)
+            pairs = []
+            if key == 27:
+                break
+        prev_dir_name = img_dir_name
+        prev_img = img
 
-            preds["images"] = inputs["images"]
-            preds = io_adapter.unscale(preds)
-            preds_npy = tensor_dict_to_numpy(preds)
+    if len(pairs) > 0:
+        _forward_pairs(args, model, io_adapter, pairs, flow_gt)
 
-            if flow_gt is not None:
-                flow_pred = preds_npy["flows"]
-                valid = ~np.isnan(flow_gt[..., 0])
 
-                sq_dist = np.power(flow_pred - flow_gt, 2).sum(2)
-                epe = np.sqrt(sq_dist[valid])
+def _forward_batch(
+    model: Union[BaseModel, TiledInference],
+    io_adapter: IOAdapter,
+    images: torch.Tensor,
+) -> List[Dict[str, np.ndarray]]:
+    """Forward a batch of image pairs and split the predictions of each pair.
+
+    Parameters
+    ----------
+    model : Union[BaseModel, TiledInference]
+        The model to be used for inference, or a TiledInference wrapping it.
+    io_adapter : IOAdapter
+        The adapter used to prepare the inputs and to unscale the outputs.
+    images : torch.Tensor
+        A uint8 tensor with shape [B, 2, 3, H, W] containing the BGR image pairs.
+
+    Returns
+    -------
+    List[Dict[str, np.ndarray]]
+        The predictions of each pair, converted to numpy by tensor_dict_to_numpy().
+    """
+    inputs = io_adapter.prepare_inputs(inputs={"images": images.float() / 255.0})
+    preds = model(inputs)
+
+    preds["images"] = inputs["images"]
+    preds = io_adapter.unscale(preds)
+
+    batch_size = images.shape[0]
+    preds_list = []
+    for b in range(batch_size):
+        preds_b = {
+            k: v[b : b + 1]
+            if isinstance(v, torch.Tensor) and v.shape[0] == batch_size
+            else v
+            for k, v in preds.items()
+        }
+        preds_list.append(tensor_dict_to_numpy(preds_b))
+    return preds_list
+
+
+def _forward_pairs(
+    args: Namespace,
+    model: Union[BaseModel, TiledInference],
+    io_adapter: IOAdapter,
+    pairs: List[Tuple[np.ndarray, np.ndarray, str, Optional[str]]],
+    flow_gt: Optional[np.ndarray],
+) -> int:
+    images = np.stack([np.stack(p[:2]) for p in pairs])
+    images = torch.from_numpy(images).permute(0, 1, 4, 2, 3)
+    preds_list = _forward_batch(model, io_adapter, images)
+
+    key = -1
+    for (img1, img2, img_name, img_dir_name), preds_npy in zip(pairs, preds_list):
+        if flow_gt is not None:
+            _print_gt_metrics(preds_npy["flows"], flow_gt)
+
+        _add_flow_visualizations(preds_npy)
+        if args.write_outputs:
+            write_outputs(
+                preds_npy,
+                args.output_path,
+                img_name,
+                args.flow_format,
+                img_dir_name,
+            )
+        if args.show:
+            key = _show_pair(args, img1, img2, preds_npy)
+            if key == 27:
+                break
+    return key
+
+
+def _infer_pipeline(
+    args: Namespace,
+    model: Union[BaseModel, TiledInference],
+    io_adapter: IOAdapter,
+    cap: cv.VideoCapture,
+    img_paths: List[Path],
+    num_imgs: int,
+    prev_img: np.ndarray,
+    flow_gt: Optional[np.ndarray],
+) -> None:
+    """Perform the inference with decoding, forwarding, and writing running concurrently.
+
+    A background thread decodes the frames into (pinned) tensors and keeps up to args.prefetch_size frames in a queue.
+    Each frame is transferred to the model device only once and reused as the first image of the next pair. The outputs
+    are visualized and written by a pool of args.num_writers threads. The decoding thread is always stopped and joined
+    before returning, also when one of the stages raises an exception.
+    """
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    pin_memory = device == "cuda"
+    stats = {name: _StageStats(name) for name in ["decode", "model", "write"]}
+
+    frame_queue = queue.Queue(maxsize=max(1, args.prefetch_size))
+    stop_event = threading.Event()
 
-                gt_sq_dist = np.power(flow_gt, 2).sum(2)
-                gt_dist_valid = np.sqrt(gt_sq_dist[valid])
-                outlier = (epe > 3) & (epe > 0.05 * gt_dist_valid)
-                print(
-                    f"EPE: {epe.mean():.03f}, Outlier: {100*outlier.mean():.03f}",
+    decode_errors = []
+
+    def _put(item: Optional[Tuple[Any, ...]]) -> bool:
+        # Wait for space in the queue, but give up if the pipeline is stopped
+        while not stop_event.is_set():
+            try:
+                frame_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _decode() -> None:
+        try:
+            for i in range(1, num_imgs):
+                if stop_event.is_set():
+                    return
+                start = time.perf_counter()
+                img, img_dir_name, img_name, is_img_valid = _read_image(
+                    cap, img_paths, i
                 )
+                img_tensor = _image_to_tensor(img, pin_memory) if is_img_valid else None
+                stats["decode"].add(time.perf_counter() - start)
+                if not _put((img, img_tensor, img_dir_name, img_name, is_img_valid)):
+                    return
+                if not is_img_valid:
+                    break
+        except Exception as e:  # noqa: B902
+            decode_errors.append(e)
+        finally:
+            _put(None)
+
+    decode_thread = threading.Thread(target=_decode, name="infer-decode", daemon=True)
+    decode_thread.start()
+
+    writer_pool = ThreadPoolExecutor(max_workers=max(1, args.num_writers))
+    pending_writes = deque()
+
+    def _flush(pairs: List[Tuple[Any, ...]]) -> int:
+        start = time.perf_counter()
+        images = torch.stack([torch.stack(p[:2]) for p in pairs])
+        preds_list = _forward_batch(model, io_adapter, images)
+        stats["model"].add(time.perf_counter() - start, len(pairs))
+
+        key = -1
+        for (_, _, img1, img2, img_name, img_dir_name), preds_npy in zip(
+            pairs, preds_list
+        ):
+            if flow_gt is not None:
+                _print_gt_metrics(preds_npy["flows"], flow_gt)
 
-            preds_npy["flows_viz"] = flow_to_rgb(preds_npy["flows"])[:, :, ::-1]
-            if preds_npy.get("flows_b") is not None:
-                preds_npy["flows_b_viz"] = flow_to_rgb(preds_npy["flows_b"])[:, :, ::-1]
+            if args.show:
+                _add_flow_visualizations(preds_npy)
+
+            # The pair is written before it is shown, as in _forward_pairs(), so it is also saved when ESC is pressed
             if args.write_outputs:
-                write_outputs(
-                    preds_npy,
-                    args.output_path,
-                    img_name,
-                    args.flow_format,
-                    img_dir_name,
+                pending_writes.append(
+                    writer_pool.submit(
+                        _write_job, args, preds_npy, img_name, img_dir_name, stats
+                    )
                 )
+                while len(pending_writes) > max(1, args.prefetch_size):
+                    pending_writes.popleft().result()
+
             if args.show:
-                img1 = prev_img
-                img2 = img
-                if min(args.input_size) > 0:
-                    img1 = cv.resize(prev_img, args.input_size[::-1])
-                    img2 = cv.resize(img, args.input_size[::-1])
-                key = show_outputs(
-                    img1, img2, preds_npy, args.auto_forward, args.max_show_side
-                )
+                # show_outputs() adds the images to the dict, which must not be written by the concurrent write job
+                key = _show_pair(args, img1, img2, dict(preds_npy))
                 if key == 27:
                     break
-        prev_dir_name = img_dir_name
-        prev_img = img
+        return key
+
+    start_time = time.perf_counter()
+    try:
+        prev_tensor = _image_to_tensor(prev_img, pin_memory).to(
+            device, non_blocking=True
+        )
+        prev_dir_name = None
+        pairs = []
+        with tqdm(total=num_imgs - 1 if cap is None else None) as pbar:
+            while True:
+                item = frame_queue.get()
+                if item is None:
+                    if len(decode_errors) > 0:
+                        raise decode_errors[0]
+                    break
+                img, img_tensor, img_dir_name, img_name, is_img_valid = item
+                if prev_dir_name is None:
+                    prev_dir_name = img_dir_name
+
+                if not is_img_valid:
+                    break
+
+                img_tensor = img_tensor.to(device, non_blocking=True)
+                if img_dir_name == prev_dir_name:
+                    pairs.append(
+                        (
+                            prev_tensor,
+                            img_tensor,
+                            prev_img,
+                            img,
+                            img_name,
+                            img_dir_name,
+                        )
+                    )
+                if len(pairs) > 0 and (
+                    len(pairs) >= args.batch_size or img_dir_name != prev_dir_name
+                ):
+                    key = _flush(pairs)
+                    pairs = []
+                    if key == 27:
+                        break
+                prev_dir_name = img_dir_name
+                prev_img = img
+                prev_tensor = img_tensor
+                pbar.update(1)
+
+        if len(pairs) > 0:
+            _flush(pairs)
+        for future in pending_writes:
+            future.result()
+    finally:
+        # Stop the decoder, which may be waiting for space in the queue, even if one of the stages failed
+        stop_event.set()
+        decode_thread.join()
+        writer_pool.shutdown()
+
+    total_time = time.perf_counter() - start_time
+    print(f"Pipeline total: {total_time:.2f} s")
+    for stage_stats in stats.values():
+        print(stage_stats)
+
+
+class _StageStats(object):
+    """Thread-safe accumulator of the time spent by one stage of the pipeline."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.count = 0
+        self.busy_time = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, elapsed: float, count: int = 1) -> None:
+        with self.lock:
+            self.count += count
+            self.busy_time += elapsed
+
+    def __repr__(self) -> str:
+        fps = self.count / self.busy_time if self.busy_time > 0 else 0.0
+        return f"{self.name}: {self.count} frames, busy {self.busy_time:.2f} s, {fps:.1f} frames/s"
+
+
+def _image_to_tensor(img: np.ndarray, pin_memory: bool) -> torch.Tensor:
+    tensor = torch.from_numpy(np.ascontiguousarray(img.transpose(2, 0, 1)))
+    if pin_memory:
+        tensor = tensor.pin_memory()
+    return tensor
+
+
+def _write_job(
+    args: Namespace,
+    preds_npy: Dict[str, np.ndarray],
+    img_name: str,
+    img_dir_name: Optional[str],
+    stats: Dict[str, _StageStats],
+) -> None:
+    start = time.perf_counter()
+    if "flows_viz" not in preds_npy:
+        _add_flow_visualizations(preds_npy)
+    write_outputs(
+        preds_npy,
+        args.output_path,
+        img_name,
+        args.flow_format,
+        img_dir_name,
+    )
+    stats["write"].add(time.perf_counter() - start)
+
+
+def _add_flow_visualizations(preds_npy: Dict[str, np.ndarray]) -> None:
+    preds_npy["flows_viz"] = flow_to_rgb(preds_npy["flows"])[:, :, ::-1]
+    if preds_npy.get("flows_b") is not None:
+        preds_npy["flows_b_viz"] = flow_to_rgb(preds_npy["flows_b"])[:, :, ::-1]
+
+
+def _print_gt_metrics(flow_pred: np.ndarray, flow_gt: np.ndarray) -> None:
+    valid = ~np.isnan(flow_gt[..., 0])
+
+    sq_dist = np.power(flow_pred - flow_gt, 2).sum(2)
+    epe = np.sqrt(sq_dist[valid])
+
+    gt_sq_dist = np.power(flow_gt, 2).sum(2)
+    gt_dist_valid = np.sqrt(gt_sq_dist[valid])
+    outlier = (epe > 3) & (epe > 0.05 * gt_dist_valid)
+    print(
+        f"EPE: {epe.mean():.03f}, Outlier: {100*outlier.mean():.03f}",
+    )
+
+
+def _show_pair(
+    args: Namespace, img1: np.ndarray, img2: np.ndarray, preds_npy: Dict[str, np.ndarray]
+) -> int:
+    if min(args.input_size) > 0:
+        img1 = cv.resize(img1, args.input_size[::-1])
+        img2 = cv.resize(img2, args.input_size[::-1])
+    return show_outputs(img1, img2, preds_npy, args.auto_forward, args.max_show_side)
 
 
 def init_input(
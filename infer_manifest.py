@@ -0,0 +1,231 @@
+"""Run inference on multiple models, checkpoints, and input folders in a single process.
+
+The runs are described by a yaml manifest. Each model is built and its checkpoint is loaded only once, and then it is kept
+in memory while all of its input folders are processed. The (model, checkpoint, input) runs which are completed are
+recorded in a progress file inside the output folder, so an interrupted manifest can be resumed by running the same
+command again.
+
+Example of a manifest:
+
+.. code-block:: yaml
+
+    script: infer           # Optional. The script whose infer() function will be used, e.g., infer or infer_warpvis.
+    output_path: outputs/inference
+    args: [--write_outputs, --flow_format, flo, --fp16]  # Optional. Arguments shared by all the runs.
+    input_paths:            # Optional. Default inputs for the runs that do not specify their own.
+      - /path/to/clip1
+      - /path/to/clip2
+    runs:
+      - model: raft
+        checkpoints: [sintel, kitti]
+      - model: rapidflow
+        checkpoints: [sintel]
+        args: [--iters, "6"]      # Optional. Arguments only for this run.
+        input_paths:              # Optional. Overrides the default input_paths.
+          - /path/to/clip3
+"""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import importlib
+import logging
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+from typing import Any, Dict, Set, Tuple
+
+import torch
+import yaml
+
+from ptlflow import get_model, get_model_reference
+from ptlflow.utils.utils import config_logging
+
+config_logging()
+
+PROGRESS_FILE_NAME = "manifest_progress.txt"
+
+
+def _init_parser() -> ArgumentParser:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "manifest_path",
+        type=str,
+        help="Path to the yaml manifest describing the runs. See the documentation of this script for the format.",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="If set, the progress file is ignored and all the runs of the manifest are executed again.",
+    )
+    return parser
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Any]:
+    """Load a manifest file and fill the missing optional values.
+
+    Parameters
+    ----------
+    manifest_path : str
+        Path to the yaml manifest.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The manifest, where every run contains the keys "model", "checkpoints", "args", and "input_paths".
+    """
+    with open(manifest_path, "r") as f:
+        manifest = yaml.safe_load(f)
+    return fill_manifest_defaults(manifest)
+
+
+def fill_manifest_defaults(manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill the optional values of a manifest that were not provided.
+
+    Parameters
+    ----------
+    manifest : Dict[str, Any]
+        The manifest, following the same structure as the yaml file.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The manifest, where every run contains the keys "model", "checkpoints", "args", and "input_paths".
+
+    Raises
+    ------
+    ValueError
+        If the manifest does not contain any runs, or if one run does not have any input paths.
+    """
+    if manifest.get("runs") is None or len(manifest["runs"]) == 0:
+        raise ValueError("The manifest does not contain any runs.")
+
+    manifest["script"] = manifest.get("script", "infer")
+    manifest["output_path"] = manifest.get(
+        "output_path", str(Path("outputs/inference"))
+    )
+    manifest["args"] = [str(v) for v in manifest.get("args", [])]
+    default_input_paths = manifest.get("input_paths", [])
+    for run in manifest["runs"]:
+        checkpoints = run.get("checkpoints", [None])
+        if not isinstance(checkpoints, (list, tuple)):
+            checkpoints = [checkpoints]
+        run["checkpoints"] = checkpoints
+        run["args"] = [str(v) for v in run.get("args", [])]
+        run["input_paths"] = run.get("input_paths", default_input_paths)
+        if len(run["input_paths"]) == 0:
+            raise ValueError(f"No input_paths were given for model {run['model']}.")
+    return manifest
+
+
+def run_manifest(manifest: Dict[str, Any], restart: bool = False) -> None:
+    """Run all the inferences described in a manifest.
+
+    Parameters
+    ----------
+    manifest : Dict[str, Any]
+        The manifest, following the same structure as the yaml file. See the documentation of this script.
+    restart : bool, default False
+        If True, the runs which were already completed are executed again.
+    """
+    manifest = fill_manifest_defaults(manifest)
+    script = importlib.import_module(manifest["script"])
+    output_root = Path(manifest["output_path"])
+    output_root.mkdir(parents=True, exist_ok=True)
+    progress_path = output_root / PROGRESS_FILE_NAME
+    if restart and progress_path.exists():
+        progress_path.unlink()
+    completed = _load_progress(progress_path)
+
+    for run in manifest["runs"]:
+        model_name = run["model"]
+        for ckpt in run["checkpoints"]:
+            pending_inputs = [
+                p
+                for p in run["input_paths"]
+                if (model_name, str(ckpt), str(p)) not in completed
+            ]
+            if len(pending_inputs) == 0:
+                logging.info(
+                    "Skipping %s %s: all inputs were already processed.",
+                    model_name,
+                    ckpt,
+                )
+                continue
+
+            args, model = None, None
+            for input_path in pending_inputs:
+                args = _parse_run_args(
+                    script, manifest, run, ckpt, input_path, output_root
+                )
+                if model is None:
+                    model = get_model(model_name, args.pretrained_ckpt, args)
+                logging.info("Running %s %s on %s", model_name, ckpt, input_path)
+                script.infer(args, model)
+                _save_progress(progress_path, (model_name, str(ckpt), str(input_path)))
+
+            del model
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+
+def _parse_run_args(
+    script: Any,
+    manifest: Dict[str, Any],
+    run: Dict[str, Any],
+    ckpt: str,
+    input_path: str,
+    output_root: Path,
+) -> Namespace:
+    parser = script._init_parser()
+    model_ref = get_model_reference(run["model"])
+    parser = model_ref.add_model_specific_args(parser)
+
+    arg_list = [run["model"], "--input_path", str(input_path)]
+    if ckpt is not None:
+        arg_list.extend(["--pretrained_ckpt", str(ckpt)])
+    arg_list.extend(manifest["args"])
+    arg_list.extend(run["args"])
+    args = parser.parse_args(arg_list)
+
+    model_id = args.model
+    if args.pretrained_ckpt is not None:
+        model_id += f"_{Path(args.pretrained_ckpt).stem}"
+    args.output_path = output_root / model_id
+    return args
+
+
+def _load_progress(progress_path: Path) -> Set[Tuple[str, str, str]]:
+    completed = set()
+    if progress_path.exists():
+        with open(progress_path, "r") as f:
+            for line in f:
+                tokens = line.rstrip("\n").split("\t")
+                if len(tokens) == 3:
+                    completed.add(tuple(tokens))
+    return completed
+
+
+def _save_progress(progress_path: Path, entry: Tuple[str, str, str]) -> None:
+    with open(progress_path, "a") as f:
+        f.write("\t".join(entry) + "\n")
+        f.flush()
+
+
+if __name__ == "__main__":
+    parser = _init_parser()
+    args = parser.parse_args()
+    manifest = load_manifest(args.manifest_path)
+    run_manifest(manifest, args.restart)
@@ -0,0 +1,120 @@
+"""Compare the speed and the results of the iterative and the batched pure PyTorch spatial correlation samplers."""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import time
+from argparse import ArgumentParser
+from functools import partial
+from typing import Callable
+
+import torch
+
+from ptlflow.utils.correlation import (
+    batched_spatial_correlation_sample,
+    iter_spatial_correlation_sample,
+)
+
+
+def _init_parser() -> ArgumentParser:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1, 196, 12, 16, 1, 128, 24, 32, 1, 96, 48, 64, 1, 64, 96, 128],
+        help="List of (batch, channels, height, width) quadruples of the feature maps.",
+    )
+    parser.add_argument(
+        "--patch_size",
+        type=int,
+        default=9,
+        help="Size of the displacement window. The default is the one used by PWC-Net.",
+    )
+    parser.add_argument("--stride", type=int, default=1)
+    parser.add_argument("--dilation_patch", type=int, default=1)
+    parser.add_argument(
+        "--max_chunk_elements",
+        type=int,
+        default=2**24,
+        help="Maximum number of elements of each chunk for the chunked batched version.",
+    )
+    parser.add_argument("--num_trials", type=int, default=5)
+    parser.add_argument("--device", type=str, default="cpu")
+    return parser
+
+
+def _run(
+    fn: Callable[[torch.Tensor, torch.Tensor], torch.Tensor],
+    input1: torch.Tensor,
+    input2: torch.Tensor,
+    num_trials: int,
+) -> float:
+    fn(input1, input2)
+    if input1.is_cuda:
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(num_trials):
+        fn(input1, input2)
+    if input1.is_cuda:
+        torch.cuda.synchronize()
+    return 1000 * (time.perf_counter() - start) / num_trials
+
+
+@torch.no_grad()
+def benchmark(args) -> None:
+    corr_args = {
+        "patch_size": args.patch_size,
+        "stride": args.stride,
+        "dilation_patch": args.dilation_patch,
+    }
+    fns = {
+        "iter": partial(iter_spatial_correlation_sample, **corr_args),
+        "batched": partial(
+            batched_spatial_correlation_sample, max_chunk_elements=None, **corr_args
+        ),
+        "batched_chunked": partial(
+            batched_spatial_correlation_sample,
+            max_chunk_elements=args.max_chunk_elements,
+            **corr_args,
+        ),
+    }
+
+    print("size," + ",".join([f"{k}_ms" for k in fns.keys()]) + ",max_abs_diff")
+    for i in range(0, len(args.sizes), 4):
+        b, c, h, w = args.sizes[i : i + 4]
+        input1 = torch.randn(b, c, h, w, device=args.device)
+        input2 = torch.randn(b, c, h, w, device=args.device)
+
+        times = [_run(fn, input1, input2, args.num_trials) for fn in fns.values()]
+        ref = fns["iter"](input1, input2)
+        diff = max(
+            [
+                (fns[k](input1, input2) - ref).abs().max().item()
+                for k in ["batched", "batched_chunked"]
+            ]
+        )
+        print(
+            f"{b}x{c}x{h}x{w},"
+            + ",".join([f"{t:.2f}" for t in times])
+            + f",{diff:.2e}"
+        )
+
+
+if __name__ == "__main__":
+    parser = _init_parser()
+    args = parser.parse_args()
+    benchmark(args)
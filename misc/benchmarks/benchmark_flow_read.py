@@ -0,0 +1,102 @@
+"""Compare the speed of the default, memory-mapped, and batched flow readers."""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from ptlflow.utils import flow_utils
+
+
+def _init_parser() -> ArgumentParser:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[436, 1024, 540, 960, 1080, 1920],
+        help="List of (height, width) pairs of the flows. The defaults are the Sintel, Things, and Spring sizes.",
+    )
+    parser.add_argument(
+        "--formats", type=str, nargs="+", default=["flo", "pfm", "flo5"]
+    )
+    parser.add_argument(
+        "--num_files",
+        type=int,
+        default=8,
+        help="Number of files read in each trial. They are read together in one call by flow_read_many.",
+    )
+    parser.add_argument("--num_trials", type=int, default=10)
+    return parser
+
+
+def _time(read_fn: Callable[[], None], num_trials: int) -> float:
+    read_fn()
+    start = time.perf_counter()
+    for _ in range(num_trials):
+        read_fn()
+    return 1000 * (time.perf_counter() - start) / num_trials
+
+
+def benchmark(args) -> None:
+    print("format,size,default_ms,mmap_ms,many_ms,mmap_speedup,many_speedup")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i in range(0, len(args.sizes), 2):
+            h, w = args.sizes[i : i + 2]
+            for fmt in args.formats:
+                paths = []
+                for j in range(args.num_files):
+                    flow = (10 * np.random.randn(h, w, 2)).astype(np.float32)
+                    path = Path(tmp_dir) / f"flow_{h}x{w}_{j}.{fmt}"
+                    try:
+                        flow_utils.flow_write(path, flow)
+                    except ImportError:
+                        break
+                    paths.append(path)
+                if len(paths) == 0:
+                    print(f"{fmt},{h}x{w},skipped (missing dependency)")
+                    continue
+
+                # Compute the mean, so that the lazy memory-mapped reads actually touch the data
+                default_ms = _time(
+                    lambda: [flow_utils.flow_read(p).mean() for p in paths],
+                    args.num_trials,
+                )
+                mmap_ms = _time(
+                    lambda: [flow_utils.flow_read(p, mmap=True).mean() for p in paths],
+                    args.num_trials,
+                )
+                out = flow_utils.flow_read_many(paths)
+                many_ms = _time(
+                    lambda: flow_utils.flow_read_many(paths, out=out).mean(),
+                    args.num_trials,
+                )
+                print(
+                    f"{fmt},{h}x{w},{default_ms:.2f},{mmap_ms:.2f},{many_ms:.2f},"
+                    f"{default_ms / mmap_ms:.2f},{default_ms / many_ms:.2f}"
+                )
+
+
+if __name__ == "__main__":
+    parser = _init_parser()
+    args = parser.parse_args()
+    benchmark(args)
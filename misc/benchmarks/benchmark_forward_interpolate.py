@@ -0,0 +1,81 @@
+"""Compare the speed of the griddata and torch implementations of forward_interpolate_batch."""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import time
+from argparse import ArgumentParser
+
+import torch
+import torch.nn.functional as F
+
+from ptlflow.utils.utils import forward_interpolate_batch
+
+
+def _init_parser() -> ArgumentParser:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[55, 128, 136, 240, 272, 480],
+        help="List of (height, width) pairs of the flow_small inputs. 1080p with stride 8 is 136 x 240.",
+    )
+    parser.add_argument("--batch_size", type=int, default=1)
+    parser.add_argument("--num_trials", type=int, default=10)
+    parser.add_argument("--device", type=str, default=None)
+    return parser
+
+
+def _time(flow: torch.Tensor, method: str, num_trials: int) -> float:
+    forward_interpolate_batch(flow, method=method)
+    if flow.is_cuda:
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(num_trials):
+        forward_interpolate_batch(flow, method=method)
+    if flow.is_cuda:
+        torch.cuda.synchronize()
+    return 1000 * (time.perf_counter() - start) / num_trials
+
+
+def benchmark(args) -> None:
+    device = args.device
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    print("size,griddata_ms,torch_ms,speedup,mean_abs_diff")
+    for i in range(0, len(args.sizes), 2):
+        h, w = args.sizes[i : i + 2]
+        flow = 10 * torch.randn(args.batch_size, 2, h // 8 + 1, w // 8 + 1)
+        flow = F.interpolate(flow, size=(h, w), mode="bilinear", align_corners=True)
+        flow = flow.to(device)
+
+        ref = forward_interpolate_batch(flow, method="griddata")
+        test = forward_interpolate_batch(flow, method="torch")
+        diff = torch.abs(ref - test).mean().item()
+
+        griddata_ms = _time(flow, "griddata", args.num_trials)
+        torch_ms = _time(flow, "torch", args.num_trials)
+        print(
+            f"{h}x{w},{griddata_ms:.2f},{torch_ms:.2f},{griddata_ms / torch_ms:.1f},{diff:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = _init_parser()
+    args = parser.parse_args()
+    benchmark(args)
@@ -0,0 +1,147 @@
+"""Compare the speed and memory of the per-channel and the fused forward warping (fwarp) implementations."""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import time
+from argparse import ArgumentParser
+from typing import Callable, Tuple
+
+import torch
+
+from ptlflow.utils.warp import fwarp
+
+
+def _init_parser() -> ArgumentParser:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1080, 1920, 2160, 4096],
+        help="List of (height, width) pairs of the inputs. The defaults are 1080p and 4K (XVFI).",
+    )
+    parser.add_argument("--num_trials", type=int, default=5)
+    parser.add_argument("--device", type=str, default=None)
+    parser.add_argument(
+        "--skip_per_channel",
+        action="store_true",
+        help="If set, only the fused version is run. The per-channel version may run out of memory on 4K inputs.",
+    )
+    return parser
+
+
+def _sample_one_per_channel(img, shiftx, shifty, weight):
+    # The previous implementation, which creates index tensors for every channel
+    N, C, H, W = img.size()
+    flat_shiftx = shiftx.view(-1)
+    flat_shifty = shifty.view(-1)
+    flat_basex = (
+        torch.arange(0, H).view(-1, 1)[None, None].to(img.device).repeat(N, C, 1, W)
+    ).view(-1)
+    flat_basey = (
+        torch.arange(0, W).view(1, -1)[None, None].to(img.device).repeat(N, C, H, 1)
+    ).view(-1)
+    flat_weight = weight.view(-1)
+    flat_img = img.contiguous().view(-1)
+
+    idxn = torch.arange(0, N).view(N, 1, 1, 1).to(img.device).repeat(1, C, H, W)
+    idxc = torch.arange(0, C).view(1, C, 1, 1).to(img.device).repeat(N, 1, H, W)
+    idxx = flat_shiftx.long() + flat_basex
+    idxy = flat_shifty.long() + flat_basey
+    mask = idxx.ge(0) & idxx.lt(H) & idxy.ge(0) & idxy.lt(W)
+
+    ids = idxn.view(-1) * C * H * W + idxc.view(-1) * H * W + idxx * W + idxy
+    ids_mask = torch.masked_select(ids, mask)
+
+    img_warp = torch.zeros([N * C * H * W]).to(img.device)
+    img_warp.put_(
+        ids_mask, torch.masked_select(flat_img * flat_weight, mask), accumulate=True
+    )
+    one_warp = torch.zeros([N * C * H * W]).to(img.device)
+    one_warp.put_(ids_mask, torch.masked_select(flat_weight, mask), accumulate=True)
+    return img_warp.view(N, C, H, W), one_warp.view(N, C, H, W)
+
+
+def _fwarp_per_channel(
+    img: torch.Tensor, flo: torch.Tensor
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    C = img.shape[1]
+    y = flo[:, 0:1].repeat(1, C, 1, 1)
+    x = flo[:, 1:2].repeat(1, C, 1, 1)
+    x1 = torch.floor(x)
+    y1 = torch.floor(y)
+    imgw = 0
+    o = 0
+    for xc in (x1, x1 + 1):
+        for yc in (y1, y1 + 1):
+            w = torch.exp(-((x - xc) ** 2 + (y - yc) ** 2))
+            i, oi = _sample_one_per_channel(img, xc, yc, w)
+            imgw = imgw + i
+            o = o + oi
+    return imgw, o
+
+
+def _run(
+    fn: Callable[[torch.Tensor, torch.Tensor], Tuple[torch.Tensor, torch.Tensor]],
+    img: torch.Tensor,
+    flo: torch.Tensor,
+    num_trials: int,
+) -> Tuple[float, float]:
+    fn(img, flo)
+    if img.is_cuda:
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+    start = time.perf_counter()
+    for _ in range(num_trials):
+        fn(img, flo)
+    if img.is_cuda:
+        torch.cuda.synchronize()
+    elapsed_ms = 1000 * (time.perf_counter() - start) / num_trials
+    peak_mb = torch.cuda.max_memory_allocated() / 2**20 if img.is_cuda else float("nan")
+    return elapsed_ms, peak_mb
+
+
+@torch.no_grad()
+def benchmark(args) -> None:
+    device = args.device
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    print("size,per_channel_ms,fused_ms,per_channel_peak_mb,fused_peak_mb,max_abs_diff")
+    for i in range(0, len(args.sizes), 2):
+        h, w = args.sizes[i : i + 2]
+        img = torch.rand(1, 3, h, w, device=device)
+        flo = 20 * torch.randn(1, 2, h, w, device=device)
+
+        fused_ms, fused_mb = _run(fwarp, img, flo, args.num_trials)
+        if args.skip_per_channel:
+            print(f"{h}x{w},,{fused_ms:.2f},,{fused_mb:.0f},")
+            continue
+
+        per_channel_ms, per_channel_mb = _run(
+            _fwarp_per_channel, img, flo, args.num_trials
+        )
+        diff = (fwarp(img, flo)[0] - _fwarp_per_channel(img, flo)[0]).abs().max()
+        print(
+            f"{h}x{w},{per_channel_ms:.2f},{fused_ms:.2f},{per_channel_mb:.0f},{fused_mb:.0f},{diff.item():.2e}"
+        )
+
+
+if __name__ == "__main__":
+    parser = _init_parser()
+    args = parser.parse_args()
+    benchmark(args)
@@ -0,0 +1,99 @@
+"""Compare the speed and the peak memory of the dense and the chunked global matching of GMFlow."""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import time
+from argparse import ArgumentParser
+from functools import partial
+from typing import Callable, Tuple
+
+import torch
+
+from ptlflow.models.gmflow.matching import global_correlation_softmax
+from ptlflow.utils.attention import DEFAULT_ATTENTION_MAX_CHUNK_ELEMENTS
+
+
+def _init_parser() -> ArgumentParser:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[46, 62, 92, 124, 135, 240, 270, 480],
+        help="List of (height, width) pairs of the feature maps. The defaults are 1/8 of 368x496, 736x992, 1080x1920, and 2160x3840.",
+    )
+    parser.add_argument("--channels", type=int, default=128)
+    parser.add_argument(
+        "--max_chunk_elements",
+        type=int,
+        default=DEFAULT_ATTENTION_MAX_CHUNK_ELEMENTS,
+        help="Memory budget of the chunked version, in number of scores computed at once.",
+    )
+    parser.add_argument("--num_trials", type=int, default=5)
+    parser.add_argument("--device", type=str, default="cuda")
+    return parser
+
+
+def _run(
+    fn: Callable[[torch.Tensor, torch.Tensor], Tuple[torch.Tensor, torch.Tensor]],
+    feature0: torch.Tensor,
+    feature1: torch.Tensor,
+    num_trials: int,
+) -> Tuple[float, float]:
+    try:
+        fn(feature0, feature1)
+    except torch.cuda.OutOfMemoryError:
+        return float("nan"), float("nan")
+
+    if feature0.is_cuda:
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+    start = time.perf_counter()
+    for _ in range(num_trials):
+        fn(feature0, feature1)
+    if feature0.is_cuda:
+        torch.cuda.synchronize()
+    elapsed_ms = 1000 * (time.perf_counter() - start) / num_trials
+    peak_mb = (
+        torch.cuda.max_memory_allocated() / 2**20 if feature0.is_cuda else float("nan")
+    )
+    return elapsed_ms, peak_mb
+
+
+@torch.no_grad()
+def benchmark(args) -> None:
+    fns = {
+        "dense": global_correlation_softmax,
+        "chunked": partial(
+            global_correlation_softmax, max_chunk_elements=args.max_chunk_elements
+        ),
+    }
+
+    print("size," + ",".join([f"{k}_ms,{k}_peak_mb" for k in fns.keys()]))
+    for i in range(0, len(args.sizes), 2):
+        h, w = args.sizes[i : i + 2]
+        feature0 = torch.randn(1, args.channels, h, w, device=args.device)
+        feature1 = torch.randn(1, args.channels, h, w, device=args.device)
+
+        results = [_run(fn, feature0, feature1, args.num_trials) for fn in fns.values()]
+        print(f"{h}x{w}," + ",".join([f"{t:.2f},{m:.0f}" for t, m in results]))
+
+
+if __name__ == "__main__":
+    parser = _init_parser()
+    args = parser.parse_args()
+    benchmark(args)
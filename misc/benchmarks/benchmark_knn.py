@@ -0,0 +1,123 @@
+"""Compare the speed and memory of the chunked kNN used by SCV with a brute-force torch.topk over the full similarity matrix."""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import time
+from argparse import ArgumentParser
+from functools import partial
+from typing import Callable, Tuple
+
+import torch
+
+from ptlflow.models.scv import knn
+
+
+def _init_parser() -> ArgumentParser:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[46, 62, 92, 124, 135, 240],
+        help="List of (height, width) pairs of the feature maps. The defaults are 1/8 of 368x496, 736x992 and 1080x1920.",
+    )
+    parser.add_argument("--channels", type=int, default=256)
+    parser.add_argument("--k", type=int, default=32)
+    parser.add_argument(
+        "--max_chunk_elements",
+        type=int,
+        default=knn.DEFAULT_KNN_MAX_CHUNK_ELEMENTS,
+        help="Memory budget of the chunked version, in number of similarities computed at once.",
+    )
+    parser.add_argument("--num_trials", type=int, default=5)
+    parser.add_argument("--device", type=str, default=None)
+    return parser
+
+
+def _knn_brute_force(
+    fmap1: torch.Tensor, fmap2: torch.Tensor, k: int
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    sim = torch.bmm(fmap1.transpose(1, 2), fmap2)
+    dist, indx = torch.topk(sim, k, dim=2)
+    return dist.transpose(1, 2), indx.transpose(1, 2)
+
+
+def _run(
+    fn: Callable[[torch.Tensor, torch.Tensor, int], Tuple[torch.Tensor, torch.Tensor]],
+    fmap1: torch.Tensor,
+    fmap2: torch.Tensor,
+    k: int,
+    num_trials: int,
+) -> Tuple[float, float]:
+    fn(fmap1, fmap2, k)
+    if fmap1.is_cuda:
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+    start = time.perf_counter()
+    for _ in range(num_trials):
+        fn(fmap1, fmap2, k)
+    if fmap1.is_cuda:
+        torch.cuda.synchronize()
+    elapsed_ms = 1000 * (time.perf_counter() - start) / num_trials
+    peak_mb = (
+        torch.cuda.max_memory_allocated() / 2**20 if fmap1.is_cuda else float("nan")
+    )
+    return elapsed_ms, peak_mb
+
+
+@torch.no_grad()
+def benchmark(args) -> None:
+    device = args.device
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    fns = {
+        "brute_force": _knn_brute_force,
+        "chunked": partial(
+            knn.knn_torch_raw, max_chunk_elements=args.max_chunk_elements
+        ),
+    }
+    if knn.res is not None and device.startswith("cuda"):
+        fns["faiss"] = knn.knn_faiss_raw
+
+    print(
+        "size,"
+        + ",".join([f"{k}_ms,{k}_peak_mb" for k in fns.keys()])
+        + ",index_agreement"
+    )
+    for i in range(0, len(args.sizes), 2):
+        h, w = args.sizes[i : i + 2]
+        fmap1 = torch.randn(1, args.channels, h * w, device=device)
+        fmap2 = torch.randn(1, args.channels, h * w, device=device)
+
+        results = [
+            _run(fn, fmap1, fmap2, args.k, args.num_trials) for fn in fns.values()
+        ]
+        _, indx_ref = _knn_brute_force(fmap1, fmap2, args.k)
+        _, indx_test = fns["chunked"](fmap1, fmap2, args.k)
+        agreement = (indx_ref == indx_test).float().mean().item()
+        print(
+            f"{h}x{w},"
+            + ",".join([f"{t:.2f},{m:.0f}" for t, m in results])
+            + f",{agreement:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = _init_parser()
+    args = parser.parse_args()
+    benchmark(args)
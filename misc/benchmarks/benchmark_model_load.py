@@ -0,0 +1,127 @@
+"""Compare the wall time and peak memory of get_model with and without fast_load."""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import multiprocessing
+import resource
+import time
+from argparse import ArgumentParser
+from typing import Optional, Tuple
+
+import torch
+
+
+def _init_parser() -> ArgumentParser:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--models",
+        type=str,
+        nargs="+",
+        default=["raft", "sea_raft_l", "flowformer++", "ccmr+", "videoflow_mof"],
+    )
+    parser.add_argument(
+        "--ckpt",
+        type=str,
+        default="things",
+        help="Name of the pretrained checkpoint to load. Models without this checkpoint use their first one.",
+    )
+    parser.add_argument("--device", type=str, default=None)
+    parser.add_argument(
+        "--fp16", action="store_true", help="If set, the models are loaded in fp16."
+    )
+    parser.add_argument("--num_trials", type=int, default=3)
+    return parser
+
+
+def _prepare(model_name: str, ckpt_name: str) -> str:
+    # Download the checkpoint before timing, and choose another one if the model does not have ckpt_name
+    import ptlflow
+
+    model_ref = ptlflow.get_model_reference(model_name)
+    if ckpt_name not in model_ref.pretrained_checkpoints:
+        ckpt_name = list(model_ref.pretrained_checkpoints.keys())[0]
+    ptlflow.load_checkpoint(ckpt_name, model_ref, model_name)
+    return ckpt_name
+
+
+def _load(
+    model_name: str,
+    ckpt_name: str,
+    fast_load: bool,
+    device: str,
+    dtype: Optional[torch.dtype],
+) -> Tuple[float, float]:
+    # Run in a new process, so that the peak RSS only counts this load
+    import ptlflow
+
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    ptlflow.get_model(
+        model_name, ckpt_name, fast_load=fast_load, device=device, dtype=dtype
+    )
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+    elapsed_ms = 1000 * (time.perf_counter() - start)
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return elapsed_ms, peak_rss_mb
+
+
+def _run(
+    model_name: str,
+    ckpt_name: str,
+    fast_load: bool,
+    device: str,
+    dtype: Optional[torch.dtype],
+    num_trials: int,
+) -> Tuple[float, float]:
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        ckpt_name = pool.apply(_prepare, (model_name, ckpt_name))
+
+    times = []
+    peaks = []
+    for _ in range(num_trials):
+        with ctx.Pool(1) as pool:
+            elapsed_ms, peak_rss_mb = pool.apply(
+                _load, (model_name, ckpt_name, fast_load, device, dtype)
+            )
+        times.append(elapsed_ms)
+        peaks.append(peak_rss_mb)
+    return min(times), max(peaks)
+
+
+def benchmark(args) -> None:
+    device = args.device
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    dtype = torch.float16 if args.fp16 else None
+
+    print("model,regular_ms,regular_peak_rss_mb,fast_ms,fast_peak_rss_mb")
+    for mname in args.models:
+        results = [
+            _run(mname, args.ckpt, fast_load, device, dtype, args.num_trials)
+            for fast_load in [False, True]
+        ]
+        print(f"{mname}," + ",".join([f"{t:.0f},{m:.0f}" for t, m in results]))
+
+
+if __name__ == "__main__":
+    parser = _init_parser()
+    args = parser.parse_args()
+    benchmark(args)
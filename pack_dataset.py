@@ -0,0 +1,133 @@
+"""Pack datasets into memory-mappable binary shards.
+
+The packed datasets store the decoded images and flows, so they can be read during training or validation without decoding
+any files. After packing, the datasets can be selected with the name "shards", followed by the name of the packed
+directory. For example:
+
+.. code-block:: bash
+
+    python pack_dataset.py raft --dataset sintel-clean-trainval-occ --output_path /path/to/shards
+    python validate.py raft --pretrained_ckpt things --val_dataset shards-sintel_clean_trainval_occ-occ \
+        --shards_root_dir /path/to/shards
+
+The model is only used to build the datasets with the same options as train.py and validate.py, any model can be used.
+"""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import logging
+import sys
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+from typing import List
+
+from ptlflow import get_model, get_model_reference
+from ptlflow.data.datasets import pack_flow_dataset
+from ptlflow.models.base_model.base_model import BaseModel
+from ptlflow.utils.utils import (
+    add_datasets_to_parser,
+    config_logging,
+    get_list_of_available_models_list,
+)
+
+config_logging()
+
+
+def _init_parser() -> ArgumentParser:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "model",
+        type=str,
+        choices=get_list_of_available_models_list(),
+        help="Name of the model used to build the datasets.",
+    )
+    parser.add_argument(
+        "--dataset",
+        type=str,
+        required=True,
+        help=(
+            "The datasets to be packed, using the same format as --val_dataset, e.g., sintel-clean-trainval+kitti-2015. "
+            "Each dataset is packed into its own directory."
+        ),
+    )
+    parser.add_argument(
+        "--output_path",
+        type=str,
+        default=str(Path("outputs/shards")),
+        help="Path to the directory where the packed datasets will be saved.",
+    )
+    parser.add_argument(
+        "--flow_dtype",
+        type=str,
+        default="float32",
+        choices=["float16", "float32"],
+        help="The type used to store the flows. float16 halves the size of the flows, but reduces their precision.",
+    )
+    parser.add_argument(
+        "--shard_size_mb",
+        type=int,
+        default=1024,
+        help="Maximum size of each shard file, in megabytes.",
+    )
+    return parser
+
+
+def pack(args: Namespace, model: BaseModel) -> List[Path]:
+    """Pack all the selected datasets.
+
+    Parameters
+    ----------
+    args : Namespace
+        Arguments to configure the packing.
+    model : BaseModel
+        The model whose _get_[dataset_name]_dataset methods are used to build the datasets.
+
+    Returns
+    -------
+    List[Path]
+        The paths to the directories of the packed datasets.
+    """
+    output_dirs = []
+    for parsed_vals in model.parse_dataset_selection(args.dataset):
+        dataset_name = parsed_vals[1]
+        dataset = getattr(model, f"_get_{dataset_name}_dataset")(
+            False, *parsed_vals[2:]
+        )
+        output_dir = Path(args.output_path) / "_".join(parsed_vals[1:])
+        logging.info("Packing %d samples into %s", len(dataset), output_dir)
+        pack_flow_dataset(
+            dataset,
+            output_dir,
+            flow_dtype=args.flow_dtype,
+            shard_size_mb=args.shard_size_mb,
+        )
+        output_dirs.append(output_dir)
+    return output_dirs
+
+
+if __name__ == "__main__":
+    parser = _init_parser()
+
+    if len(sys.argv) > 1 and sys.argv[1] not in ["-h", "--help"]:
+        FlowModel = get_model_reference(sys.argv[1])
+        parser = FlowModel.add_model_specific_args(parser)
+
+    add_datasets_to_parser(parser, "datasets.yml")
+
+    args = parser.parse_args()
+    model = get_model(args.model, None, args)
+    pack(args, model)
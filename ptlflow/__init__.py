@@ -18,173 +18,186 @@
 
 __version__ = "0.3.2"
 
+import importlib
 import logging
 from argparse import Namespace
+from collections.abc import MutableMapping
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
+from packaging import version
 import requests
 import torch
-from torch import hub
+from torch import nn
 
 from ptlflow.models.base_model.base_model import BaseModel
-from ptlflow.models.ccmr.ccmr import CCMR, CCMRPlus
-from ptlflow.models.craft.craft import CRAFT
-from ptlflow.models.csflow.csflow import CSFlow
-from ptlflow.models.dicl.dicl import DICL
-from ptlflow.models.dip.dip import DIP
-from ptlflow.models.fastflownet.fastflownet import FastFlowNet
-from ptlflow.models.flow1d.flow1d import Flow1D
-from ptlflow.models.flowformer.flowformer import FlowFormer
-from ptlflow.models.flowformerplusplus.flowformerplusplus import FlowFormerPlusPlus
-from ptlflow.models.flownet.flownet2 import FlowNet2
-from ptlflow.models.flownet.flownetc import FlowNetC
-from ptlflow.models.flownet.flownetcs import FlowNetCS
-from ptlflow.models.flownet.flownetcss import FlowNetCSS
-from ptlflow.models.flownet.flownets import FlowNetS
-from ptlflow.models.flownet.flownetsd import FlowNetSD
-from ptlflow.models.gma.gma import GMA
-from ptlflow.models.gmflow.gmflow import GMFlow, GMFlowWithRefinement
-from ptlflow.models.gmflownet.gmflownet import GMFlowNet, GMFlowNetMix
-from ptlflow.models.hd3.hd3 import HD3, HD3Context
-from ptlflow.models.irr.pwcnet import IRRPWCNet
-from ptlflow.models.irr.pwcnet_irr import IRRPWCNetIRR
-from ptlflow.models.irr.irr_pwc import IRRPWC
-from ptlflow.models.lcv.lcv_raft import LCV_RAFT, LCV_RAFTSmall
-from ptlflow.models.liteflownet.liteflownet import LiteFlowNet
-from ptlflow.models.liteflownet.liteflownet3 import (
-    LiteFlowNet3,
-    LiteFlowNet3PseudoReg,
-    LiteFlowNet3S,
-    LiteFlowNet3SPseudoReg,
-)
-from ptlflow.models.liteflownet.liteflownet2 import LiteFlowNet2, LiteFlowNet2PseudoReg
-from ptlflow.models.llaflow.llaflow import LLAFlow, LLAFlowRAFT
-from ptlflow.models.maskflownet.maskflownet import MaskFlownet, MaskFlownet_S
-from ptlflow.models.matchflow.matchflow import MatchFlow, MatchFlowRAFT
-from ptlflow.models.memflow.memflow import MemFlow, MemFlowT
-from ptlflow.models.ms_raft_plus.ms_raft_plus import MSRAFTPlus
-from ptlflow.models.neuflow.neuflow import NeuFlow
-from ptlflow.models.neuflow2.neuflow2 import NeuFlow2
-from ptlflow.models.pwcnet.pwcnet import PWCNet, PWCDCNet
-from ptlflow.models.raft.raft import RAFT, RAFTSmall
-from ptlflow.models.rapidflow.rapidflow import (
-    RAPIDFlow,
-    RAPIDFlow_it1,
-    RAPIDFlow_it2,
-    RAPIDFlow_it3,
-    RAPIDFlow_it6,
-    RAPIDFlow_it12,
-)
-from ptlflow.models.rpknet.rpknet import RPKNet
-from ptlflow.models.sea_raft.sea_raft import SEARAFT, SEARAFT_S, SEARAFT_M, SEARAFT_L
-from ptlflow.models.scopeflow.irr_pwc_v2 import ScopeFlow
-from ptlflow.models.separableflow.separableflow import SeparableFlow
-from ptlflow.models.skflow.skflow import SKFlow
-from ptlflow.models.splatflow.splatflow import SplatFlow
-from ptlflow.models.starflow.starflow import StarFlow
-from ptlflow.models.unimatch.unimatch import (
-    UniMatch,
-    UniMatchScale2,
-    UniMatchScale2With6Refinements,
-)
-from ptlflow.models.vcn.vcn import VCN, VCNSmall
-from ptlflow.models.videoflow.videoflow_bof import VideoFlowBOF
-from ptlflow.models.videoflow.videoflow_mof import VideoFlowMOF
+from ptlflow.utils.checkpoint_store import CheckpointStore
 from ptlflow.utils.utils import config_logging
 
-try:
-    from ptlflow.models.scv.scv import SCVEighth, SCVQuarter
-except ImportError as e:
-    print(e)
-    SCVEighth = None
-    SCVQuarter = None
-
 config_logging()
 
 
-models_dict = {
-    "ccmr": CCMR,
-    "ccmr+": CCMRPlus,
-    "craft": CRAFT,
-    "csflow": CSFlow,
-    "dicl": DICL,
-    "dip": DIP,
-    "fastflownet": FastFlowNet,
-    "flow1d": Flow1D,
-    "flowformer": FlowFormer,
-    "flowformer++": FlowFormerPlusPlus,
-    "flownet2": FlowNet2,
-    "flownetc": FlowNetC,
-    "flownetcs": FlowNetCS,
-    "flownetcss": FlowNetCSS,
-    "flownets": FlowNetS,
-    "flownetsd": FlowNetSD,
-    "gma": GMA,
-    "gmflow": GMFlow,
-    "gmflow_refine": GMFlowWithRefinement,
-    "gmflow+": UniMatch,
-    "gmflow+_sc2": UniMatchScale2,
-    "gmflow+_sc2_refine6": UniMatchScale2With6Refinements,
-    "gmflownet": GMFlowNet,
-    "gmflownet_mix": GMFlowNetMix,
-    "hd3": HD3,
-    "hd3_ctxt": HD3Context,
-    "irr_pwc": IRRPWC,
-    "irr_pwcnet": IRRPWCNet,
-    "irr_pwcnet_irr": IRRPWCNetIRR,
-    "lcv_raft": LCV_RAFT,
-    "lcv_raft_small": LCV_RAFTSmall,
-    "liteflownet": LiteFlowNet,
-    "liteflownet2": LiteFlowNet2,
-    "liteflownet2_pseudoreg": LiteFlowNet2PseudoReg,
-    "liteflownet3": LiteFlowNet3,
-    "liteflownet3_pseudoreg": LiteFlowNet3PseudoReg,
-    "liteflownet3s": LiteFlowNet3S,
-    "liteflownet3s_pseudoreg": LiteFlowNet3SPseudoReg,
-    "llaflow": LLAFlow,
-    "llaflow_raft": LLAFlowRAFT,
-    "maskflownet": MaskFlownet,
-    "maskflownet_s": MaskFlownet_S,
-    "matchflow": MatchFlow,
-    "matchflow_raft": MatchFlowRAFT,
-    "memflow": MemFlow,
-    "memflow_t": MemFlowT,
-    "ms_raft+": MSRAFTPlus,
-    "neuflow": NeuFlow,
-    "neuflow2": NeuFlow2,
-    "pwcnet": PWCDCNet,
-    "pwcnet_nodc": PWCNet,
-    "raft": RAFT,
-    "raft_small": RAFTSmall,
-    "rapidflow": RAPIDFlow,
-    "rapidflow_it1": RAPIDFlow_it1,
-    "rapidflow_it2": RAPIDFlow_it2,
-    "rapidflow_it3": RAPIDFlow_it3,
-    "rapidflow_it6": RAPIDFlow_it6,
-    "rapidflow_it12": RAPIDFlow_it12,
-    "rpknet": RPKNet,
-    "sea_raft": SEARAFT,
-    "sea_raft_s": SEARAFT_S,
-    "sea_raft_m": SEARAFT_M,
-    "sea_raft_l": SEARAFT_L,
-    "scopeflow": ScopeFlow,
-    "scv4": SCVQuarter,
-    "scv8": SCVEighth,
-    "separableflow": SeparableFlow,
-    "skflow": SKFlow,
-    "splatflow": SplatFlow,
-    "starflow": StarFlow,
-    "unimatch": UniMatch,
-    "unimatch_sc2": UniMatchScale2,
-    "unimatch_sc2_refine6": UniMatchScale2With6Refinements,
-    "vcn": VCN,
-    "vcn_small": VCNSmall,
-    "videoflow_bof": VideoFlowBOF,
-    "videoflow_mof": VideoFlowMOF,
+# Module path and class name of each available model. The modules are only imported when the model is requested,
+# so that importing ptlflow does not load all the architectures and their optional dependencies.
+_MODEL_CLASS_PATHS = {
+    "ccmr": ("ptlflow.models.ccmr.ccmr", "CCMR"),
+    "ccmr+": ("ptlflow.models.ccmr.ccmr", "CCMRPlus"),
+    "craft": ("ptlflow.models.craft.craft", "CRAFT"),
+    "csflow": ("ptlflow.models.csflow.csflow", "CSFlow"),
+    "dicl": ("ptlflow.models.dicl.dicl", "DICL"),
+    "dip": ("ptlflow.models.dip.dip", "DIP"),
+    "fastflownet": ("ptlflow.models.fastflownet.fastflownet", "FastFlowNet"),
+    "flow1d": ("ptlflow.models.flow1d.flow1d", "Flow1D"),
+    "flowformer": ("ptlflow.models.flowformer.flowformer", "FlowFormer"),
+    "flowformer++": (
+        "ptlflow.models.flowformerplusplus.flowformerplusplus",
+        "FlowFormerPlusPlus",
+    ),
+    "flownet2": ("ptlflow.models.flownet.flownet2", "FlowNet2"),
+    "flownetc": ("ptlflow.models.flownet.flownetc", "FlowNetC"),
+    "flownetcs": ("ptlflow.models.flownet.flownetcs", "FlowNetCS"),
+    "flownetcss": ("ptlflow.models.flownet.flownetcss", "FlowNetCSS"),
+    "flownets": ("ptlflow.models.flownet.flownets", "FlowNetS"),
+    "flownetsd": ("ptlflow.models.flownet.flownetsd", "FlowNetSD"),
+    "gma": ("ptlflow.models.gma.gma", "GMA"),
+    "gmflow": ("ptlflow.models.gmflow.gmflow", "GMFlow"),
+    "gmflow_refine": ("ptlflow.models.gmflow.gmflow", "GMFlowWithRefinement"),
+    "gmflow+": ("ptlflow.models.unimatch.unimatch", "UniMatch"),
+    "gmflow+_sc2": ("ptlflow.models.unimatch.unimatch", "UniMatchScale2"),
+    "gmflow+_sc2_refine6": (
+        "ptlflow.models.unimatch.unimatch",
+        "UniMatchScale2With6Refinements",
+    ),
+    "gmflownet": ("ptlflow.models.gmflownet.gmflownet", "GMFlowNet"),
+    "gmflownet_mix": ("ptlflow.models.gmflownet.gmflownet", "GMFlowNetMix"),
+    "hd3": ("ptlflow.models.hd3.hd3", "HD3"),
+    "hd3_ctxt": ("ptlflow.models.hd3.hd3", "HD3Context"),
+    "irr_pwc": ("ptlflow.models.irr.irr_pwc", "IRRPWC"),
+    "irr_pwcnet": ("ptlflow.models.irr.pwcnet", "IRRPWCNet"),
+    "irr_pwcnet_irr": ("ptlflow.models.irr.pwcnet_irr", "IRRPWCNetIRR"),
+    "lcv_raft": ("ptlflow.models.lcv.lcv_raft", "LCV_RAFT"),
+    "lcv_raft_small": ("ptlflow.models.lcv.lcv_raft", "LCV_RAFTSmall"),
+    "liteflownet": ("ptlflow.models.liteflownet.liteflownet", "LiteFlowNet"),
+    "liteflownet2": ("ptlflow.models.liteflownet.liteflownet2", "LiteFlowNet2"),
+    "liteflownet2_pseudoreg": (
+        "ptlflow.models.liteflownet.liteflownet2",
+        "LiteFlowNet2PseudoReg",
+    ),
+    "liteflownet3": ("ptlflow.models.liteflownet.liteflownet3", "LiteFlowNet3"),
+    "liteflownet3_pseudoreg": (
+        "ptlflow.models.liteflownet.liteflownet3",
+        "LiteFlowNet3PseudoReg",
+    ),
+    "liteflownet3s": ("ptlflow.models.liteflownet.liteflownet3", "LiteFlowNet3S"),
+    "liteflownet3s_pseudoreg": (
+        "ptlflow.models.liteflownet.liteflownet3",
+        "LiteFlowNet3SPseudoReg",
+    ),
+    "llaflow": ("ptlflow.models.llaflow.llaflow", "LLAFlow"),
+    "llaflow_raft": ("ptlflow.models.llaflow.llaflow", "LLAFlowRAFT"),
+    "maskflownet": ("ptlflow.models.maskflownet.maskflownet", "MaskFlownet"),
+    "maskflownet_s": ("ptlflow.models.maskflownet.maskflownet", "MaskFlownet_S"),
+    "matchflow": ("ptlflow.models.matchflow.matchflow", "MatchFlow"),
+    "matchflow_raft": ("ptlflow.models.matchflow.matchflow", "MatchFlowRAFT"),
+    "memflow": ("ptlflow.models.memflow.memflow", "MemFlow"),
+    "memflow_t": ("ptlflow.models.memflow.memflow", "MemFlowT"),
+    "ms_raft+": ("ptlflow.models.ms_raft_plus.ms_raft_plus", "MSRAFTPlus"),
+    "neuflow": ("ptlflow.models.neuflow.neuflow", "NeuFlow"),
+    "neuflow2": ("ptlflow.models.neuflow2.neuflow2", "NeuFlow2"),
+    "pwcnet": ("ptlflow.models.pwcnet.pwcnet", "PWCDCNet"),
+    "pwcnet_nodc": ("ptlflow.models.pwcnet.pwcnet", "PWCNet"),
+    "raft": ("ptlflow.models.raft.raft", "RAFT"),
+    "raft_small": ("ptlflow.models.raft.raft", "RAFTSmall"),
+    "rapidflow": ("ptlflow.models.rapidflow.rapidflow", "RAPIDFlow"),
+    "rapidflow_it1": ("ptlflow.models.rapidflow.rapidflow", "RAPIDFlow_it1"),
+    "rapidflow_it2": ("ptlflow.models.rapidflow.rapidflow", "RAPIDFlow_it2"),
+    "rapidflow_it3": ("ptlflow.models.rapidflow.rapidflow", "RAPIDFlow_it3"),
+    "rapidflow_it6": ("ptlflow.models.rapidflow.rapidflow", "RAPIDFlow_it6"),
+    "rapidflow_it12": ("ptlflow.models.rapidflow.rapidflow", "RAPIDFlow_it12"),
+    "rpknet": ("ptlflow.models.rpknet.rpknet", "RPKNet"),
+    "sea_raft": ("ptlflow.models.sea_raft.sea_raft", "SEARAFT"),
+    "sea_raft_s": ("ptlflow.models.sea_raft.sea_raft", "SEARAFT_S"),
+    "sea_raft_m": ("ptlflow.models.sea_raft.sea_raft", "SEARAFT_M"),
+    "sea_raft_l": ("ptlflow.models.sea_raft.sea_raft", "SEARAFT_L"),
+    "scopeflow": ("ptlflow.models.scopeflow.irr_pwc_v2", "ScopeFlow"),
+    "scv4": ("ptlflow.models.scv.scv", "SCVQuarter"),
+    "scv8": ("ptlflow.models.scv.scv", "SCVEighth"),
+    "separableflow": ("ptlflow.models.separableflow.separableflow", "SeparableFlow"),
+    "skflow": ("ptlflow.models.skflow.skflow", "SKFlow"),
+    "splatflow": ("ptlflow.models.splatflow.splatflow", "SplatFlow"),
+    "starflow": ("ptlflow.models.starflow.starflow", "StarFlow"),
+    "unimatch": ("ptlflow.models.unimatch.unimatch", "UniMatch"),
+    "unimatch_sc2": ("ptlflow.models.unimatch.unimatch", "UniMatchScale2"),
+    "unimatch_sc2_refine6": (
+        "ptlflow.models.unimatch.unimatch",
+        "UniMatchScale2With6Refinements",
+    ),
+    "vcn": ("ptlflow.models.vcn.vcn", "VCN"),
+    "vcn_small": ("ptlflow.models.vcn.vcn", "VCNSmall"),
+    "videoflow_bof": ("ptlflow.models.videoflow.videoflow_bof", "VideoFlowBOF"),
+    "videoflow_mof": ("ptlflow.models.videoflow.videoflow_mof", "VideoFlowMOF"),
 }
 
 
+class _LazyModelsDict(MutableMapping):
+    """Dict of model names to model classes, which imports the model modules only when they are accessed.
+
+    Iterating over the keys, checking membership, and getting the length do not import any model. The values can be
+    either a model class or a tuple (module path, class name), which is replaced by the class on the first access.
+    If the module of a model cannot be imported (e.g., due to a missing optional dependency), the ImportError is only
+    raised when that model is accessed.
+    """
+
+    def __init__(self, entries: Dict[str, Union[BaseModel, Tuple[str, str]]]) -> None:
+        self._entries = dict(entries)
+
+    def __getitem__(self, model_name: str) -> BaseModel:
+        entry = self._entries[model_name]
+        if isinstance(entry, tuple):
+            module_path, class_name = entry
+            module = importlib.import_module(module_path)
+            entry = getattr(module, class_name)
+            self._entries[model_name] = entry
+        return entry
+
+    def __setitem__(
+        self, model_name: str, model_ref: Union[BaseModel, Tuple[str, str]]
+    ) -> None:
+        self._entries[model_name] = model_ref
+
+    def __delitem__(self, model_name: str) -> None:
+        del self._entries[model_name]
+
+    def __contains__(self, model_name: object) -> bool:
+        return model_name in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self._entries.keys())})"
+
+
+models_dict = _LazyModelsDict(_MODEL_CLASS_PATHS)
+
+_MODEL_CLASS_MODULES = {
+    class_name: module_path
+    for module_path, class_name in _MODEL_CLASS_PATHS.values()
+}
+
+
+def __getattr__(name: str) -> Any:
+    # Keep model classes accessible as attributes of ptlflow (e.g., ptlflow.RAFT), importing them on demand
+    if name in _MODEL_CLASS_MODULES:
+        module = importlib.import_module(_MODEL_CLASS_MODULES[name])
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def download_scripts(destination_dir: Path = Path("ptlflow_scripts")) -> None:
     """Download the main scripts and configs to start working with PTLFlow."""
     github_url = "https://raw.githubusercontent.com/hmorimitsu/ptlflow/main/"
@@ -215,6 +228,9 @@ def get_model(
     model_name: str,
     pretrained_ckpt: Optional[str] = None,
     args: Optional[Namespace] = None,
+    fast_load: bool = False,
+    device: Optional[Union[str, torch.device]] = None,
+    dtype: Optional[torch.dtype] = None,
 ) -> BaseModel:
     """Return an instance of a chosen model.
 
@@ -233,6 +249,16 @@ def get_model(
         Name of the pretrained weight to load or a path to a local checkpoint file.
     args : Optional[Namespace], optional
         Some arguments that ill be provided to the model.
+    fast_load : bool, default False
+        Only used when a checkpoint is loaded. If True, the parameters of the model are created without allocating and
+        initializing their storage, the checkpoint is memory-mapped, and its tensors are assigned directly as the
+        parameters, after being moved to the given device and dtype. This avoids the random initialization and the
+        second copy of the weights in memory. It requires torch>=2.1, otherwise the regular loading is used.
+    device : Optional[Union[str, torch.device]], optional
+        If provided, the model is moved to this device.
+    dtype : Optional[torch.dtype], optional
+        If provided, the floating point parameters and buffers of the model are converted to this dtype
+        (e.g., torch.float16).
 
     Returns
     -------
@@ -254,7 +280,6 @@ def get_model(
     if args is None:
         parser = model_ref.add_model_specific_args()
         args = parser.parse_args([])
-    model = model_ref(args)
 
     if (
         pretrained_ckpt is None
@@ -263,8 +288,31 @@ def get_model(
     ):
         pretrained_ckpt = args.pretrained_ckpt
 
+    if pretrained_ckpt is not None and fast_load and not _is_fast_load_supported():
+        logging.warning(
+            "fast_load requires torch>=2.1, found %s. The model will be loaded normally.",
+            torch.__version__,
+        )
+        fast_load = False
+
+    model = None
+    if pretrained_ckpt is not None and fast_load:
+        try:
+            with _skip_parameters_init():
+                model = model_ref(args)
+        except (NotImplementedError, RuntimeError) as e:
+            logging.warning(
+                "Model %s cannot be created without initializing its parameters (%s). "
+                "The model will be loaded normally.",
+                model_name,
+                e,
+            )
+            fast_load = False
+    if model is None:
+        model = model_ref(args)
+
     if pretrained_ckpt is not None:
-        ckpt = load_checkpoint(pretrained_ckpt, model_ref, model_name)
+        ckpt = load_checkpoint(pretrained_ckpt, model_ref, model_name, mmap=fast_load)
 
         state_dict = ckpt["state_dict"]
         if "hyper_parameters" in ckpt:
@@ -276,7 +324,17 @@ def get_model(
                 extra_params = ckpt["hyper_parameters"]["extra_params"]
                 for name, value in extra_params.items():
                     model.add_extra_param(name, value)
-        model.load_state_dict(state_dict)
+        if fast_load:
+            state_dict = {
+                k: v.to(device=device, dtype=dtype if v.is_floating_point() else None)
+                for k, v in state_dict.items()
+            }
+            model.load_state_dict(state_dict, assign=True)
+        else:
+            model.load_state_dict(state_dict)
+
+    if device is not None or dtype is not None:
+        model = model.to(device=device, dtype=dtype)
 
     return model
 
@@ -302,6 +360,8 @@ def get_model_reference(model_name: str) -> BaseModel:
     ------
     ValueError
         If the given name is not a valid choice.
+    ImportError
+        If the module of the model cannot be imported, e.g., when an optional dependency of the model is not installed.
 
     See Also
     --------
@@ -331,7 +391,7 @@ def get_trainable_model_names() -> List[str]:
 
 
 def load_checkpoint(
-    pretrained_ckpt: str, model_ref: BaseModel, model_name: str
+    pretrained_ckpt: str, model_ref: BaseModel, model_name: str, mmap: bool = False
 ) -> Dict[str, Any]:
     """Try to load the checkpoint specified in pretrained_ckpt.
 
@@ -342,7 +402,10 @@ def load_checkpoint(
     model_ref : BaseModel
         A reference to the model class. See the function get_model_reference() for more details.
     model_name : str
-        A string representing the name of the model, just for debugging purposes.
+        Name of the model. It is used to find the checkpoint in the local CheckpointStore.
+    mmap : bool, default False
+        If True, the checkpoint file is memory-mapped and its tensors are kept on the CPU, instead of being read into
+        memory and moved to the GPU. Requires torch>=2.1.
 
     Returns
     -------
@@ -355,28 +418,61 @@ def load_checkpoint(
     """
     if Path(pretrained_ckpt).exists():
         ckpt_path = pretrained_ckpt
-    elif hasattr(model_ref, "pretrained_checkpoints"):
-        ckpt_path = model_ref.pretrained_checkpoints.get(pretrained_ckpt)
-        if ckpt_path is None:
-            raise ValueError(
-                f"Invalid checkpoint name {pretrained_ckpt}. "
-                f'Choose one from {{{",".join(model_ref.pretrained_checkpoints.keys())}}}'
-            )
     else:
-        raise ValueError(
-            f"Cannot find checkpoint {pretrained_ckpt} for model {model_name}"
+        # Names of pretrained checkpoints are resolved from the local store first, which does not require network access
+        store = CheckpointStore()
+        # The URL declared by the model is checked, so that outdated checkpoints are downloaded again
+        expected_url = getattr(model_ref, "pretrained_checkpoints", {}).get(
+            pretrained_ckpt
         )
-
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-
-    if Path(ckpt_path).exists():
-        ckpt = torch.load(ckpt_path, map_location=torch.device(device))
+        ckpt_path = store.get_path(model_name, pretrained_ckpt, expected_url)
+        if ckpt_path is None:
+            if not hasattr(model_ref, "pretrained_checkpoints"):
+                raise ValueError(
+                    f"Cannot find checkpoint {pretrained_ckpt} for model {model_name}"
+                )
+            ckpt_url = model_ref.pretrained_checkpoints.get(pretrained_ckpt)
+            if ckpt_url is None:
+                raise ValueError(
+                    f"Invalid checkpoint name {pretrained_ckpt}. "
+                    f'Choose one from {{{",".join(model_ref.pretrained_checkpoints.keys())}}}'
+                )
+            if Path(ckpt_url).exists():
+                ckpt_path = ckpt_url
+            else:
+                ckpt_path = store.download(model_name, pretrained_ckpt, ckpt_url)
+
+    if mmap:
+        ckpt = torch.load(ckpt_path, map_location=torch.device("cpu"), mmap=True)
     else:
-        model_dir = Path(hub.get_dir()) / "ptlflow" / "checkpoints"
-        ckpt = hub.load_state_dict_from_url(
-            ckpt_path,
-            model_dir=model_dir,
-            map_location=torch.device(device),
-            check_hash=True,
-        )
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        ckpt = torch.load(ckpt_path, map_location=torch.device(device))
     return ckpt
+
+
+def _is_fast_load_supported() -> bool:
+    # torch.load(mmap=True) and load_state_dict(assign=True) were introduced in torch 2.1
+    return version.parse(torch.__version__) >= version.parse("2.1.0")
+
+
+@contextmanager
+def _skip_parameters_init() -> Iterator[None]:
+    # Move each parameter to the meta device as soon as it is registered, so that the initialization of the
+    # parameters (e.g., in reset_parameters()) does not compute nor allocate anything. The buffers are kept as usual,
+    # since non-persistent buffers are not stored in the checkpoints.
+    register_parameter = nn.Module.register_parameter
+
+    def _register_meta_parameter(
+        module: nn.Module, name: str, param: Optional[nn.Parameter]
+    ) -> None:
+        register_parameter(module, name, param)
+        if param is not None and type(param) is nn.Parameter:
+            module._parameters[name] = nn.Parameter(
+                param.to("meta"), requires_grad=param.requires_grad
+            )
+
+    nn.Module.register_parameter = _register_meta_parameter
+    try:
+        yield
+    finally:
+        nn.Module.register_parameter = register_parameter
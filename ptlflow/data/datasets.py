@@ -16,11 +16,24 @@
 # limitations under the License.
 # =============================================================================
 
+import hashlib
 import json
 import logging
 import math
+import os
+import struct
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import cv2
 from einops import rearrange
@@ -34,6 +47,24 @@ config_logging()
 
 THIS_DIR = Path(__file__).resolve().parent
 
+INDEX_CACHE_VERSION = 2
+INDEX_CACHE_DIR_ENV = "PTLFLOW_DATASET_INDEX_DIR"
+INDEX_CACHE_ATTRIBUTES = [
+    "img_paths",
+    "flow_paths",
+    "occ_paths",
+    "mb_paths",
+    "flow_b_paths",
+    "occ_b_paths",
+    "mb_b_paths",
+    "metadata",
+    "flow_format",
+    "flow_read_mins",
+    "flow_read_maxs",
+    "flow_b_read_mins",
+    "flow_b_read_maxs",
+]
+
 
 class BaseFlowDataset(Dataset):
     """Manage optical flow dataset loading.
@@ -250,6 +281,21 @@ class BaseFlowDataset(Dataset):
     def __len__(self) -> int:
         return len(self.img_paths)
 
+    def get_image_size(self, index: int) -> Tuple[int, int]:
+        """Return the size of the images of one input, without decoding them.
+
+        Parameters
+        ----------
+        index : int
+            The index of the entry on the input lists.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The (height, width) of the first image of the input.
+        """
+        return _read_image_size(self.img_paths[index][0])
+
     def _get_flows_and_valids(
         self,
         flow_paths: Sequence[str],
@@ -261,7 +307,11 @@ class BaseFlowDataset(Dataset):
         valids = []
         for path in flow_paths:
             flow = flow_utils.flow_read(
-                path, format=flow_format, flow_min=flow_min, flow_max=flow_max
+                path,
+                format=flow_format,
+                flow_min=flow_min,
+                flow_max=flow_max,
+                mmap=True,
             )
 
             nan_mask = np.isnan(flow)
@@ -278,6 +328,129 @@ class BaseFlowDataset(Dataset):
             flows.append(flow)
         return flows, valids
 
+    def _load_index_cache(self, init_args: Dict[str, Any]) -> bool:
+        """Load the input paths from a previously saved index, if it is still valid.
+
+        The index is keyed by the dataset class and the arguments used to initialize it. It is invalidated when the
+        modification time of the root directories, or of any directory between them and the indexed files, changes.
+        Therefore, adding or removing files or subdirectories at any depth invalidates the index. The index is saved
+        in ~/.cache/ptlflow/dataset_index, unless another directory is set by the environment variable
+        PTLFLOW_DATASET_INDEX_DIR. Setting this variable to "none" disables the index cache.
+
+        Parameters
+        ----------
+        init_args : Dict[str, Any]
+            The arguments given to the dataset constructor, typically obtained from locals(). The root directories are
+            taken from the arguments whose names start with "root_dir".
+
+        Returns
+        -------
+        bool
+            True if the paths were loaded from the index, False otherwise. In the latter case, the paths should be read
+            from disk and then _save_index_cache() should be called.
+        """
+        self._index_cache_path = None
+        self._index_cache_root_dirs = None
+
+        cache_dir = os.environ.get(
+            INDEX_CACHE_DIR_ENV, str(Path.home() / ".cache" / "ptlflow" / "dataset_index")
+        )
+        if cache_dir.lower() == "none":
+            return False
+
+        options = {
+            k: v
+            for k, v in init_args.items()
+            if k not in ["self", "transform", "__class__"]
+        }
+        root_dirs = [
+            Path(v)
+            for k, v in options.items()
+            if k.startswith("root_dir") and v is not None
+        ]
+
+        key = json.dumps(
+            {
+                "version": INDEX_CACHE_VERSION,
+                "class": type(self).__name__,
+                "options": options,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        key_hash = hashlib.sha1(key.encode()).hexdigest()
+        self._index_cache_path = (
+            Path(cache_dir) / f"{type(self).__name__}_{key_hash}.json"
+        )
+        self._index_cache_root_dirs = root_dirs
+
+        if not self._index_cache_path.exists():
+            return False
+        try:
+            with open(self._index_cache_path, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return False
+        stamp = index.get("stamp")
+        if not isinstance(stamp, dict) or any(str(d) not in stamp for d in root_dirs):
+            return False
+        if stamp != _get_dir_stamp(stamp.keys()):
+            return False
+
+        for name in INDEX_CACHE_ATTRIBUTES:
+            setattr(self, name, index["attributes"][name])
+        return True
+
+    def _save_index_cache(self) -> None:
+        """Save the input paths to be reused by _load_index_cache() in the next initializations."""
+        if getattr(self, "_index_cache_path", None) is None or self.__len__() == 0:
+            return
+
+        attributes = {}
+        for name in INDEX_CACHE_ATTRIBUTES:
+            value = getattr(self, name)
+            if not name.endswith("_paths"):
+                attributes[name] = value
+            else:
+                attributes[name] = [
+                    [str(p) for p in v] if isinstance(v, (list, tuple)) else v
+                    for v in value
+                ]
+
+        # Stamp the root directories and all the directories between them and the indexed files
+        dirs = set(self._index_cache_root_dirs)
+        file_dirs = set()
+        for name in INDEX_CACHE_ATTRIBUTES:
+            if not name.endswith("_paths"):
+                continue
+            for value in attributes[name]:
+                paths = value if isinstance(value, list) else [value]
+                for p in paths:
+                    if not isinstance(p, str):
+                        continue
+                    parent = Path(p).parent
+                    file_dirs.add(parent)
+                    while parent not in dirs and parent != parent.parent:
+                        dirs.add(parent)
+                        parent = parent.parent
+        # Also stamp the subdirectories of the intermediate directories, which may not contain indexed files yet
+        # (e.g., empty sequences)
+        for d in list(dirs - file_dirs):
+            if d.is_dir():
+                with os.scandir(d) as entries:
+                    dirs.update([Path(e.path) for e in entries if e.is_dir()])
+        stamp = _get_dir_stamp(dirs)
+
+        try:
+            self._index_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first, so that concurrent processes never read a partial index
+            tmp_path = self._index_cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump({"stamp": stamp, "attributes": attributes}, f, default=str)
+            os.replace(tmp_path, self._index_cache_path)
+        except OSError as e:
+            logging.warning("Could not save the dataset index cache: %s", e)
+
     def _log_status(self) -> None:
         if self.__len__() == 0:
             logging.warning(
@@ -346,6 +519,7 @@ class AutoFlowDataset(BaseFlowDataset):
         get_meta : bool, default True
             Whether to get metadata.
         """
+        init_args = dict(locals())
         super().__init__(
             dataset_name="AutoFlow",
             split_name=split,
@@ -360,6 +534,10 @@ class AutoFlowDataset(BaseFlowDataset):
         self.root_dir = root_dir
         self.split_file = THIS_DIR / "AutoFlow_val.txt"
 
+        if self._load_index_cache(init_args):
+            self._log_status()
+            return
+
         # Read data from disk
         parts_dirs = [f"static_40k_png_{i+1}_of_4" for i in range(4)]
         sample_paths = []
@@ -402,6 +580,7 @@ class AutoFlowDataset(BaseFlowDataset):
             for paths in self.img_paths
         ]
 
+        self._save_index_cache()
         self._log_status()
 
 
@@ -435,6 +614,7 @@ class FlyingChairsDataset(BaseFlowDataset):
         get_meta : bool, default True
             Whether to get metadata.
         """
+        init_args = dict(locals())
         super().__init__(
             dataset_name="FlyingChairs",
             split_name=split,
@@ -449,6 +629,10 @@ class FlyingChairsDataset(BaseFlowDataset):
         self.root_dir = root_dir
         self.split_file = THIS_DIR / "FlyingChairs_val.txt"
 
+        if self._load_index_cache(init_args):
+            self._log_status()
+            return
+
         # Read data from disk
         img1_paths = sorted((Path(self.root_dir) / "data").glob("*img1.ppm"))
         img2_paths = sorted((Path(self.root_dir) / "data").glob("*img2.ppm"))
@@ -502,6 +686,7 @@ class FlyingChairsDataset(BaseFlowDataset):
             for paths in self.img_paths
         ]
 
+        self._save_index_cache()
         self._log_status()
 
 
@@ -547,6 +732,7 @@ class FlyingChairs2Dataset(BaseFlowDataset):
         get_meta : bool, default True
             Whether to get metadata.
         """
+        init_args = dict(locals())
         super().__init__(
             dataset_name="FlyingChairs2",
             split_name=split,
@@ -561,6 +747,10 @@ class FlyingChairs2Dataset(BaseFlowDataset):
         self.root_dir = root_dir
         self.add_reverse = add_reverse
 
+        if self._load_index_cache(init_args):
+            self._log_status()
+            return
+
         if split == "train":
             dir_names = ["train"]
         elif split == "val":
@@ -701,6 +891,7 @@ class FlyingChairs2Dataset(BaseFlowDataset):
                 self.mb_b_paths
             ), f"{len(self.img_paths)} vs {len(self.mb_b_paths)}"
 
+        self._save_index_cache()
         self._log_status()
 
 
@@ -766,6 +957,7 @@ class FlyingThings3DDataset(BaseFlowDataset):
             - "middle": the main frame will be in the middle of the sequence (at position sequence_length // 2),
             - "last": the main frame will be the penultimate in the sequence.
         """
+        init_args = dict(locals())
         super().__init__(
             dataset_name="FlyingThings3D",
             split_name=split,
@@ -788,6 +980,10 @@ class FlyingThings3DDataset(BaseFlowDataset):
         if isinstance(self.side_names, str):
             self.side_names = [self.side_names]
 
+        if self._load_index_cache(init_args):
+            self._log_status()
+            return
+
         if split == "val":
             split_dir_names = ["TEST"]
         elif split == "train":
@@ -999,6 +1195,7 @@ class FlyingThings3DDataset(BaseFlowDataset):
                 self.mb_b_paths
             ), f"{len(self.img_paths)} vs {len(self.mb_b_paths)}"
 
+        self._save_index_cache()
         self._log_status()
 
 
@@ -1064,6 +1261,7 @@ class FlyingThings3DSubsetDataset(BaseFlowDataset):
             - "middle": the main frame will be in the middle of the sequence (at position sequence_length // 2),
             - "last": the main frame will be the penultimate in the sequence.
         """
+        init_args = dict(locals())
         super().__init__(
             dataset_name="FlyingThings3DSubset",
             split_name=split,
@@ -1086,6 +1284,10 @@ class FlyingThings3DSubsetDataset(BaseFlowDataset):
         if isinstance(self.side_names, str):
             self.side_names = [self.side_names]
 
+        if self._load_index_cache(init_args):
+            self._log_status()
+            return
+
         if split == "train" or split == "val":
             split_dir_names = [split]
         else:
@@ -1256,6 +1458,7 @@ class FlyingThings3DSubsetDataset(BaseFlowDataset):
                 self.mb_b_paths
             ), f"{len(self.img_paths)} vs {len(self.mb_b_paths)}"
 
+        self._save_index_cache()
         self._log_status()
 
 
@@ -1300,6 +1503,7 @@ class Hd1kDataset(BaseFlowDataset):
             - "middle": the main frame will be in the middle of the sequence (at position sequence_length // 2),
             - "last": the main frame will be the penultimate in the sequence.
         """
+        init_args = dict(locals())
         super().__init__(
             dataset_name="HD1K",
             split_name=split,
@@ -1316,6 +1520,10 @@ class Hd1kDataset(BaseFlowDataset):
         self.sequence_length = sequence_length
         self.sequence_position = sequence_position
 
+        if self._load_index_cache(init_args):
+            self._log_status()
+            return
+
         if split == "test":
             split_dir = "hd1k_challenge"
         else:
@@ -1382,6 +1590,7 @@ class Hd1kDataset(BaseFlowDataset):
                 self.flow_paths
             ), f"{len(self.img_paths)} vs {len(self.flow_paths)}"
 
+        self._save_index_cache()
         self._log_status()
 
 
@@ -1424,6 +1633,7 @@ class KittiDataset(BaseFlowDataset):
         get_meta : bool, default True
             Whether to get metadata.
         """
+        init_args = dict(locals())
         if isinstance(versions, str):
             versions = [versions]
         super().__init__(
@@ -1441,6 +1651,10 @@ class KittiDataset(BaseFlowDataset):
         self.versions = versions
         self.split = split
 
+        if self._load_index_cache(init_args):
+            self._log_status()
+            return
+
         if split == "test":
             split_dir = "testing"
         else:
@@ -1525,6 +1739,7 @@ class KittiDataset(BaseFlowDataset):
                 self.flow_paths
             ), f"{len(self.img_paths)} vs {len(self.flow_paths)}"
 
+        self._save_index_cache()
         self._log_status()
 
 
@@ -1575,6 +1790,7 @@ class SintelDataset(BaseFlowDataset):
             - "middle": the main frame will be in the middle of the sequence (at position sequence_length // 2),
             - "last": the main frame will be the penultimate in the sequence.
         """
+        init_args = dict(locals())
         if isinstance(pass_names, str):
             pass_names = [pass_names]
         super().__init__(
@@ -1594,6 +1810,10 @@ class SintelDataset(BaseFlowDataset):
         self.sequence_length = sequence_length
         self.sequence_position = sequence_position
 
+        if self._load_index_cache(init_args):
+            self._log_status()
+            return
+
         # Get sequence names for the given split
         if split == "test":
             split_dir = "test"
@@ -1686,6 +1906,7 @@ class SintelDataset(BaseFlowDataset):
                 self.occ_paths
             ), f"{len(self.img_paths)} vs {len(self.occ_paths)}"
 
+        self._save_index_cache()
         self._log_status()
 
 
@@ -1742,6 +1963,7 @@ class SpringDataset(BaseFlowDataset):
         reverse_only : bool, default False
             If True, only uses the backward samples, discarding the forward ones.
         """
+        init_args = dict(locals())
         if isinstance(side_names, str):
             side_names = [side_names]
         super().__init__(
@@ -1761,6 +1983,10 @@ class SpringDataset(BaseFlowDataset):
         self.sequence_length = sequence_length
         self.sequence_position = sequence_position
 
+        if self._load_index_cache(init_args):
+            self._log_status()
+            return
+
         # Get sequence names for the given split
         if split == "test":
             split_dir = "test"
@@ -1860,6 +2086,7 @@ class SpringDataset(BaseFlowDataset):
                 self.flow_paths
             ), f"{len(self.img_paths)} vs {len(self.flow_paths)}"
 
+        self._save_index_cache()
         self._log_status()
 
     def __getitem__(self, index: int) -> Dict[str, torch.Tensor]:  # noqa: C901
@@ -1961,6 +2188,7 @@ class TartanAirDataset(BaseFlowDataset):
             - "middle": the main frame will be in the middle of the sequence (at position sequence_length // 2),
             - "last": the main frame will be the penultimate in the sequence.
         """
+        init_args = dict(locals())
         if isinstance(difficulties, str):
             difficulties = [difficulties]
         difficulties = [d.capitalize() for d in difficulties]
@@ -1980,6 +2208,10 @@ class TartanAirDataset(BaseFlowDataset):
         self.sequence_length = sequence_length
         self.sequence_position = sequence_position
 
+        if self._load_index_cache(init_args):
+            self._log_status()
+            return
+
         sequence_paths = sorted([p for p in Path(root_dir).glob("*") if p.is_dir()])
 
         # Read paths from disk
@@ -2040,6 +2272,7 @@ class TartanAirDataset(BaseFlowDataset):
                 self.occ_paths
             ), f"{len(self.img_paths)} vs {len(self.occ_paths)}"
 
+        self._save_index_cache()
         self._log_status()
 
 
@@ -2077,6 +2310,7 @@ class MiddleburyDataset(BaseFlowDataset):
         get_meta : bool, default True
             Whether to get metadata.
         """
+        init_args = dict(locals())
         super().__init__(
             dataset_name="Middlebury",
             split_name=split,
@@ -2092,6 +2326,10 @@ class MiddleburyDataset(BaseFlowDataset):
         self.split = split
         self.sequence_length = 2
 
+        if self._load_index_cache(init_args):
+            self._log_status()
+            return
+
         # Get sequence names for the given split
         if split == "test":
             split_dir = "eval"
@@ -2139,6 +2377,7 @@ class MiddleburyDataset(BaseFlowDataset):
                 self.flow_paths
             ), f"{len(self.img_paths)} vs {len(self.flow_paths)}"
 
+        self._save_index_cache()
         self._log_status()
 
 
@@ -2192,6 +2431,7 @@ class MonkaaDataset(BaseFlowDataset):
             - "middle": the main frame will be in the middle of the sequence (at position sequence_length // 2),
             - "last": the main frame will be the penultimate in the sequence.
         """
+        init_args = dict(locals())
         super().__init__(
             dataset_name="Monkaa",
             split_name="trainval",
@@ -2215,6 +2455,10 @@ class MonkaaDataset(BaseFlowDataset):
         if isinstance(self.side_names, str):
             self.side_names = [self.side_names]
 
+        if self._load_index_cache(init_args):
+            self._log_status()
+            return
+
         pass_dirs = [f"frames_{p}pass" for p in self.pass_names]
 
         directions = [("into_future", "into_past")]
@@ -2310,6 +2554,7 @@ class MonkaaDataset(BaseFlowDataset):
                 self.mb_b_paths
             ), f"{len(self.img_paths)} vs {len(self.mb_b_paths)}"
 
+        self._save_index_cache()
         self._log_status()
 
 
@@ -2354,6 +2599,7 @@ class KubricDataset(BaseFlowDataset):
             - "middle": the main frame will be in the middle of the sequence (at position sequence_length // 2),
             - "last": the main frame will be the penultimate in the sequence.
         """
+        init_args = dict(locals())
         super().__init__(
             dataset_name=f"Kubric",
             split_name="trainval",
@@ -2368,6 +2614,10 @@ class KubricDataset(BaseFlowDataset):
         self.sequence_length = sequence_length
         self.sequence_position = sequence_position
 
+        if self._load_index_cache(init_args):
+            self._log_status()
+            return
+
         self.flow_format = "kubric_png"
 
         sequence_dirs = sorted([p for p in (Path(root_dir)).glob("*") if p.is_dir()])
@@ -2428,4 +2678,284 @@ class KubricDataset(BaseFlowDataset):
                     }
                 )
 
+        self._save_index_cache()
         self._log_status()
+
+
+SHARDS_INDEX_FILE_NAME = "shards_index.json"
+SHARDS_FORMAT_VERSION = 1
+
+
+def pack_flow_dataset(
+    dataset: BaseFlowDataset,
+    output_dir: Union[str, Path],
+    flow_dtype: str = "float32",
+    shard_size_mb: int = 1024,
+) -> Path:
+    """Decode all the samples of a dataset and write them into memory-mappable binary shards.
+
+    The samples are written exactly as they are returned by the dataset before the transform, i.e., with decoded uint8
+    BGR images, and flows which are already clipped and have their valid masks computed. The packed samples can then be
+    read by ShardedFlowDataset.
+
+    Parameters
+    ----------
+    dataset : BaseFlowDataset
+        The dataset to be packed. Its transform is ignored during packing.
+    output_dir : Union[str, Path]
+        Path to the directory where the shards and their index will be saved.
+    flow_dtype : str, default 'float32'
+        The type used to store the flows. It can be one of {'float16', 'float32'}.
+    shard_size_mb : int, default 1024
+        A new shard file is created once the current one reaches this size, in megabytes.
+
+    Returns
+    -------
+    Path
+        The path to the index file of the shards.
+
+    Raises
+    ------
+    ValueError
+        If flow_dtype is invalid.
+    """
+    if flow_dtype not in ["float16", "float32"]:
+        raise ValueError(
+            f"flow_dtype must be one of (float16, float32). Found: {flow_dtype}."
+        )
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    max_shard_bytes = shard_size_mb * 1024 * 1024
+
+    transform = dataset.transform
+    dataset.transform = None
+
+    samples = []
+    shard_idx = -1
+    shard_file = None
+    shard_bytes = max_shard_bytes
+    try:
+        for index in range(len(dataset)):
+            inputs = dataset[index]
+            arrays = {}
+            for key, values in inputs.items():
+                if key == "meta":
+                    continue
+                arrays[key] = []
+                for v in values:
+                    if key.startswith("flows"):
+                        v = v.astype(flow_dtype)
+                    v = np.ascontiguousarray(v)
+
+                    if shard_bytes + v.nbytes > max_shard_bytes and shard_bytes > 0:
+                        if shard_file is not None:
+                            shard_file.close()
+                        shard_idx += 1
+                        shard_bytes = 0
+                        shard_file = open(
+                            output_dir / f"shard_{shard_idx:05d}.bin", "wb"
+                        )
+
+                    shard_file.write(v.tobytes())
+                    arrays[key].append(
+                        {
+                            "shard": shard_idx,
+                            "offset": shard_bytes,
+                            "shape": list(v.shape),
+                            "dtype": str(v.dtype),
+                        }
+                    )
+                    shard_bytes += v.nbytes
+            samples.append({"arrays": arrays, "meta": inputs.get("meta", {})})
+    finally:
+        if shard_file is not None:
+            shard_file.close()
+        dataset.transform = transform
+
+    index_path = output_dir / SHARDS_INDEX_FILE_NAME
+    with open(index_path, "w") as f:
+        json.dump(
+            {
+                "version": SHARDS_FORMAT_VERSION,
+                "dataset_name": dataset.dataset_name,
+                "split_name": dataset.split_name,
+                "num_shards": shard_idx + 1,
+                "samples": samples,
+            },
+            f,
+            default=str,
+        )
+    return index_path
+
+
+class ShardedFlowDataset(BaseFlowDataset):
+    """Read samples from the binary shards written by pack_flow_dataset.
+
+    The shards are memory-mapped, so the images and flows are read directly from disk without any decoding.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        transform: Callable[[Dict[str, torch.Tensor]], Dict[str, torch.Tensor]] = None,
+        get_valid_mask: bool = True,
+        get_occlusion_mask: bool = True,
+        get_motion_boundary_mask: bool = True,
+        get_backward: bool = True,
+        get_meta: bool = True,
+    ) -> None:
+        """Initialize ShardedFlowDataset.
+
+        Parameters
+        ----------
+        root_dir : str
+            Path to the directory containing the shards and their index.
+        transform : Callable[[Dict[str, torch.Tensor]], Dict[str, torch.Tensor]], optional
+            Transform to be applied on the inputs.
+        get_valid_mask : bool, default True
+            Whether to get the valid masks, if they were packed.
+        get_occlusion_mask : bool, default True
+            Whether to get the occlusion masks, if they were packed.
+        get_motion_boundary_mask : bool, default True
+            Whether to get the motion boundary masks, if they were packed.
+        get_backward : bool, default True
+            Whether to get the backward version of the inputs, if they were packed.
+        get_meta : bool, default True
+            Whether to get metadata.
+
+        Raises
+        ------
+        ValueError
+            If the shards were written with an incompatible version of pack_flow_dataset.
+        """
+        self.root_dir = Path(root_dir)
+        with open(self.root_dir / SHARDS_INDEX_FILE_NAME, "r") as f:
+            index = json.load(f)
+        if index.get("version") != SHARDS_FORMAT_VERSION:
+            raise ValueError(
+                f"The shards in {root_dir} have version {index.get('version')}, but version {SHARDS_FORMAT_VERSION} "
+                "is required. Please pack the dataset again."
+            )
+
+        super().__init__(
+            dataset_name=index["dataset_name"],
+            split_name=index["split_name"],
+            transform=transform,
+            get_valid_mask=get_valid_mask,
+            get_occlusion_mask=get_occlusion_mask,
+            get_motion_boundary_mask=get_motion_boundary_mask,
+            get_backward=get_backward,
+            get_meta=get_meta,
+        )
+        self.num_shards = index["num_shards"]
+        self.samples = [s["arrays"] for s in index["samples"]]
+        self.metadata = [s["meta"] for s in index["samples"]]
+        self.img_paths = [m.get("image_paths", []) for m in self.metadata]
+
+        ignore_keys = []
+        if not get_valid_mask:
+            ignore_keys.extend(["valids", "valids_b"])
+        if not get_occlusion_mask:
+            ignore_keys.extend(["occs", "occs_b"])
+        if not get_motion_boundary_mask:
+            ignore_keys.extend(["mbs", "mbs_b"])
+        if not get_backward:
+            ignore_keys.extend(["flows_b", "valids_b", "occs_b", "mbs_b"])
+        self.ignore_keys = set(ignore_keys)
+
+        # The memory maps are opened lazily, so that each dataloader worker opens its own
+        self._shards = {}
+
+        self._log_status()
+
+    def __getitem__(self, index: int) -> Dict[str, torch.Tensor]:
+        """Retrieve and return one input.
+
+        Parameters
+        ----------
+        index : int
+            The index of the sample in the shards.
+
+        Returns
+        -------
+        Dict[str, torch.Tensor]
+            The retrieved input, with the same structure as in BaseFlowDataset.
+        """
+        inputs = {}
+        for key, entries in self.samples[index].items():
+            if key in self.ignore_keys:
+                continue
+            inputs[key] = [self._read_array(e) for e in entries]
+
+        if self.transform is not None:
+            inputs = self.transform(inputs)
+
+        if self.get_meta:
+            inputs["meta"] = {
+                "dataset_name": self.dataset_name,
+                "split_name": self.split_name,
+            }
+            inputs["meta"].update(self.metadata[index])
+
+        return inputs
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def get_image_size(self, index: int) -> Tuple[int, int]:
+        """Return the size of the images of one input, as recorded in the shards index.
+
+        Parameters
+        ----------
+        index : int
+            The index of the sample in the shards.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The (height, width) of the first image of the input.
+        """
+        height, width = self.samples[index]["images"][0]["shape"][:2]
+        return height, width
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_shards"] = {}
+        return state
+
+    def _read_array(self, entry: Dict[str, Any]) -> np.ndarray:
+        shard = self._shards.get(entry["shard"])
+        if shard is None:
+            shard = np.memmap(
+                self.root_dir / f"shard_{entry['shard']:05d}.bin",
+                dtype=np.uint8,
+                mode="r",
+            )
+            self._shards[entry["shard"]] = shard
+        dtype = np.dtype(entry["dtype"])
+        shape = entry["shape"]
+        num_bytes = int(np.prod(shape)) * dtype.itemsize
+        array = shard[entry["offset"] : entry["offset"] + num_bytes]
+        return array.view(dtype).reshape(shape)
+
+
+def _get_dir_stamp(dirs: Iterable[Union[str, Path]]) -> Dict[str, Optional[int]]:
+    stamp = {}
+    for d in dirs:
+        try:
+            stamp[str(d)] = os.stat(d).st_mtime_ns
+        except OSError:
+            stamp[str(d)] = None
+    return stamp
+
+
+def _read_image_size(path: Union[str, Path]) -> Tuple[int, int]:
+    # Only the header of PNG files is read. The other formats are decoded.
+    with open(path, "rb") as f:
+        header = f.read(24)
+    if header[:8] == b"\x89PNG\r\n\x1a\n" and header[12:16] == b"IHDR":
+        width, height = struct.unpack(">II", header[16:24])
+        return height, width
+    image = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+    return image.shape[0], image.shape[1]
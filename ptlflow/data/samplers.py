@@ -0,0 +1,69 @@
+"""Samplers to build batches of inputs from the flow datasets."""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import math
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from torch.utils.data import Sampler
+
+
+class ShapeBucketBatchSampler(Sampler):
+    """Group the inputs which have the same image size into batches.
+
+    The validation datasets cannot be batched directly because their images may have different sizes (e.g., KITTI).
+    This sampler separates the indices into one bucket for each image size, and then splits each bucket into batches.
+    The buckets are visited in the order in which their sizes first appear in the dataset, and the indices of each
+    bucket keep the dataset order. Therefore, datasets whose images all have the same size (e.g., Sintel) are visited
+    in the original order.
+    """
+
+    def __init__(self, image_sizes: Sequence[Tuple[int, int]], batch_size: int) -> None:
+        """Initialize ShapeBucketBatchSampler.
+
+        Parameters
+        ----------
+        image_sizes : Sequence[Tuple[int, int]]
+            The (height, width) of the images of each input of the dataset.
+        batch_size : int
+            Maximum number of inputs of each batch.
+
+        Raises
+        ------
+        ValueError
+            If batch_size is not positive.
+        """
+        if batch_size <= 0:
+            raise ValueError(f"batch_size must be positive. Found: {batch_size}.")
+
+        self.batch_size = batch_size
+        self.buckets: Dict[Tuple[int, int], List[int]] = {}
+        for i, size in enumerate(image_sizes):
+            self.buckets.setdefault(tuple(size), []).append(i)
+
+    def __iter__(self) -> Iterator[List[int]]:
+        for indices in self.buckets.values():
+            for i in range(0, len(indices), self.batch_size):
+                yield indices[i : i + self.batch_size]
+
+    def __len__(self) -> int:
+        return sum(
+            [
+                math.ceil(len(indices) / self.batch_size)
+                for indices in self.buckets.values()
+            ]
+        )
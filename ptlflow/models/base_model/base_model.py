@@ -25,6 +25,7 @@ In order to use this module, the concrete model should just need to:
 import logging
 from abc import abstractmethod
 from argparse import ArgumentParser, Namespace
+from pathlib import Path
 from packaging import version
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
@@ -42,13 +43,21 @@ from ptlflow.data.datasets import (
     Hd1kDataset,
     KittiDataset,
     KubricDataset,
+    ShardedFlowDataset,
     SintelDataset,
     FlyingThings3DDataset,
     FlyingThings3DSubsetDataset,
     SpringDataset,
     TartanAirDataset,
 )
-from ptlflow.utils.utils import InputPadder, InputScaler
+from ptlflow.data.samplers import ShapeBucketBatchSampler
+from ptlflow.utils.utils import (
+    EarlyExitMonitor,
+    FeatureCache,
+    InputPadder,
+    InputScaler,
+    LRUCache,
+)
 from ptlflow.utils.utils import config_logging, make_divisible, bgr_val_as_tensor
 from ptlflow.utils.flow_metrics import FlowMetrics
 
@@ -96,6 +105,31 @@ class BaseModel(pl.LightningModule):
         self.last_inputs = None
         self.last_predictions = None
 
+        # InputPadder and InputScaler only depend on the input shape, so they are reused across calls
+        self._image_resizer_cache = LRUCache(max_size=8)
+
+        # Features of the last second image, to be reused as the first image of the next pair. See get_cached_features()
+        self._feature_cache = FeatureCache()
+
+        if "warm_start_interpolation" not in self.args:
+            self.args.warm_start_interpolation = "griddata"
+        if "feature_cache" not in self.args:
+            self.args.feature_cache = False
+        if "early_exit_threshold" not in self.args:
+            self.args.early_exit_threshold = None
+        if "early_exit_statistic" not in self.args:
+            self.args.early_exit_statistic = "mean"
+        if "early_exit_percentile" not in self.args:
+            self.args.early_exit_percentile = 90.0
+        if "early_exit_min_iters" not in self.args:
+            self.args.early_exit_min_iters = 1
+        if "val_batch_size" not in self.args:
+            self.args.val_batch_size = 1
+        if "val_num_workers" not in self.args:
+            self.args.val_num_workers = 1
+        if "val_pin_memory" not in self.args:
+            self.args.val_pin_memory = False
+
         if version.parse(pl.__version__) >= version.parse("1.6.0"):
             self.save_hyperparameters(
                 ignore=["loss_fn"],
@@ -120,6 +154,86 @@ class BaseModel(pl.LightningModule):
             self.extra_params = {}
         self.extra_params[name] = value
 
+    def get_cached_features(
+        self, image1: torch.Tensor, inputs: Dict[str, Any]
+    ) -> Optional[Any]:
+        """Return the features of image1 computed in the previous call, if they are available.
+
+        When --feature_cache is enabled, models which encode each image separately can use this method to reuse the
+        features of the second image of the previous pair as the features of the first image of the current one. A model
+        would use it as:
+
+        >>>
+        fmap1 = self.get_cached_features(image1, inputs)
+        if fmap1 is None:
+            fmap1, fmap2 = self.fnet([image1, image2])
+        else:
+            fmap2 = self.fnet(image2)
+        self.cache_features(image2, fmap2, inputs)
+
+        The cache is never used in training mode, or when --feature_cache is not set. The frames are matched by
+        inputs["meta"]["image_paths"] when it is available, or by comparing the image tensors otherwise. The cache is
+        cleared when inputs["meta"]["is_seq_start"] is True. See ptlflow.utils.utils.FeatureCache.
+
+        Parameters
+        ----------
+        image1 : torch.Tensor
+            The first image of the current pair, after preprocessing.
+        inputs : Dict[str, Any]
+            The inputs given to forward().
+
+        Returns
+        -------
+        Optional[Any]
+            The cached features of image1, or None if they are not available.
+        """
+        if not self.args.feature_cache or self.training:
+            return None
+        return self._feature_cache.get(image1, inputs)
+
+    def cache_features(
+        self, image2: torch.Tensor, features: Any, inputs: Dict[str, Any]
+    ) -> None:
+        """Store the features of the second image to be reused in the next call. See get_cached_features().
+
+        Parameters
+        ----------
+        image2 : torch.Tensor
+            The second image of the current pair, after preprocessing.
+        features : Any
+            The features of image2.
+        inputs : Dict[str, Any]
+            The inputs given to forward().
+        """
+        if self.args.feature_cache and not self.training:
+            self._feature_cache.update(image2, features, inputs)
+
+    def clear_feature_cache(self) -> None:
+        """Remove the features stored by cache_features()."""
+        self._feature_cache.clear()
+
+    def get_early_exit_monitor(self) -> Optional[EarlyExitMonitor]:
+        """Create a monitor to stop the recurrent refinement early when the flow converges.
+
+        Models with iterative refinement can call it before their refinement loop. See
+        ptlflow.utils.utils.EarlyExitMonitor for an example of how to use it. The models that use it also add the number
+        of iterations used for each sample to their outputs, as outputs["iters"].
+
+        Returns
+        -------
+        Optional[EarlyExitMonitor]
+            The monitor configured by the --early_exit_* arguments, or None if --early_exit_threshold is not set or the
+            model is in training mode.
+        """
+        if self.args.early_exit_threshold is None or self.training:
+            return None
+        return EarlyExitMonitor(
+            threshold=self.args.early_exit_threshold,
+            statistic=self.args.early_exit_statistic,
+            percentile=self.args.early_exit_percentile,
+            min_iters=self.args.early_exit_min_iters,
+        )
+
     @staticmethod
     def add_model_specific_args(
         parent_parser: Optional[ArgumentParser] = None,
@@ -160,6 +274,26 @@ class BaseModel(pl.LightningModule):
         parser.add_argument(
             "--train_transform_fp16", action="store_true", default=False, help=""
         )
+        parser.add_argument(
+            "--val_batch_size",
+            type=int,
+            default=1,
+            help=(
+                "Batch size for validation and testing. The inputs are grouped by image size, so that only inputs with the "
+                "same size are batched together. See ptlflow.data.samplers.ShapeBucketBatchSampler."
+            ),
+        )
+        parser.add_argument(
+            "--val_num_workers",
+            type=int,
+            default=1,
+            help="Number of workers to load the validation and test datasets.",
+        )
+        parser.add_argument(
+            "--val_pin_memory",
+            action="store_true",
+            help="If set, the validation and test dataloaders use pinned memory, to speed up the copies to the GPU.",
+        )
         parser.add_argument("--lr", type=float, default=1e-4)
         parser.add_argument("--wdecay", type=float, default=1e-4)
         parser.add_argument(
@@ -206,6 +340,56 @@ class BaseModel(pl.LightningModule):
                 "as a path to a local file."
             ),
         )
+        parser.add_argument(
+            "--warm_start_interpolation",
+            type=str,
+            default="griddata",
+            choices=["griddata", "torch"],
+            help=(
+                "How to forward interpolate the previous flow prediction when warm starting. 'griddata' uses the original "
+                "RAFT implementation on the CPU. 'torch' uses a batched approximation that runs on the same device as the model. "
+                "See ptlflow.utils.utils.forward_interpolate_batch for more details."
+            ),
+        )
+        parser.add_argument(
+            "--feature_cache",
+            action="store_true",
+            help=(
+                "If set, the models that support it reuse the features of the second image of a pair as the features of "
+                "the first image of the next pair. Only useful when the inputs are consecutive frames of a video, and the "
+                "features are only reused when the whole batch matches, so it works best with batch size 1. It is ignored "
+                "during training."
+            ),
+        )
+        parser.add_argument(
+            "--early_exit_threshold",
+            type=float,
+            default=None,
+            help=(
+                "If set, the models with recurrent refinement (e.g., RAFT) stop iterating for a sample once the "
+                "magnitude of its flow update is smaller than this value, in pixels at the resolution of the refinement. "
+                "The number of iterations (e.g., --iters) becomes the maximum. It is ignored during training."
+            ),
+        )
+        parser.add_argument(
+            "--early_exit_statistic",
+            type=str,
+            default="mean",
+            choices=["mean", "percentile"],
+            help="How the update magnitudes of all the pixels are summarized to be compared with --early_exit_threshold.",
+        )
+        parser.add_argument(
+            "--early_exit_percentile",
+            type=float,
+            default=90.0,
+            help="The percentile used when --early_exit_statistic is percentile.",
+        )
+        parser.add_argument(
+            "--early_exit_min_iters",
+            type=int,
+            default=1,
+            help="Minimum number of refinement iterations before early exit is allowed.",
+        )
         return parser
 
     def preprocess_images(
@@ -245,7 +429,8 @@ class BaseModel(pl.LightningModule):
             If True, flip the channels to convert from BGR to RGB.
         image_resizer : Optional[Union[InputPadder, InputScaler]]
             An instance of InputPadder or InputScaler that will be used to resize the images.
-            If not provided, a new one will be created based on the given resize_mode.
+            If not provided, one will be created based on the given resize_mode, or reused from a previous call with the
+            same input size and resize parameters.
         resize_mode : str, default "pad"
             How to resize the input. Accepted values are "pad" and "interpolation".
         target_size : Optional[Tuple[int, int]], default None
@@ -284,6 +469,20 @@ class BaseModel(pl.LightningModule):
         if target_size is not None:
             stride = None
 
+        if image_resizer is None:
+            cache_key = (
+                resize_mode,
+                tuple(images.shape[-2:]),
+                stride,
+                None if target_size is None else tuple(target_size),
+                pad_mode,
+                pad_value,
+                pad_two_side,
+                interpolation_mode,
+                interpolation_align_corners,
+            )
+            image_resizer = self._image_resizer_cache.get(cache_key)
+
         if image_resizer is None:
             if resize_mode == "pad":
                 image_resizer = InputPadder(
@@ -306,6 +505,7 @@ class BaseModel(pl.LightningModule):
                 raise ValueError(
                     f"resize_mode must be one of (pad, interpolation). Found: {resize_mode}."
                 )
+            self._image_resizer_cache[cache_key] = image_resizer
 
         images = image_resizer.fill(images)
         images = images.contiguous()
@@ -682,16 +882,7 @@ class BaseModel(pl.LightningModule):
             dataset = getattr(self, f"_get_{dataset_name}_dataset")(
                 False, *parsed_vals[2:]
             )
-            dataloaders.append(
-                DataLoader(
-                    dataset,
-                    1,
-                    shuffle=False,
-                    num_workers=1,
-                    pin_memory=False,
-                    drop_last=False,
-                )
-            )
+            dataloaders.append(self._get_eval_dataloader(dataset))
 
             self.val_dataloader_names.append("-".join(parsed_vals[1:]))
             self.val_dataloader_lengths.append(len(dataset))
@@ -732,21 +923,43 @@ class BaseModel(pl.LightningModule):
             dataset = getattr(self, f"_get_{dataset_tokens[0]}_dataset")(
                 False, *dataset_tokens[1:]
             )
-            dataloaders.append(
-                DataLoader(
-                    dataset,
-                    1,
-                    shuffle=False,
-                    num_workers=1,
-                    pin_memory=False,
-                    drop_last=False,
-                )
-            )
+            dataloaders.append(self._get_eval_dataloader(dataset, batch_size=1))
 
             self.test_dataloader_names.append(dataset_id)
 
         return dataloaders
 
+    def _get_eval_dataloader(
+        self, dataset: Dataset, batch_size: Optional[int] = None
+    ) -> DataLoader:
+        if batch_size is None:
+            batch_size = self.args.val_batch_size
+        if batch_size > 1 and hasattr(dataset, "get_image_size"):
+            # Only inputs with the same size can be stacked into one batch
+            batch_sampler = ShapeBucketBatchSampler(
+                [dataset.get_image_size(i) for i in range(len(dataset))], batch_size
+            )
+            return DataLoader(
+                dataset,
+                batch_sampler=batch_sampler,
+                num_workers=self.args.val_num_workers,
+                pin_memory=self.args.val_pin_memory,
+            )
+
+        if batch_size > 1:
+            logging.warning(
+                "%s does not provide the image sizes, it will be loaded with batch size 1.",
+                dataset.__class__.__name__,
+            )
+        return DataLoader(
+            dataset,
+            1,
+            shuffle=False,
+            num_workers=self.args.val_num_workers,
+            pin_memory=self.args.val_pin_memory,
+            drop_last=False,
+        )
+
     def parse_dataset_selection(
         self,
         dataset_selection: str,
@@ -1216,6 +1429,85 @@ class BaseModel(pl.LightningModule):
         )
         return dataset
 
+    def _get_shards_dataset(self, is_train: bool, *args: str) -> Dataset:
+        device = "cuda" if self.args.train_transform_cuda else "cpu"
+        md = make_divisible
+
+        if len(args) == 0:
+            raise ValueError(
+                "The name of the shards directory must be provided, e.g., shards-sintel_clean_trainval."
+            )
+        shards_name = args[0]
+        if getattr(self.args, "shards_root_dir", None) is None:
+            raise ValueError(
+                "The path to the packed datasets must be provided by --shards_root_dir or in datasets.yml."
+            )
+
+        sparse = False
+        get_occlusion_mask = False
+        get_backward = False
+        for v in args[1:]:
+            if v == "sparse":
+                sparse = True
+            elif v == "occ":
+                get_occlusion_mask = True
+            elif v == "back":
+                get_backward = True
+            else:
+                raise ValueError(f"Invalid arg: {v}")
+
+        if is_train:
+            if self.args.train_crop_size is None:
+                cy, cx = (md(368, self.output_stride), md(768, self.output_stride))
+                self.args.train_crop_size = (cy, cx)
+                logging.warning(
+                    "--train_crop_size is not set. It will be set as (%d, %d).", cy, cx
+                )
+            else:
+                cy, cx = (
+                    md(self.args.train_crop_size[0], self.output_stride),
+                    md(self.args.train_crop_size[1], self.output_stride),
+                )
+
+            # Same transforms as Sintel, or as KITTI for sparse groundtruth
+            if sparse:
+                transform = ft.Compose(
+                    [
+                        ft.ToTensor(device=device, fp16=self.args.train_transform_fp16),
+                        ft.RandomScaleAndCrop(
+                            (cy, cx), (-0.2, 0.4), (-0.2, 0.2), sparse=True
+                        ),
+                        ft.ColorJitter(0.4, 0.4, 0.4, 0.5 / 3.14, 0.2),
+                        ft.GaussianNoise(0.02),
+                        ft.RandomPatchEraser(
+                            0.5, (int(1), int(3)), (int(50), int(100)), "mean"
+                        ),
+                    ]
+                )
+            else:
+                transform = ft.Compose(
+                    [
+                        ft.ToTensor(device=device, fp16=self.args.train_transform_fp16),
+                        ft.RandomScaleAndCrop((cy, cx), (-0.2, 0.6), (-0.2, 0.2)),
+                        ft.ColorJitter(0.4, 0.4, 0.4, 0.5 / 3.14, 0.2),
+                        ft.GaussianNoise(0.02),
+                        ft.RandomPatchEraser(
+                            0.5, (int(1), int(3)), (int(50), int(100)), "mean"
+                        ),
+                        ft.RandomFlip(min(0.5, 0.5), min(0.1, 0.5)),
+                    ]
+                )
+        else:
+            transform = ft.ToTensor()
+
+        dataset = ShardedFlowDataset(
+            Path(self.args.shards_root_dir) / shards_name,
+            transform=transform,
+            get_occlusion_mask=get_occlusion_mask,
+            get_backward=get_backward,
+        )
+        return dataset
+
     def _get_spring_dataset(self, is_train: bool, *args: str) -> Dataset:
         device = "cuda" if self.args.train_transform_cuda else "cpu"
         md = make_divisible
@@ -327,7 +327,10 @@ class CRAFT(BaseModel):
             inputs.get("prev_preds") is not None
             and inputs["prev_preds"].get("flow_small") is not None
         ):
-            forward_flow = forward_interpolate_batch(inputs["prev_preds"]["flow_small"])
+            forward_flow = forward_interpolate_batch(
+                inputs["prev_preds"]["flow_small"],
+                method=self.args.warm_start_interpolation,
+            )
             coords1 = coords1 + forward_flow
 
         # If craft, the correlation volume is computed in corr_fn.update().
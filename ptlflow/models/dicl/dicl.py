@@ -10,7 +10,7 @@ try:
     from spatial_correlation_sampler import SpatialCorrelationSampler
 except ModuleNotFoundError:
     from ptlflow.utils.correlation import (
-        IterSpatialCorrelationSampler as SpatialCorrelationSampler,
+        BatchedSpatialCorrelationSampler as SpatialCorrelationSampler,
     )
 
 from .loss_functions import MultiScale_UP
@@ -243,7 +243,10 @@ class DIP(BaseModel):
             inputs.get("prev_preds") is not None
             and inputs["prev_preds"].get("flow_small") is not None
         ):
-            init_flow = forward_interpolate_batch(inputs["prev_preds"]["flow_small"])
+            init_flow = forward_interpolate_batch(
+                inputs["prev_preds"]["flow_small"],
+                method=self.args.warm_start_interpolation,
+            )
 
         if not self.training and init_flow is not None:
             flow_up = self.inference(
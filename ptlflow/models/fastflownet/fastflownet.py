@@ -11,7 +11,7 @@ try:
     from spatial_correlation_sampler import SpatialCorrelationSampler
 except ModuleNotFoundError:
     from ptlflow.utils.correlation import (
-        IterSpatialCorrelationSampler as SpatialCorrelationSampler,
+        BatchedSpatialCorrelationSampler as SpatialCorrelationSampler,
     )
 from einops import rearrange
 import torch
@@ -326,7 +326,9 @@ class MemoryDecoder(nn.Module):
         coords0, coords1 = initialize_flow(context)
 
         if prev_flow is not None:
-            forward_flow = forward_interpolate_batch(prev_flow)
+            forward_flow = forward_interpolate_batch(
+                prev_flow, method=self.cfg.warm_start_interpolation
+            )
             coords1 = coords1 + forward_flow
 
         # flow = coords1
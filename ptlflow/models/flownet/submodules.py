@@ -8,7 +8,7 @@ try:
     from spatial_correlation_sampler import spatial_correlation_sample
 except ModuleNotFoundError:
     from ptlflow.utils.correlation import (
-        iter_spatial_correlation_sample as spatial_correlation_sample,
+        batched_spatial_correlation_sample as spatial_correlation_sample,
     )
 
 
@@ -98,6 +98,16 @@ class GMFlow(BaseModel):
         parser.add_argument("--num_transformer_layers", type=int, default=6)
         parser.add_argument("--pred_bidir_flow", action="store_true")
         parser.add_argument("--prop_radius_list", type=int, nargs="+", default=(-1,))
+        parser.add_argument(
+            "--matching_max_chunk_elements",
+            type=int,
+            default=None,
+            help=(
+                "If set, the global matching and the full attentions are computed in tiles with an online softmax, "
+                "with at most this many scores at once. This reduces the peak memory at high resolutions, "
+                "where the dense (H*W)x(H*W) matrices do not fit. The default None uses the dense computation."
+            ),
+        )
         parser.add_argument("--upsample_factor", type=int, default=8)
         return parser
 
@@ -183,9 +193,14 @@ class GMFlow(BaseModel):
         flow_preds = []
 
         # resolution low to high
-        feature0_list, feature1_list = self.extract_feature(
-            img0, img1
-        )  # list of features
+        feature0_list = self.get_cached_features(img0, inputs)
+        if feature0_list is None:
+            feature0_list, feature1_list = self.extract_feature(
+                img0, img1
+            )  # list of features
+        else:
+            feature1_list = self.backbone(img1)[::-1]
+        self.cache_features(img1, feature1_list, inputs)
 
         flow = None
 
@@ -232,13 +247,19 @@ class GMFlow(BaseModel):
 
             # Transformer
             feature0, feature1 = self.transformer(
-                feature0, feature1, attn_num_splits=attn_splits
+                feature0,
+                feature1,
+                attn_num_splits=attn_splits,
+                max_chunk_elements=self.args.matching_max_chunk_elements,
             )
 
             # correlation and softmax
             if corr_radius == -1:  # global matching
                 flow_pred = global_correlation_softmax(
-                    feature0, feature1, self.args.pred_bidir_flow
+                    feature0,
+                    feature1,
+                    self.args.pred_bidir_flow,
+                    max_chunk_elements=self.args.matching_max_chunk_elements,
                 )[0]
             else:  # local matching
                 flow_pred = local_correlation_softmax(feature0, feature1, corr_radius)[
@@ -270,6 +291,7 @@ class GMFlow(BaseModel):
                 flow.detach(),
                 local_window_attn=prop_radius > 0,
                 local_window_radius=prop_radius,
+                max_chunk_elements=self.args.matching_max_chunk_elements,
             )
 
             # bilinear upsampling at training time except the last one
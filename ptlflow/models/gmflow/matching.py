@@ -2,13 +2,23 @@ import torch
 import torch.nn.functional as F
 
 from .geometry import coords_grid, generate_window_grid, normalize_coords
+from ptlflow.utils.attention import (
+    DEFAULT_ATTENTION_MAX_CHUNK_ELEMENTS,
+    chunked_softmax_attention,
+)
 
 
 def global_correlation_softmax(
     feature0,
     feature1,
     pred_bidir_flow=False,
+    max_chunk_elements=None,
 ):
+    if max_chunk_elements is not None:
+        return chunked_global_correlation_softmax(
+            feature0, feature1, pred_bidir_flow, max_chunk_elements
+        )
+
     # global correlation
     b, c, h, w = feature0.shape
     feature0 = feature0.view(b, c, -1).permute(0, 2, 1)  # [B, H*W, C]
@@ -46,6 +56,47 @@ def global_correlation_softmax(
     return flow, prob
 
 
+def chunked_global_correlation_softmax(
+    feature0,
+    feature1,
+    pred_bidir_flow=False,
+    max_chunk_elements=DEFAULT_ATTENTION_MAX_CHUNK_ELEMENTS,
+):
+    # same as global_correlation_softmax, but the [B, H*W, H*W] correlation is
+    # computed in tiles with an online softmax, so it is never stored.
+    # The returned prob is None.
+    b, c, h, w = feature0.shape
+    feature0 = feature0.view(b, c, -1).permute(0, 2, 1)  # [B, H*W, C]
+    feature1 = feature1.view(b, c, -1).permute(0, 2, 1)  # [B, H*W, C]
+
+    init_grid = coords_grid(
+        b, h, w, dtype=feature0.dtype, device=feature0.device
+    )  # [B, 2, H, W]
+    grid = init_grid.view(b, 2, -1).permute(0, 2, 1)  # [B, H*W, 2]
+
+    correspondence = chunked_softmax_attention(
+        feature0, feature1, grid, max_chunk_elements=max_chunk_elements
+    )  # [B, H*W, 2]
+
+    if pred_bidir_flow:
+        # the backward flow uses the transposed correlation
+        correspondence_bwd = chunked_softmax_attention(
+            feature1, feature0, grid, max_chunk_elements=max_chunk_elements
+        )
+        correspondence = torch.cat(
+            (correspondence, correspondence_bwd), dim=0
+        )  # [2*B, H*W, 2]
+        init_grid = init_grid.repeat(2, 1, 1, 1)  # [2*B, 2, H, W]
+        b = b * 2
+
+    correspondence = correspondence.view(b, h, w, 2).permute(
+        0, 3, 1, 2
+    )  # [B, 2, H, W]
+    flow = correspondence - init_grid
+
+    return flow, None
+
+
 def local_correlation_softmax(
     feature0,
     feature1,
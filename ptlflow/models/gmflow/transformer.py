@@ -3,12 +3,19 @@ import torch.nn as nn
 import torch.nn.functional as F
 
 from .utils import split_feature, merge_splits
+from ptlflow.utils.attention import chunked_softmax_attention
 
 
-def single_head_full_attention(q, k, v):
+def single_head_full_attention(q, k, v, max_chunk_elements=None):
     # q, k, v: [B, L, C]
     assert q.dim() == k.dim() == v.dim() == 3
 
+    if max_chunk_elements is not None:
+        # tiled computation that does not store the [B, L, L] scores
+        return chunked_softmax_attention(
+            q, k, v, max_chunk_elements=max_chunk_elements
+        )
+
     scores = torch.matmul(q, k.permute(0, 2, 1)) / (q.size(2) ** 0.5)  # [B, L, L]
     attn = torch.softmax(scores, dim=2)  # [B, L, L]
     out = torch.matmul(attn, v)  # [B, L, C]
@@ -177,6 +184,7 @@ class TransformerLayer(nn.Module):
         width=None,
         shifted_window_attn_mask=None,
         attn_num_splits=None,
+        max_chunk_elements=None,
         **kwargs,
     ):
         # source, target: [B, L, C]
@@ -204,7 +212,9 @@ class TransformerLayer(nn.Module):
                     attn_mask=shifted_window_attn_mask,
                 )
         else:
-            message = single_head_full_attention(query, key, value)  # [B, L, C]
+            message = single_head_full_attention(
+                query, key, value, max_chunk_elements=max_chunk_elements
+            )  # [B, L, C]
 
         message = self.merge(message)  # [B, L, C]
         message = self.norm1(message)
@@ -255,6 +265,7 @@ class TransformerBlock(nn.Module):
         width=None,
         shifted_window_attn_mask=None,
         attn_num_splits=None,
+        max_chunk_elements=None,
         **kwargs,
     ):
         # source, target: [B, L, C]
@@ -267,6 +278,7 @@ class TransformerBlock(nn.Module):
             width=width,
             shifted_window_attn_mask=shifted_window_attn_mask,
             attn_num_splits=attn_num_splits,
+            max_chunk_elements=max_chunk_elements,
         )
 
         # cross attention and ffn
@@ -277,6 +289,7 @@ class TransformerBlock(nn.Module):
             width=width,
             shifted_window_attn_mask=shifted_window_attn_mask,
             attn_num_splits=attn_num_splits,
+            max_chunk_elements=max_chunk_elements,
         )
 
         return source
@@ -323,6 +336,7 @@ class FeatureTransformer(nn.Module):
         feature0,
         feature1,
         attn_num_splits=None,
+        max_chunk_elements=None,
         **kwargs,
     ):
         b, c, h, w = feature0.shape
@@ -360,6 +374,7 @@ class FeatureTransformer(nn.Module):
                 width=w,
                 shifted_window_attn_mask=shifted_window_attn_mask,
                 attn_num_splits=attn_num_splits,
+                max_chunk_elements=max_chunk_elements,
             )
 
             # update feature1
@@ -404,6 +419,7 @@ class FeatureFlowAttention(nn.Module):
         flow,
         local_window_attn=False,
         local_window_radius=1,
+        max_chunk_elements=None,
         **kwargs,
     ):
         # q, k: feature [B, C, H, W], v: flow [B, 2, H, W]
@@ -427,10 +443,17 @@ class FeatureFlowAttention(nn.Module):
 
         value = flow.view(b, flow.size(1), h * w).permute(0, 2, 1)  # [B, H*W, 2]
 
-        scores = torch.matmul(query, key.permute(0, 2, 1)) / (c**0.5)  # [B, H*W, H*W]
-        prob = torch.softmax(scores, dim=-1)
+        if max_chunk_elements is not None:
+            out = chunked_softmax_attention(
+                query, key, value, max_chunk_elements=max_chunk_elements
+            )  # [B, H*W, 2]
+        else:
+            scores = torch.matmul(query, key.permute(0, 2, 1)) / (
+                c**0.5
+            )  # [B, H*W, H*W]
+            prob = torch.softmax(scores, dim=-1)
 
-        out = torch.matmul(prob, value)  # [B, H*W, 2]
+            out = torch.matmul(prob, value)  # [B, H*W, 2]
         out = out.view(b, h, w, value.size(-1)).permute(0, 3, 1, 2)  # [B, 2, H, W]
 
         return out
@@ -5,7 +5,7 @@ try:
     from spatial_correlation_sampler import SpatialCorrelationSampler
 except ModuleNotFoundError:
     from ptlflow.utils.correlation import (
-        IterSpatialCorrelationSampler as SpatialCorrelationSampler,
+        BatchedSpatialCorrelationSampler as SpatialCorrelationSampler,
     )
 import torch
 import torch.nn as nn
@@ -12,7 +12,7 @@ try:
     from spatial_correlation_sampler import SpatialCorrelationSampler
 except ModuleNotFoundError:
     from ptlflow.utils.correlation import (
-        IterSpatialCorrelationSampler as SpatialCorrelationSampler,
+        BatchedSpatialCorrelationSampler as SpatialCorrelationSampler,
     )
 
 from ..base_model.base_model import BaseModel
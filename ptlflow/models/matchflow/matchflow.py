@@ -298,7 +298,9 @@ class MatchFlow(BaseModel):
         coords0, coords1 = self.initialize_flow(image1)
 
         if flow_prev is not None:
-            forward_flow = forward_interpolate_batch(flow_prev)
+            forward_flow = forward_interpolate_batch(
+                flow_prev, method=self.args.warm_start_interpolation
+            )
             coords1 = coords1 + forward_flow
 
         flow_predictions = []
@@ -69,6 +69,27 @@ def do_softmax(
     return affinity
 
 
+def do_sparse_softmax(similarity, top_k: int):
+    # top-k softmax which keeps the result in sparse form, instead of scattering it into a
+    # dense zeroed matrix as do_softmax does
+    # similarity: B x N x [HW/P]
+    # returns the weights and the memory indices of the top-k elements, both B x top_k x [HW/P]
+    values, indices = torch.topk(similarity, k=min(top_k, similarity.shape[1]), dim=1)
+    weights = torch.softmax(values, dim=1)
+    return weights, indices
+
+
+def sparse_readout(weights, indices, mv):
+    # equivalent to mv @ affinity, where affinity is the dense version of the output of do_sparse_softmax
+    # weights, indices: B x top_k x [HW/P]
+    # mv: B x CV x N
+    B, K, L = indices.shape
+    CV = mv.shape[1]
+    mo = torch.gather(mv, 2, indices.view(B, 1, K * L).expand(B, CV, K * L))
+    mem = (mo.view(B, CV, K, L) * weights[:, None]).sum(2)
+    return mem
+
+
 def get_affinity(mk, ms, qk, qe):
     # shorthand used in training with no top-k
     similarity = get_similarity(mk, ms, qk, qe)
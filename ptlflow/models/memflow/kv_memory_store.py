@@ -172,3 +172,129 @@ class KeyValueMemoryStore:
     @property
     def selection(self):
         return self.e
+
+
+class RingKeyValueMemoryStore:
+    """
+    Same role as KeyValueMemoryStore, but the keys and values are stored in preallocated ring buffers.
+
+    Adding new elements and discarding the oldest ones only moves the start and size of the valid
+    region, instead of concatenating and slicing the tensors at every memory frame.
+
+    The readout does not depend on the order of the memory elements. Therefore, key, value and the
+    usage counters may return the valid elements in the order of the buffer slots. They always use
+    the same order, so the usage given to update_usage() matches the order of key and value.
+    """
+
+    def __init__(self, count_usage: bool, capacity: int):
+        self.count_usage = count_usage
+        self.capacity = capacity
+
+        self.k = self.v = None
+        if self.count_usage:
+            self.use_count = self.life_count = None
+
+        self.start = 0
+        self._size = 0
+
+    def add(self, key, value):
+        num_new = key.shape[-1]
+        if (
+            self.k is None
+            or self.k.shape[:2] != key.shape[:2]
+            or self.v.shape[:2] != value.shape[:2]
+        ):
+            self._allocate(key, value, max(self.capacity, num_new))
+        elif self._size + num_new > self.k.shape[-1]:
+            raise RuntimeError(
+                f"The memory is full ({self._size} of {self.k.shape[-1]} elements), remove the old elements before adding new ones."
+            )
+
+        end = self.start + self._size
+        for dst, src in self._split_range(end, num_new):
+            self.k[:, :, dst] = key[:, :, src]
+            self.v[:, :, dst] = value[:, :, src]
+            if self.count_usage:
+                self.use_count[:, :, dst] = 0
+                self.life_count[:, :, dst] = 1e-7
+        self._size += num_new
+
+    def update_usage(self, usage):
+        # increase all life count by 1
+        # increase use of indexed elements
+        if not self.count_usage:
+            return
+
+        usage = usage.view(self.use_count.shape[0], 1, -1)
+        offset = 0
+        for s in self._region_slices():
+            n = s.stop - s.start
+            self.use_count[:, :, s] += usage[:, :, offset : offset + n]
+            self.life_count[:, :, s] += 1
+            offset += n
+
+    def keep_newest(self, num_keep: int):
+        # equivalent to KeyValueMemoryStore.sieve_by_range(0, -num_keep)
+        num_remove = max(0, self._size - num_keep)
+        if self.k is not None:
+            self.start = (self.start + num_remove) % self.k.shape[-1]
+        self._size -= num_remove
+
+    def get_usage(self):
+        # return normalized usage
+        if not self.count_usage:
+            raise RuntimeError("I did not count usage!")
+        return self._gather(self.use_count) / self._gather(self.life_count)
+
+    def engaged(self):
+        return self._size > 0
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def key(self):
+        return self._gather(self.k)
+
+    @property
+    def value(self):
+        return self._gather(self.v)
+
+    def _allocate(self, key, value, capacity):
+        self.k = key.new_zeros(*key.shape[:2], capacity)
+        self.v = value.new_zeros(*value.shape[:2], capacity)
+        if self.count_usage:
+            self.use_count = key.new_zeros(key.shape[0], 1, capacity)
+            self.life_count = key.new_zeros(key.shape[0], 1, capacity)
+        self.start = 0
+        self._size = 0
+
+    def _split_range(self, begin, length):
+        # destination and source slices to write length elements starting at slot begin
+        capacity = self.k.shape[-1]
+        begin = begin % capacity
+        first = min(length, capacity - begin)
+        ranges = [(slice(begin, begin + first), slice(0, first))]
+        if first < length:
+            ranges.append((slice(0, length - first), slice(first, length)))
+        return ranges
+
+    def _region_slices(self):
+        capacity = self.k.shape[-1]
+        end = self.start + self._size
+        if self._size == capacity:
+            # the whole buffer is valid, so it can be used without reordering
+            return [slice(0, capacity)]
+        elif end <= capacity:
+            return [slice(self.start, end)]
+        else:
+            return [slice(self.start, capacity), slice(0, end - capacity)]
+
+    def _gather(self, x):
+        if x is None or self._size == 0:
+            return None
+        slices = self._region_slices()
+        if len(slices) == 1:
+            return x[:, :, slices[0]]
+        return torch.cat([x[:, :, s] for s in slices], -1)
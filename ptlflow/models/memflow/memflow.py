@@ -196,7 +196,10 @@ class MemFlow(BaseModel):
             inputs.get("prev_preds") is not None
             and inputs["prev_preds"].get("flow_small") is not None
         ):
-            flow_init = forward_interpolate_batch(inputs["prev_preds"]["flow_small"])
+            flow_init = forward_interpolate_batch(
+                inputs["prev_preds"]["flow_small"],
+                method=self.args.warm_start_interpolation,
+            )
 
         # image: 1*2*3*H*W
         self.curr_ti += 1
@@ -218,6 +221,11 @@ class MemFlow(BaseModel):
         # predict flow
         corr_fn = CorrBlock(fmaps[:, 0, ...], fmaps[:, 1, ...], num_levels=4, radius=4)
 
+        # the memory affinity only depends on the keys, so it is computed once per frame
+        memory_affinity = self.memory.get_affinity(
+            query, key, scale=self.network.att.scale
+        )
+        early_exit = self.get_early_exit_monitor()
         for itr in range(self.args.decoder_depth):
             coords1 = coords1.detach()
             corr = corr_fn(coords1)  # index correlation volume
@@ -227,9 +235,7 @@ class MemFlow(BaseModel):
                 current_value,
             ) = self.network.update_block.get_motion_and_value(flow, corr)
             # get global motion
-            memory_readout = self.memory.match_memory(
-                query, key, current_value, scale=self.network.att.scale
-            )
+            memory_readout = self.memory.read_memory(memory_affinity, current_value)
             motion_features_global = (
                 motion_features
                 + self.network.update_block.aggregator.gamma * memory_readout
@@ -237,8 +243,12 @@ class MemFlow(BaseModel):
             net, up_mask, delta_flow = self.network.update_block(
                 net, inp, motion_features, motion_features_global
             )
+            if early_exit is not None:
+                delta_flow = early_exit.step(delta_flow)
             # F(t+1) = F(t) + \Delta(t)
             coords1 = coords1 + delta_flow
+            if early_exit is not None and early_exit.all_converged:
+                break
         # upsample predictions
         flow_up = self.network.upsample_flow(coords1 - coords0, up_mask)
         flow_up = self.postprocess_predictions(flow_up, image_resizer, is_flow=True)
@@ -252,6 +262,8 @@ class MemFlow(BaseModel):
         #     outputs = {"flows": flow_up[:, None], "flow_preds": flow_predictions}
         # else:
         outputs = {"flows": flow_up[:, None], "flow_small": coords1 - coords0}
+        if early_exit is not None:
+            outputs["iters"] = early_exit.iters
 
         return outputs
 
@@ -1,5 +1,5 @@
 import torch
-from .kv_memory_store import KeyValueMemoryStore
+from .kv_memory_store import RingKeyValueMemoryStore
 from .MemFlowNet.memory_util import *
 
 
@@ -21,73 +21,120 @@ class MemoryManager:
         self.CK = self.CV = None
         self.H = self.W = None
 
-        self.work_mem = KeyValueMemoryStore(count_usage=self.enable_long_term)
+        # the capacity is set when the size of the features is known, in add_memory()
+        self.work_mem = RingKeyValueMemoryStore(
+            count_usage=self.enable_long_term, capacity=0
+        )
         self.reset_config = True
 
     def _readout(self, affinity, v):
         # this function is for a single object group
         return v @ affinity
 
-    def match_memory(self, query_key, current_key, current_value, scale):
+    def get_affinity(self, query_key, current_key, scale):
+        """
+        Compute the memory affinity of one frame.
+
+        The affinity only depends on the keys, which do not change during the decoder iterations
+        of one frame. Therefore, it can be computed once per frame and given to read_memory() at
+        every iteration, where only the current value changes.
+        """
         # query_key: B x C^k x H x W
         h, w = query_key.shape[-2:]
 
         query_key = query_key.flatten(start_dim=2)
-        if current_key is not None and current_value is not None:
+        if current_key is not None:
             current_key = current_key.flatten(start_dim=2)
-            current_value = current_value.flatten(start_dim=2)
 
-        """
-        Memory readout using keys
-        """
         if self.work_mem.engaged():
-            # No long-term memory
-            if current_key is not None and current_value is not None:
+            if current_key is not None:
                 memory_key = torch.cat([self.work_mem.key, current_key], -1)
             else:
                 memory_key = self.work_mem.key
+            top_k = self.top_k
+        elif current_key is not None:
+            # No working-term memory
+            memory_key = current_key
+            top_k = None
+        else:
+            return None
+
+        scale = scale * math.log(memory_key.shape[-1], self.cfg.train_avg_length)
+        similarity = (
+            torch.einsum("b c l, b c t -> b t l", query_key, memory_key) * scale
+        )
+
+        usage = None
+        if top_k is not None:
+            weights, indices = do_sparse_softmax(similarity, top_k=top_k)
+            affinity = (weights, indices)
+            if self.work_mem.engaged() and self.work_mem.count_usage:
+                usage = torch.zeros_like(similarity[:, :, 0]).scatter_add_(
+                    1, indices.flatten(1), weights.flatten(1)
+                )
+        else:
+            affinity = do_softmax(similarity, top_k=None, return_usage=False)
+            if self.work_mem.engaged() and self.work_mem.count_usage:
+                usage = affinity.sum(dim=2)
+
+        work_size = self.work_mem.size
+        if usage is not None:
+            usage = usage[:, :work_size]
+
+        return {
+            "affinity": affinity,
+            "usage": usage,
+            "work_size": work_size,
+            "shape": (h, w),
+        }
+
+    def read_memory(self, memory_affinity, current_value):
+        """
+        Read the memory using an affinity computed by get_affinity() for the current frame.
+        """
+        if memory_affinity is None:
+            return 0
 
-            scale = scale * math.log(memory_key.shape[-1], self.cfg.train_avg_length)
-            similarity = (
-                torch.einsum("b c l, b c t -> b t l", query_key, memory_key) * scale
-            )
-
-            affinity, usage = do_softmax(
-                similarity, inplace=True, top_k=self.top_k, return_usage=True
-            )
+        h, w = memory_affinity["shape"]
+        work_size = memory_affinity["work_size"]
+        affinity = memory_affinity["affinity"]
+        if current_value is not None:
+            current_value = current_value.flatten(start_dim=2)
 
-            if current_key is not None and current_value is not None:
+        if isinstance(affinity, tuple):
+            # sparse top-k affinity
+            if work_size == 0:
+                all_memory_value = current_value
+            elif current_value is not None:
                 all_memory_value = torch.cat([self.work_mem.value, current_value], -1)
-                work_usage = usage[:, : -h * w]
             else:
                 all_memory_value = self.work_mem.value
-                work_usage = usage
-            # Record memory usage for working memory
-            self.work_mem.update_usage(work_usage.flatten())
-            # else:
-            #     raise NotImplementedError
+            all_readout_mem = sparse_readout(*affinity, all_memory_value)
         else:
-            # No working-term memory
-            if current_key is not None and current_value is not None:
-                memory_key = current_key
-                scale = scale * math.log(
-                    memory_key.shape[-1], self.cfg.train_avg_length
+            # the dense affinity is split to avoid concatenating the values at every iteration
+            all_readout_mem = 0
+            if work_size > 0:
+                all_readout_mem = self._readout(
+                    affinity[:, :work_size], self.work_mem.value
                 )
-                similarity = (
-                    torch.einsum("b c l, b c t -> b t l", query_key, memory_key) * scale
+            if current_value is not None:
+                all_readout_mem = all_readout_mem + self._readout(
+                    affinity[:, work_size:], current_value
                 )
-                affinity = do_softmax(
-                    similarity, inplace=True, top_k=None, return_usage=False
-                )
-                all_memory_value = current_value
-            else:
-                return 0
 
-        # Shared affinity within each group
-        all_readout_mem = self._readout(affinity, all_memory_value)
+        # Record memory usage for working memory
+        if memory_affinity["usage"] is not None:
+            self.work_mem.update_usage(memory_affinity["usage"].flatten())
 
         return all_readout_mem.view(all_readout_mem.shape[0], -1, h, w)
 
+    def match_memory(self, query_key, current_key, current_value, scale):
+        # current_key and current_value must be both given or both None
+        if current_key is None or current_value is None:
+            current_key = current_value = None
+        memory_affinity = self.get_affinity(query_key, current_key, scale)
+        return self.read_memory(memory_affinity, current_value)
+
     def add_memory(self, key, value):
         # key: 1*C*H*W
         # value: 1*C*H*W
@@ -97,6 +144,9 @@ class MemoryManager:
             self.HW = self.H * self.W
             self.min_work_elements = self.min_mt_frames * self.HW
             self.max_work_elements = self.max_mt_frames * self.HW
+            self.work_mem.capacity = max(
+                self.max_work_elements, self.min_work_elements + self.HW
+            )
 
         # key:   1*C*N
         # value: 1*C*N
@@ -115,4 +165,4 @@ class MemoryManager:
 
     def compress_features(self):
         # remove consolidated working memory
-        self.work_mem.sieve_by_range(0, -self.min_work_elements)
+        self.work_mem.keep_newest(self.min_work_elements)
@@ -168,7 +168,10 @@ class MSRAFTPlus(BaseModel):
             inputs.get("prev_preds") is not None
             and inputs["prev_preds"].get("flow_small") is not None
         ):
-            forward_flow = forward_interpolate_batch(inputs["prev_preds"]["flow_small"])
+            forward_flow = forward_interpolate_batch(
+                inputs["prev_preds"]["flow_small"],
+                method=self.args.warm_start_interpolation,
+            )
             coords1 = coords1 + forward_flow
 
         assert len(fnet_pyramid) == len(
@@ -178,6 +181,7 @@ class MSRAFTPlus(BaseModel):
             self.args.iters
         ), "pyramid levels and the length of GRU iteration lists should be the same."
 
+        early_exit = self.get_early_exit_monitor()
         for index, (fmap1, fmap2) in enumerate(fnet_pyramid):
             corr_fn = get_corr_block(
                 fmap1=fmap1,
@@ -191,6 +195,8 @@ class MSRAFTPlus(BaseModel):
             net = torch.tanh(net)
             inp = torch.relu(inp)
 
+            if early_exit is not None:
+                early_exit.reset()
             for itr in range(self.args.iters[index]):
                 coords1 = coords1.detach()
                 if index >= 1 and itr == 0:
@@ -200,6 +206,8 @@ class MSRAFTPlus(BaseModel):
                 corr = corr_fn(coords1)
                 flow = coords1 - coords0
                 net, up_mask, delta_flow = self.update_block(net, inp, corr, flow)
+                if early_exit is not None:
+                    delta_flow = early_exit.step(delta_flow)
 
                 # F(t+1) = F(t) + \Delta(t)
                 coords1 = coords1 + delta_flow
@@ -213,6 +221,9 @@ class MSRAFTPlus(BaseModel):
                 )
                 flow_predictions.append(flow_up)
 
+                if early_exit is not None and early_exit.all_converged:
+                    break
+
         if self.training:
             outputs = {"flows": flow_up[:, None], "flow_preds": flow_predictions}
         else:
@@ -220,5 +231,7 @@ class MSRAFTPlus(BaseModel):
                 "flows": flow_up[:, None],
                 "flow_small": downflow(flow_up, factor=0.0625),
             }
+        if early_exit is not None:
+            outputs["iters"] = early_exit.iters
 
         return outputs
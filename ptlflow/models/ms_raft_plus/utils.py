@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 import torch
 import torch.nn.functional as F
 import numpy as np
@@ -85,14 +87,21 @@ def bilinear_sampler(img, coords, mode="bilinear", mask=False):
     return img
 
 
-def coords_grid(batch, ht, wd, dtype, device):
+@lru_cache(maxsize=8)
+def _base_coords_grid(ht, wd, dtype, device):
+    # The grid only depends on the shape, so it is built once and then copied by coords_grid
     coords = torch.meshgrid(
         torch.arange(ht, dtype=dtype, device=device),
         torch.arange(wd, dtype=dtype, device=device),
         indexing="ij",
     )
-    coords = torch.stack(coords[::-1], dim=0)
-    return coords[None].repeat(batch, 1, 1, 1)
+    return torch.stack(coords[::-1], dim=0)
+
+
+def coords_grid(batch, ht, wd, dtype, device):
+    return _base_coords_grid(ht, wd, dtype, torch.device(device))[None].repeat(
+        batch, 1, 1, 1
+    )
 
 
 def upflow2(flow, mode="bilinear"):
@@ -26,7 +26,7 @@ try:
     import alt_cuda_corr
 except:
     alt_cuda_corr = None
-from ptlflow.utils.correlation import IterativeCorrBlock
+from ptlflow.utils.correlation import IterativeCorrBlock, is_alt_cuda_corr_supported
 
 
 class CorrBlock:
@@ -129,10 +129,10 @@ def get_corr_block(
     alternate_corr: bool = False,
 ):
     if alternate_corr:
-        if alt_cuda_corr is None or fmap1.device == torch.device("cpu"):
-            corr_fn = IterativeCorrBlock
-        else:
+        if is_alt_cuda_corr_supported(alt_cuda_corr, fmap1):
             corr_fn = AlternateCorrBlock
+        else:
+            corr_fn = IterativeCorrBlock
     else:
         corr_fn = CorrBlock
     return corr_fn(fmap1=fmap1, fmap2=fmap2, radius=radius, num_levels=num_levels)
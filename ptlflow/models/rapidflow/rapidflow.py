@@ -360,12 +360,16 @@ class RAPIDFlow(BaseModel):
                 align_corners=True,
             )
             flow = rescale_flow(flow, width_im, height_im, to_local=True)
-            flow = forward_interpolate_batch(flow)
+            flow = forward_interpolate_batch(
+                flow, method=self.args.warm_start_interpolation
+            )
         else:
             flow = torch.zeros(
                 b_size, 2, h_x1, w_x1, dtype=x1_raw.dtype, device=init_device
             )
 
+        early_exit = None if self.args.simple_io else self.get_early_exit_monitor()
+
         net = None
         for l, (x1, x2, cnet) in enumerate(
             zip(pass_pyramid1, pass_pyramid2, pass_pyramid_cnet)
@@ -410,19 +414,26 @@ class RAPIDFlow(BaseModel):
                     align_corners=True,
                 )
 
+            if early_exit is not None:
+                early_exit.reset()
             for k in range(iters_per_level[l]):
                 flow = flow.detach()
 
                 # correlation
                 out_corr = corr_fn(coords0 + flow)
 
+                # with early exit, any iteration of the output level can be the last one
                 get_mask = self.training or (
-                    l == (output_level - start_level) and k == (iters_per_level[l] - 1)
+                    l == (output_level - start_level)
+                    and (k == (iters_per_level[l] - 1) or early_exit is not None)
                 )
                 flow_res, net, mask = self.update_block(
                     net, inp, out_corr, flow, get_mask=get_mask
                 )
+                if early_exit is not None:
+                    flow_res = early_exit.step(flow_res)
                 flow = flow + flow_res
+                is_converged = early_exit is not None and early_exit.all_converged
 
                 out_flow = rescale_flow(flow, width_im, height_im, to_local=False)
                 if self.training:
@@ -452,8 +463,8 @@ class RAPIDFlow(BaseModel):
                             mode="bilinear",
                             align_corners=True,
                         )
-                elif l == (output_level - start_level) and k == (
-                    iters_per_level[l] - 1
+                elif l == (output_level - start_level) and (
+                    k == (iters_per_level[l] - 1) or is_converged
                 ):
                     if mask is not None:
                         if self.args.simple_io:
@@ -486,6 +497,9 @@ class RAPIDFlow(BaseModel):
                 )
                 flows.append(out_flow)
 
+                if is_converged:
+                    break
+
         if self.args.simple_io:
             return flows[-1]
         else:
@@ -493,6 +507,8 @@ class RAPIDFlow(BaseModel):
             outputs["flows"] = flows[-1][:, None]
             if self.training:
                 outputs["flow_preds"] = flows
+            if early_exit is not None:
+                outputs["iters"] = early_exit.iters
             return outputs
 
 
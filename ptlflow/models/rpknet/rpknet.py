@@ -354,7 +354,9 @@ class RPKNet(BaseModel):
         ) = pass_pyramid1[0].size()
 
         if flow_init is not None:
-            flow = forward_interpolate_batch(flow_init)
+            flow = forward_interpolate_batch(
+                flow_init, method=self.args.warm_start_interpolation
+            )
         else:
             flow = torch.zeros(
                 b_size,
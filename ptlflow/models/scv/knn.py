@@ -3,10 +3,15 @@ try:
 
     res = faiss.StandardGpuResources()
     res.setDefaultNullStreamAllDevices()
-except ImportError:
+except (ImportError, AttributeError, RuntimeError):
+    # faiss is not installed, or it does not have GPU support
     faiss = None
+    res = None
 import torch
 
+# Memory budget of knn_torch_raw: 2**26 float32 similarities use 256 MB
+DEFAULT_KNN_MAX_CHUNK_ELEMENTS = 2**26
+
 
 def swig_ptr_from_Tensor(x):
     """gets a Faiss SWIG pointer from a pytorch tensor (on CPU or GPU)"""
@@ -114,3 +119,70 @@ def knn_faiss_raw(fmap1, fmap2, k):
         dist = torch.cat(dist, dim=0)
         indx = torch.cat(indx, dim=0)
     return dist, indx
+
+
+@torch.no_grad()
+def knn_torch_raw(fmap1, fmap2, k, max_chunk_elements=DEFAULT_KNN_MAX_CHUNK_ELEMENTS):
+    """Find the k elements of fmap2 with the largest inner product with each element of fmap1.
+
+    This is a pure PyTorch replacement for knn_faiss_raw, which runs on any device. The
+    similarities are computed with tiled matmuls, and the top-k of each tile is merged with the
+    running top-k of the previous tiles. Therefore, the full similarity matrix is never stored,
+    and each tile has at most max_chunk_elements similarities (unless a single query row is
+    larger than that).
+
+    Parameters
+    ----------
+    fmap1 : torch.Tensor
+        The queries, with shape [B, C, N1].
+    fmap2 : torch.Tensor
+        The database, with shape [B, C, N2].
+    k : int
+        Number of neighbors.
+    max_chunk_elements : int, default DEFAULT_KNN_MAX_CHUNK_ELEMENTS
+        Maximum number of similarities computed at once.
+
+    Returns
+    -------
+    tuple[torch.Tensor, torch.Tensor]
+        The inner products and the indices in fmap2 of the neighbors, both with shape [B, k, N1],
+        sorted from the largest to the smallest inner product.
+    """
+    b, ch, n1 = fmap1.shape
+    n2 = fmap2.shape[2]
+
+    db_chunk = min(n2, max(k, max_chunk_elements // b))
+    query_chunk = max(1, min(n1, max_chunk_elements // (b * db_chunk)))
+
+    queries = fmap1.float().transpose(1, 2)  # [B, N1, C]
+    database = fmap2.float()
+
+    dist = []
+    indx = []
+    for q0 in range(0, n1, query_chunk):
+        query = queries[:, q0 : q0 + query_chunk]
+        best_dist = best_indx = None
+        for d0 in range(0, n2, db_chunk):
+            sim = torch.bmm(query, database[:, :, d0 : d0 + db_chunk])
+            dist_i, indx_i = torch.topk(sim, min(k, sim.shape[2]), dim=2)
+            indx_i += d0
+            if best_dist is not None:
+                dist_i = torch.cat([best_dist, dist_i], dim=2)
+                indx_i = torch.cat([best_indx, indx_i], dim=2)
+                dist_i, sel = torch.topk(dist_i, k, dim=2)
+                indx_i = indx_i.gather(2, sel)
+            best_dist, best_indx = dist_i, indx_i
+        dist.append(best_dist)
+        indx.append(best_indx)
+
+    dist = torch.cat(dist, dim=1).transpose(1, 2).contiguous()
+    indx = torch.cat(indx, dim=1).transpose(1, 2).contiguous()
+    return dist, indx
+
+
+def knn_raw(fmap1, fmap2, k):
+    """Call knn_faiss_raw when faiss with GPU support is available and the inputs are on the GPU,
+    or knn_torch_raw otherwise."""
+    if res is not None and fmap1.is_cuda and fmap1.dtype == torch.float32:
+        return knn_faiss_raw(fmap1, fmap2, k)
+    return knn_torch_raw(fmap1, fmap2, k)
@@ -14,7 +14,7 @@ from .utils import (
     upflow4,
     compute_interpolation_weights,
 )
-from .knn import knn_faiss_raw
+from .knn import knn_raw
 from ..base_model.base_model import BaseModel
 
 
@@ -58,7 +58,7 @@ def compute_sparse_corr(fmap1, fmap2, k=32):
     fmap1, fmap2 = fmap1.view(B, C, -1), fmap2.view(B, C, -1)
 
     with torch.no_grad():
-        _, indices = knn_faiss_raw(fmap1, fmap2, k)  # [B, k, H1*W1]
+        _, indices = knn_raw(fmap1, fmap2, k)  # [B, k, H1*W1]
 
         indices_coord = indices.unsqueeze(1).expand(-1, 2, -1, -1)  # [B, 2, k, H1*W1]
         coords0 = (
@@ -122,14 +122,6 @@ class SCVBase(BaseModel):
                 " SCV requires torch_scatter library to run."
                 " Check instructions at: https://github.com/rusty1s/pytorch_scatter"
             )
-        try:
-            import faiss
-        except ImportError:
-            raise ImportError(
-                "ERROR: faiss not found."
-                " CSV requires faiss library to run."
-                " Install with pip install faiss-gpu"
-            )
 
 
 class SCVQuarter(SCVBase):
@@ -220,7 +212,10 @@ class SCVQuarter(SCVBase):
             inputs.get("prev_preds") is not None
             and inputs["prev_preds"].get("flow_small") is not None
         ):
-            forward_flow = forward_interpolate_batch(inputs["prev_preds"]["flow_small"])
+            forward_flow = forward_interpolate_batch(
+                inputs["prev_preds"]["flow_small"],
+                method=self.args.warm_start_interpolation,
+            )
             coords1 = coords1 + forward_flow
 
         # Generate sparse cost volume for GRU
@@ -397,7 +392,10 @@ class SCVEighth(SCVBase):
             inputs.get("prev_preds") is not None
             and inputs["prev_preds"].get("flow_small") is not None
         ):
-            forward_flow = forward_interpolate_batch(inputs["prev_preds"]["flow_small"])
+            forward_flow = forward_interpolate_batch(
+                inputs["prev_preds"]["flow_small"],
+                method=self.args.warm_start_interpolation,
+            )
             coords1 = coords1 + forward_flow
 
         # Generate sparse cost volume for GRU
@@ -180,8 +180,11 @@ class SEARAFT(BaseModel):
 
         if self.args.iters > 0:
             # run the feature network
-            fmap1_8x = self.fnet(image1)
+            fmap1_8x = self.get_cached_features(image1, inputs)
+            if fmap1_8x is None:
+                fmap1_8x = self.fnet(image1)
             fmap2_8x = self.fnet(image2)
+            self.cache_features(image2, fmap2_8x, inputs)
             corr_fn = get_corr_block(
                 fmap1=fmap1_8x,
                 fmap2=fmap2_8x,
@@ -190,6 +193,7 @@ class SEARAFT(BaseModel):
                 alternate_corr=self.args.alternate_corr,
             )
 
+        early_exit = self.get_early_exit_monitor()
         for itr in range(self.args.iters):
             N, _, H, W = flow_8x.shape
             flow_8x = flow_8x.detach()
@@ -200,7 +204,10 @@ class SEARAFT(BaseModel):
             net = self.update_block(net, context, corr, flow_8x)
             flow_update = self.flow_head(net)
             weight_update = 0.25 * self.upsample_weight(net)
-            flow_8x = flow_8x + flow_update[:, :2]
+            delta_flow = flow_update[:, :2]
+            if early_exit is not None:
+                delta_flow = early_exit.step(delta_flow)
+            flow_8x = flow_8x + delta_flow
             info_8x = flow_update[:, 2:]
             # upsample predictions
             flow_up, info_up = self.upsample_data(flow_8x, info_8x, weight_update)
@@ -211,6 +218,9 @@ class SEARAFT(BaseModel):
             flow_predictions.append(flow_up)
             info_predictions.append(info_up)
 
+            if early_exit is not None and early_exit.all_converged:
+                break
+
         if self.training:
             # exlude invalid pixels and extremely large diplacements
             nf_predictions = []
@@ -248,6 +258,8 @@ class SEARAFT(BaseModel):
             }
         else:
             outputs = {"flows": flow_up[:, None], "flow_small": flow_8x}
+        if early_exit is not None:
+            outputs["iters"] = early_exit.iters
 
         return outputs
 
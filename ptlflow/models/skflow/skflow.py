@@ -201,10 +201,14 @@ class SKFlow(BaseModel):
             inputs.get("prev_preds") is not None
             and inputs["prev_preds"].get("flow_small") is not None
         ):
-            forward_flow = forward_interpolate_batch(inputs["prev_preds"]["flow_small"])
+            forward_flow = forward_interpolate_batch(
+                inputs["prev_preds"]["flow_small"],
+                method=self.args.warm_start_interpolation,
+            )
             coords1 = coords1 + forward_flow
 
         flow_predictions = []
+        early_exit = self.get_early_exit_monitor()
         for itr in range(self.args.iters):
             coords1 = coords1.detach()
             corr = corr_fn(coords1)  # index correlation volume
@@ -214,6 +218,9 @@ class SKFlow(BaseModel):
                 net, inp, corr, flow, attention
             )
 
+            if early_exit is not None:
+                delta_flow = early_exit.step(delta_flow)
+
             # F(t+1) = F(t) + \Delta(t)
             coords1 = coords1 + delta_flow
 
@@ -226,9 +233,14 @@ class SKFlow(BaseModel):
             flow_up = self.postprocess_predictions(flow_up, image_resizer, is_flow=True)
             flow_predictions.append(flow_up)
 
+            if early_exit is not None and early_exit.all_converged:
+                break
+
         if self.training:
             outputs = {"flows": flow_up[:, None], "flow_preds": flow_predictions}
         else:
             outputs = {"flows": flow_up[:, None], "flow_small": coords1 - coords0}
+        if early_exit is not None:
+            outputs["iters"] = early_exit.iters
 
         return outputs
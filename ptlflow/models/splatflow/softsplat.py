@@ -1,11 +1,22 @@
 #!/usr/bin/env python
 
-import os
+import functools
+import re
+from types import SimpleNamespace
 
 import torch
 
-import cupy
-import re
+from ptlflow.utils.warp import splat
+
+# Softsplat has two interchangeable backends:
+# - "cupy": the original CUDA kernels, compiled at runtime by cupy. Only for float32 CUDA tensors.
+# - "torch": a vectorized scatter-add, see ptlflow.utils.warp.splat. Runs on any device.
+# "auto" selects "cupy" for float32 CUDA inputs when cupy can be imported, and "torch" otherwise.
+# cupy is only imported at the first call that needs it, so this module can be used without cupy.
+SOFTSPLAT_BACKENDS = ["auto", "cupy", "torch"]
+
+cupy = None
+_has_tried_cupy_import = False
 
 kernel_Softsplat_updateOutput = """
 	extern "C" __global__ void kernel_Softsplat_updateOutput(
@@ -185,7 +196,35 @@ kernel_Softsplat_updateGradFlow = """
 """
 
 
+def _import_cupy():
+    global cupy, _has_tried_cupy_import
+    if not _has_tried_cupy_import:
+        _has_tried_cupy_import = True
+        try:
+            import cupy as cp
+
+            cupy = cp
+        except ImportError:
+            cupy = None
+    return cupy
+
+
 def cupy_kernel(strFunction, objVariables):
+    # The generated source only depends on the sizes and strides of the tensors, so it is reused across calls
+    signature = tuple(
+        (k, tuple(v.size()), tuple(v.stride()))
+        for k, v in objVariables.items()
+        if v is not None
+    )
+    return _cupy_kernel_source(strFunction, signature)
+
+
+@functools.lru_cache(maxsize=None)
+def _cupy_kernel_source(strFunction, signature):
+    objVariables = {
+        k: SimpleNamespace(size=lambda sz=sz: sz, stride=lambda st=st: st)
+        for k, sz, st in signature
+    }
     strKernel = globals()[strFunction]
 
     while True:
@@ -261,8 +300,14 @@ def cupy_kernel(strFunction, objVariables):
 # end
 
 
-@cupy.memoize(for_each_device=True)
 def cupy_launch(strFunction, strKernel):
+    return _cupy_launch(strFunction, strKernel, torch.cuda.current_device())
+
+
+@functools.lru_cache(maxsize=None)
+def _cupy_launch(strFunction, strKernel, intDevice):
+    # cupy stores the compiled binaries in its on-disk kernel cache (CUPY_CACHE_DIR, default ~/.cupy/kernel_cache),
+    # so the kernels are only compiled by the first run that uses each input shape.
     # return cupy.RawModule(code=strKernel, options=tuple(['-I ' + os.environ['CUDA_HOME'], '-I ' + os.environ['CUDA_HOME'] + '/include'])).get_function(strFunction)
     return cupy.RawModule(code=strKernel).get_function(strFunction)
 
@@ -432,7 +477,31 @@ class _FunctionSoftsplat(torch.autograd.Function):
 # end
 
 
-def FunctionSoftsplat(tenInput, tenFlow, tenMetric=None, strType="average"):
+def _select_backend(backend, tenInput):
+    if backend not in SOFTSPLAT_BACKENDS:
+        raise ValueError(
+            f"backend must be one of {SOFTSPLAT_BACKENDS}. Found: {backend}."
+        )
+
+    is_cupy_compatible = tenInput.is_cuda and tenInput.dtype == torch.float32
+    if backend == "auto":
+        if is_cupy_compatible and _import_cupy() is not None:
+            backend = "cupy"
+        else:
+            backend = "torch"
+    elif backend == "cupy":
+        if _import_cupy() is None:
+            raise ModuleNotFoundError("No module named 'cupy'")
+        if not is_cupy_compatible:
+            raise ValueError(
+                "The cupy softsplat backend only supports float32 CUDA tensors."
+            )
+    return backend
+
+
+def FunctionSoftsplat(
+    tenInput, tenFlow, tenMetric=None, strType="average", backend="auto"
+):
     assert tenMetric is None or tenMetric.shape[1] == 1
     assert strType in ["summation", "average", "linear", "softmax"]
 
@@ -455,7 +524,10 @@ def FunctionSoftsplat(tenInput, tenFlow, tenMetric=None, strType="average"):
 
     # end
 
-    tenOutput = _FunctionSoftsplat.apply(tenInput, tenFlow)
+    if _select_backend(backend, tenInput) == "cupy":
+        tenOutput = _FunctionSoftsplat.apply(tenInput, tenFlow)
+    else:
+        tenOutput = splat(tenInput, tenFlow, splat_mode="bilinear")
 
     if strType != "summation":
         tenNormalize = tenOutput[:, -1:, :, :]
@@ -472,15 +544,18 @@ def FunctionSoftsplat(tenInput, tenFlow, tenMetric=None, strType="average"):
 
 
 class ModuleSoftsplat(torch.nn.Module):
-    def __init__(self, strType):
+    def __init__(self, strType, backend="auto"):
         super().__init__()
 
         self.strType = strType
+        self.backend = backend
 
     # end
 
     def forward(self, tenInput, tenFlow, tenMetric):
-        return FunctionSoftsplat(tenInput, tenFlow, tenMetric, self.strType)
+        return FunctionSoftsplat(
+            tenInput, tenFlow, tenMetric, self.strType, self.backend
+        )
 
     # end
 
@@ -10,10 +10,7 @@ from .corr import CorrBlock
 from .update import Update
 from ..base_model.base_model import BaseModel
 
-try:
-    from .softsplat import FunctionSoftsplat as forward_warping
-except ModuleNotFoundError:
-    forward_warping = None
+from .softsplat import SOFTSPLAT_BACKENDS, FunctionSoftsplat as forward_warping
 
 
 class SplatFlow(BaseModel):
@@ -32,9 +29,6 @@ class SplatFlow(BaseModel):
 
         self.has_shown_warning = False
 
-        if forward_warping is None:
-            raise ModuleNotFoundError("No module named 'cupy'")
-
     @staticmethod
     def add_model_specific_args(parent_parser=None):
         parent_parser = BaseModel.add_model_specific_args(parent_parser)
@@ -49,6 +43,13 @@ class SplatFlow(BaseModel):
         parser.add_argument(
             "--not_fast_inference", action="store_false", dest="fast_inference"
         )
+        parser.add_argument(
+            "--softsplat_backend",
+            type=str,
+            choices=SOFTSPLAT_BACKENDS,
+            default="auto",
+            help="Implementation of the forward warping. 'cupy' requires cupy and CUDA, 'torch' runs on any device, and 'auto' uses cupy when possible.",
+        )
         return parser
 
     def init_coord(self, fmap):
@@ -101,7 +102,9 @@ class SplatFlow(BaseModel):
 
         flow_prs_01, mf_01, low_01 = self.forward_one_pair(images[:, 0], images[:, 1])
         if images.shape[1] > 2:
-            mf_t = forward_warping(mf_01, low_01)
+            mf_t = forward_warping(
+                mf_01, low_01, backend=self.args.softsplat_backend
+            )
             flow_prs_12, mf_12, low_12 = self.forward_one_pair(
                 images[:, 1], images[:, 2], mf_t=mf_t
             )
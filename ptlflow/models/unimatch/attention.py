@@ -3,12 +3,19 @@ import torch.nn as nn
 import torch.nn.functional as F
 
 from .utils import split_feature, merge_splits, split_feature_1d, merge_splits_1d
+from ptlflow.utils.attention import chunked_softmax_attention
 
 
-def single_head_full_attention(q, k, v):
+def single_head_full_attention(q, k, v, max_chunk_elements=None):
     # q, k, v: [B, L, C]
     assert q.dim() == k.dim() == v.dim() == 3
 
+    if max_chunk_elements is not None:
+        # tiled computation that does not store the [B, L, L] scores
+        return chunked_softmax_attention(
+            q, k, v, max_chunk_elements=max_chunk_elements
+        )
+
     scores = torch.matmul(q, k.permute(0, 2, 1)) / (q.size(2) ** 0.5)  # [B, L, L]
     attn = torch.softmax(scores, dim=2)  # [B, L, L]
     out = torch.matmul(attn, v)  # [B, L, C]
@@ -207,6 +214,7 @@ class SelfAttnPropagation(nn.Module):
         flow,
         local_window_attn=False,
         local_window_radius=1,
+        max_chunk_elements=None,
         **kwargs,
     ):
         # q, k: feature [B, C, H, W], v: flow [B, 2, H, W]
@@ -230,10 +238,17 @@ class SelfAttnPropagation(nn.Module):
 
         value = flow.view(b, flow.size(1), h * w).permute(0, 2, 1)  # [B, H*W, 2]
 
-        scores = torch.matmul(query, key.permute(0, 2, 1)) / (c**0.5)  # [B, H*W, H*W]
-        prob = torch.softmax(scores, dim=-1)
-
-        out = torch.matmul(prob, value)  # [B, H*W, 2]
+        if max_chunk_elements is not None:
+            out = chunked_softmax_attention(
+                query, key, value, max_chunk_elements=max_chunk_elements
+            )  # [B, H*W, 2]
+        else:
+            scores = torch.matmul(query, key.permute(0, 2, 1)) / (
+                c**0.5
+            )  # [B, H*W, H*W]
+            prob = torch.softmax(scores, dim=-1)
+
+            out = torch.matmul(prob, value)  # [B, H*W, 2]
         out = out.view(b, h, w, value.size(-1)).permute(0, 3, 1, 2)  # [B, 2, H, W]
 
         return out
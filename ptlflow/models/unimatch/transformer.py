@@ -55,6 +55,7 @@ class TransformerLayer(nn.Module):
         attn_type="swin",
         with_shift=False,
         attn_num_splits=None,
+        max_chunk_elements=None,
     ):
         # source, target: [B, L, C]
         query, key, value = source, target, target
@@ -107,7 +108,7 @@ class TransformerLayer(nn.Module):
                     else:
                         # full 2d attn
                         message = single_head_full_attention(
-                            query, key, value
+                            query, key, value, max_chunk_elements=max_chunk_elements
                         )  # [N, L, C]
 
                 else:
@@ -142,7 +143,7 @@ class TransformerLayer(nn.Module):
                     else:
                         # full 2d attn
                         message = single_head_full_attention(
-                            query, key, value
+                            query, key, value, max_chunk_elements=max_chunk_elements
                         )  # [N, L, C]
                 else:
                     if attn_num_splits > 1:
@@ -168,7 +169,9 @@ class TransformerLayer(nn.Module):
                         )
 
         else:
-            message = single_head_full_attention(query, key, value)  # [B, L, C]
+            message = single_head_full_attention(
+                query, key, value, max_chunk_elements=max_chunk_elements
+            )  # [B, L, C]
 
         message = self.merge(message)  # [B, L, C]
         message = self.norm1(message)
@@ -215,6 +218,7 @@ class TransformerBlock(nn.Module):
         attn_type="swin",
         with_shift=False,
         attn_num_splits=None,
+        max_chunk_elements=None,
     ):
         # source, target: [B, L, C]
 
@@ -228,6 +232,7 @@ class TransformerBlock(nn.Module):
             attn_type=attn_type,
             with_shift=with_shift,
             attn_num_splits=attn_num_splits,
+            max_chunk_elements=max_chunk_elements,
         )
 
         # cross attention and ffn
@@ -241,6 +246,7 @@ class TransformerBlock(nn.Module):
             attn_type=attn_type,
             with_shift=with_shift,
             attn_num_splits=attn_num_splits,
+            max_chunk_elements=max_chunk_elements,
         )
 
         return source
@@ -280,6 +286,7 @@ class FeatureTransformer(nn.Module):
         feature1,
         attn_type="swin",
         attn_num_splits=None,
+        max_chunk_elements=None,
         **kwargs,
     ):
         b, c, h, w = feature0.shape
@@ -335,6 +342,7 @@ class FeatureTransformer(nn.Module):
                 attn_num_splits=attn_num_splits,
                 shifted_window_attn_mask=shifted_window_attn_mask,
                 shifted_window_attn_mask_1d=shifted_window_attn_mask_1d,
+                max_chunk_elements=max_chunk_elements,
             )
 
             # update feature1
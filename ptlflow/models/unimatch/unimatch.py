@@ -118,6 +118,16 @@ class UniMatch(BaseModel):
         parser.add_argument("--attn_splits_list", type=int, nargs="+", default=(2,))
         parser.add_argument("--corr_radius_list", type=int, nargs="+", default=(-1,))
         parser.add_argument("--prop_radius_list", type=int, nargs="+", default=(-1,))
+        parser.add_argument(
+            "--matching_max_chunk_elements",
+            type=int,
+            default=None,
+            help=(
+                "If set, the global matching and the full attentions are computed in tiles with an online softmax, "
+                "with at most this many scores at once. This reduces the peak memory at high resolutions, "
+                "where the dense (H*W)x(H*W) matrices do not fit. The default None uses the dense computation."
+            ),
+        )
         return parser
 
     def extract_feature(self, img0, img1):
@@ -234,12 +244,16 @@ class UniMatch(BaseModel):
                 feature1,
                 attn_type=self.args.attn_type,
                 attn_num_splits=attn_splits,
+                max_chunk_elements=self.args.matching_max_chunk_elements,
             )
 
             # correlation and softmax
             if corr_radius == -1:  # global matching
                 flow_pred = global_correlation_softmax(
-                    feature0, feature1, self.args.pred_bidir_flow
+                    feature0,
+                    feature1,
+                    self.args.pred_bidir_flow,
+                    max_chunk_elements=self.args.matching_max_chunk_elements,
                 )[0]
             else:  # local matching
                 flow_pred = local_correlation_softmax(feature0, feature1, corr_radius)[
@@ -270,6 +284,7 @@ class UniMatch(BaseModel):
                 flow.detach(),
                 local_window_attn=prop_radius > 0,
                 local_window_radius=prop_radius,
+                max_chunk_elements=self.args.matching_max_chunk_elements,
             )
 
             # bilinear exclude the last one
@@ -0,0 +1,108 @@
+"""Memory-efficient softmax attention.
+
+Global matching models (e.g., GMFlow and UniMatch) compute softmax(Q K^T) V, where the queries and keys are all the
+pixels of the feature maps. The dense score matrix has (H*W)^2 elements, which does not fit in memory at high
+resolutions. chunked_softmax_attention computes the same output by processing the queries in tiles, and the keys of
+each query tile in chunks with an online (streaming) softmax. Therefore, the full score matrix is never stored.
+"""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from typing import Optional
+
+import torch
+
+# Default memory budget of chunked_softmax_attention: 2**26 float32 scores use 256 MB
+DEFAULT_ATTENTION_MAX_CHUNK_ELEMENTS = 2**26
+
+
+def chunked_softmax_attention(
+    query: torch.Tensor,
+    key: torch.Tensor,
+    value: torch.Tensor,
+    scale: Optional[float] = None,
+    max_chunk_elements: int = DEFAULT_ATTENTION_MAX_CHUNK_ELEMENTS,
+) -> torch.Tensor:
+    """Compute softmax(scale * query @ key^T) @ value without storing the full score matrix.
+
+    The queries are split into tiles, and the keys of each tile into chunks. The softmax is accumulated over the key
+    chunks with the online softmax: a running maximum and a running sum of exponentials are kept for each query, and
+    the partial outputs are rescaled whenever the maximum changes. The result is the same as the dense computation, up
+    to floating point rounding.
+
+    The tiles are sized so that each score block has at most max_chunk_elements elements (per batch element). This is
+    meant for inference: when gradients are required, autograd still stores the intermediate blocks.
+
+    Parameters
+    ----------
+    query : torch.Tensor
+        Queries with shape [B, N, C].
+    key : torch.Tensor
+        Keys with shape [B, M, C].
+    value : torch.Tensor
+        Values with shape [B, M, D].
+    scale : Optional[float], default None
+        Multiplier of the scores. If None, it is set to 1 / sqrt(C).
+    max_chunk_elements : int, default DEFAULT_ATTENTION_MAX_CHUNK_ELEMENTS
+        Maximum number of scores computed at once for each batch element.
+
+    Returns
+    -------
+    torch.Tensor
+        The attention output, with shape [B, N, D].
+
+    Raises
+    ------
+    ValueError
+        If max_chunk_elements is not positive.
+    """
+    if max_chunk_elements <= 0:
+        raise ValueError(
+            f"max_chunk_elements must be positive. Found: {max_chunk_elements}."
+        )
+
+    b, n, c = query.shape
+    m = key.shape[1]
+    if scale is None:
+        scale = c**-0.5
+
+    key_chunk = min(m, max_chunk_elements)
+    query_chunk = max(1, min(n, max_chunk_elements // key_chunk))
+    key_t = key.transpose(1, 2)
+
+    outputs = []
+    for q0 in range(0, n, query_chunk):
+        q = query[:, q0 : q0 + query_chunk] * scale
+        row_max = None
+        for k0 in range(0, m, key_chunk):
+            scores = torch.bmm(q, key_t[:, :, k0 : k0 + key_chunk])
+            v = value[:, k0 : k0 + key_chunk]
+            chunk_max = scores.amax(dim=2, keepdim=True)
+            if row_max is None:
+                row_max = chunk_max
+                exp_scores = torch.exp(scores - row_max)
+                row_sum = exp_scores.sum(dim=2, keepdim=True)
+                acc = torch.bmm(exp_scores, v)
+            else:
+                new_max = torch.maximum(row_max, chunk_max)
+                correction = torch.exp(row_max - new_max)
+                exp_scores = torch.exp(scores - new_max)
+                row_sum = row_sum * correction + exp_scores.sum(dim=2, keepdim=True)
+                acc = acc * correction + torch.bmm(exp_scores, v)
+                row_max = new_max
+        outputs.append(acc / row_sum)
+    return torch.cat(outputs, dim=1)
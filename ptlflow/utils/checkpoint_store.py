@@ -0,0 +1,326 @@
+"""Local store of pretrained checkpoints with a persistent index.
+
+The index records, for each model and checkpoint name, the file of the checkpoint inside the store, its SHA256 hash,
+size and modification time. The hash of a file is only computed once, when the file is added to the store. Later
+loads only compare the size and modification time, and the checkpoint names are resolved from the index without
+requiring network access. The store can be pre-seeded from a directory of checkpoint files (see seed_checkpoints.py),
+which is useful for machines without internet access.
+"""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from torch import hub
+
+# Environment variable to choose the directory of the store
+CHECKPOINT_DIR_ENV = "PTLFLOW_CHECKPOINT_DIR"
+INDEX_FILE_NAME = "index.json"
+
+
+class CheckpointStore(object):
+    """A directory of checkpoint files with an index keyed by model and checkpoint name."""
+
+    def __init__(self, root_dir: Optional[Union[str, Path]] = None) -> None:
+        """Initialize CheckpointStore.
+
+        Parameters
+        ----------
+        root_dir : Optional[Union[str, Path]], optional
+            Directory where the checkpoints and the index are stored. If None, it is read from the environment variable
+            PTLFLOW_CHECKPOINT_DIR or, if it is not set, the torch hub checkpoint directory used by previous versions
+            of PTLFlow is used.
+        """
+        if root_dir is None:
+            root_dir = os.environ.get(CHECKPOINT_DIR_ENV)
+        if root_dir is None:
+            root_dir = Path(hub.get_dir()) / "ptlflow" / "checkpoints"
+        self.root_dir = Path(root_dir)
+        self.index_path = self.root_dir / INDEX_FILE_NAME
+
+    def get_path(
+        self, model_name: str, ckpt_name: str, url: Optional[str] = None
+    ) -> Optional[Path]:
+        """Return the path of a checkpoint in the store, without accessing the network.
+
+        If the size or modification time of the file changed since it was indexed, its hash is verified again.
+
+        Parameters
+        ----------
+        model_name : str
+            Name of the model, as in ptlflow.models_dict.
+        ckpt_name : str
+            Name of the pretrained checkpoint, as in the model's pretrained_checkpoints.
+        url : Optional[str], optional
+            The current URL of the checkpoint. If provided, a checkpoint which was indexed from a different URL (e.g.,
+            the weights were updated in a new release) is considered to be missing.
+
+        Returns
+        -------
+        Optional[Path]
+            The path to the checkpoint file, or None if the checkpoint is not in the store or if its URL is outdated.
+
+        Raises
+        ------
+        RuntimeError
+            If the file was modified and its hash does not match the indexed one.
+        """
+        index = self._read_index()
+        record = index.get(model_name, {}).get(ckpt_name)
+        if record is None:
+            return None
+        if url is not None and record.get("url") != url:
+            logging.info(
+                "The stored checkpoint %s %s was indexed from %s, but the current URL is %s.",
+                model_name,
+                ckpt_name,
+                record.get("url"),
+                url,
+            )
+            return None
+
+        ckpt_path = self.root_dir / record["file"]
+        if not ckpt_path.exists():
+            return None
+
+        stat = ckpt_path.stat()
+        if stat.st_size != record["size"] or stat.st_mtime_ns != record["mtime_ns"]:
+            logging.info("%s changed since it was indexed, verifying it.", ckpt_path)
+            sha256 = _compute_sha256(ckpt_path)
+            if sha256 != record["sha256"]:
+                raise RuntimeError(
+                    f"The hash of {ckpt_path} ({sha256}) does not match the indexed one ({record['sha256']})."
+                )
+            self._add_record(
+                model_name, ckpt_name, ckpt_path, sha256, record.get("url")
+            )
+        return ckpt_path
+
+    def add(
+        self,
+        model_name: str,
+        ckpt_name: str,
+        ckpt_path: Union[str, Path],
+        url: Optional[str] = None,
+        symlink: bool = False,
+    ) -> Path:
+        """Verify a checkpoint file and add it to the store.
+
+        If the file is not inside the store directory, it is copied (or linked) into it. If the store already contains a
+        different file with the same name, it is replaced.
+
+        Parameters
+        ----------
+        model_name : str
+            Name of the model, as in ptlflow.models_dict.
+        ckpt_name : str
+            Name of the pretrained checkpoint, as in the model's pretrained_checkpoints.
+        ckpt_path : Union[str, Path]
+            Path to the checkpoint file.
+        url : Optional[str], optional
+            The URL of the checkpoint. If its file name contains a hash prefix (as in torch hub, e.g.,
+            raft-things-802bbcfd.ckpt), the SHA256 hash of the file must start with it.
+        symlink : bool, default False
+            If True, files outside the store are linked instead of copied.
+
+        Returns
+        -------
+        Path
+            The path of the checkpoint inside the store.
+
+        Raises
+        ------
+        RuntimeError
+            If the hash of the file does not match the hash prefix of the URL.
+        """
+        ckpt_path = Path(ckpt_path)
+        sha256 = _compute_sha256(ckpt_path)
+        hash_prefix = _get_hash_prefix(url) if url is not None else None
+        if hash_prefix is not None and not sha256.startswith(hash_prefix):
+            raise RuntimeError(
+                f'Invalid hash value for {ckpt_path} (expected "{hash_prefix}", got "{sha256}").'
+            )
+
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        store_path = self.root_dir / ckpt_path.name
+        if store_path.is_symlink() and not store_path.exists():
+            store_path.unlink()
+        if store_path.exists() and not store_path.samefile(ckpt_path):
+            # The existing file may be stale or corrupted, so it is only kept if it is identical to the new one
+            if _compute_sha256(store_path) != sha256:
+                logging.warning(
+                    "%s differs from %s, replacing it.", store_path, ckpt_path
+                )
+                store_path.unlink()
+        if not store_path.exists():
+            if symlink:
+                store_path.symlink_to(ckpt_path.resolve())
+            else:
+                # Copy to a temporary file first, so that an interrupted copy is never indexed
+                tmp_path = store_path.with_suffix(f".{os.getpid()}.tmp")
+                shutil.copy2(ckpt_path, tmp_path)
+                os.replace(tmp_path, store_path)
+        self._add_record(model_name, ckpt_name, store_path, sha256, url)
+        return store_path
+
+    def download(self, model_name: str, ckpt_name: str, url: str) -> Path:
+        """Download a checkpoint into the store, verify it and add it to the index.
+
+        If a file with the same name already exists in the store (e.g., downloaded by previous versions of PTLFlow), it
+        is verified and indexed without downloading it again.
+
+        Parameters
+        ----------
+        model_name : str
+            Name of the model, as in ptlflow.models_dict.
+        ckpt_name : str
+            Name of the pretrained checkpoint, as in the model's pretrained_checkpoints.
+        url : str
+            The URL of the checkpoint.
+
+        Returns
+        -------
+        Path
+            The path of the checkpoint inside the store.
+        """
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        ckpt_path = self.root_dir / Path(urlparse(url).path).name
+        if not ckpt_path.exists():
+            logging.info("Downloading %s to %s", url, str(ckpt_path))
+            hub.download_url_to_file(url, str(ckpt_path), progress=True)
+        try:
+            return self.add(model_name, ckpt_name, ckpt_path, url)
+        except RuntimeError:
+            ckpt_path.unlink()
+            raise
+
+    def seed(
+        self,
+        source_dir: Union[str, Path],
+        checkpoint_urls: Dict[str, List[Tuple[str, str]]],
+        symlink: bool = False,
+    ) -> List[Path]:
+        """Add all the checkpoint files of a directory to the store.
+
+        Each file is matched to the models and checkpoint names whose URL has the same file name.
+
+        Parameters
+        ----------
+        source_dir : Union[str, Path]
+            Directory containing the checkpoint files. It is searched recursively for .ckpt and .pth files.
+        checkpoint_urls : Dict[str, List[Tuple[str, str]]]
+            Maps each checkpoint URL to the (model name, checkpoint name) pairs that use it. See
+            get_pretrained_checkpoint_urls().
+        symlink : bool, default False
+            If True, the files are linked instead of copied into the store.
+
+        Returns
+        -------
+        List[Path]
+            The files of source_dir which did not match any checkpoint URL and were not added.
+        """
+        url_names = {}
+        for url, names in checkpoint_urls.items():
+            url_names.setdefault(Path(urlparse(url).path).name, []).append((url, names))
+
+        unmatched = []
+        source_paths = sorted(
+            [p for ext in ["ckpt", "pth"] for p in Path(source_dir).rglob(f"*.{ext}")]
+        )
+        for ckpt_path in source_paths:
+            if ckpt_path.name not in url_names:
+                unmatched.append(ckpt_path)
+                continue
+            for url, names in url_names[ckpt_path.name]:
+                for model_name, ckpt_name in names:
+                    self.add(model_name, ckpt_name, ckpt_path, url, symlink)
+                    logging.info("Added %s as %s %s", ckpt_path, model_name, ckpt_name)
+        return unmatched
+
+    def _add_record(
+        self,
+        model_name: str,
+        ckpt_name: str,
+        ckpt_path: Path,
+        sha256: str,
+        url: Optional[str],
+    ) -> None:
+        stat = ckpt_path.stat()
+        index = self._read_index()
+        index.setdefault(model_name, {})[ckpt_name] = {
+            "file": ckpt_path.name,
+            "url": url,
+            "sha256": sha256,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        # Write to a temporary file first, so that concurrent readers never see a partial index
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def _read_index(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        if not self.index_path.exists():
+            return {}
+        with open(self.index_path, "r") as f:
+            return json.load(f)
+
+
+def get_pretrained_checkpoint_urls() -> Dict[str, List[Tuple[str, str]]]:
+    """Return the URLs of the pretrained checkpoints of all the available models.
+
+    The models whose modules cannot be imported (e.g., due to missing optional dependencies) are skipped.
+
+    Returns
+    -------
+    Dict[str, List[Tuple[str, str]]]
+        Maps each URL to the (model name, checkpoint name) pairs that use it.
+    """
+    import ptlflow
+
+    checkpoint_urls = {}
+    for model_name in ptlflow.models_dict.keys():
+        try:
+            model_ref = ptlflow.get_model_reference(model_name)
+        except ImportError as e:
+            logging.warning("Skipping model %s: %s", model_name, e)
+            continue
+        pretrained_checkpoints = getattr(model_ref, "pretrained_checkpoints", {})
+        for ckpt_name, url in pretrained_checkpoints.items():
+            checkpoint_urls.setdefault(url, []).append((model_name, ckpt_name))
+    return checkpoint_urls
+
+
+def _compute_sha256(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(2**20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _get_hash_prefix(url: str) -> Optional[str]:
+    hash_match = hub.HASH_REGEX.search(Path(urlparse(url).path).name)
+    return hash_match.group(1) if hash_match is not None else None
@@ -5,6 +5,11 @@ https://github.com/ClementPinard/Pytorch-Correlation-extension.
 
 This version is implemented purely in PyTorch. However, it only supports correlation with 1x1 kernels.
 It is also not as efficient as the original SpatialCorrelationSampler.
+
+Two implementations are provided: iter_spatial_correlation_sample, which iterates over each displacement of the patch,
+and batched_spatial_correlation_sample, which computes all the displacements in a batched operation (by default, in
+chunks to limit the memory usage). The batched one is used as the fallback by the models when the original package
+is not installed. The translated versions follow the same pattern, and IterativeCorrBlock uses the batched one.
 """
 
 # =============================================================================
@@ -24,6 +29,7 @@ It is also not as efficient as the original SpatialCorrelationSampler.
 # =============================================================================
 
 import math
+from types import ModuleType
 from typing import Optional, Tuple, Union
 
 from einops import rearrange
@@ -31,6 +37,11 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
+# Default memory budget of batched_spatial_correlation_sample: 2**25 float32 elements use 128 MB
+DEFAULT_CORRELATION_MAX_CHUNK_ELEMENTS = 2**25
+# Default memory budget of IterativeCorrBlock: 2**25 float32 elements use 128 MB
+DEFAULT_CORR_BLOCK_MAX_CHUNK_ELEMENTS = 2**25
+
 
 def iter_spatial_correlation_sample(
     input1: torch.Tensor,
@@ -195,6 +206,229 @@ class IterSpatialCorrelationSampler(nn.Module):
         )
 
 
+def batched_spatial_correlation_sample(
+    input1: torch.Tensor,
+    input2: torch.Tensor,
+    kernel_size: Union[int, Tuple[int, int]] = 1,
+    patch_size: Union[int, Tuple[int, int]] = 1,
+    stride: Union[int, Tuple[int, int]] = 1,
+    padding: Union[int, Tuple[int, int]] = 0,
+    dilation: Union[int, Tuple[int, int]] = 1,
+    dilation_patch: Union[int, Tuple[int, int]] = 1,
+    max_chunk_elements: Optional[int] = DEFAULT_CORRELATION_MAX_CHUNK_ELEMENTS,
+) -> torch.Tensor:
+    """Apply spatial correlation sampling from input1 to input2 computing all the displacements at once.
+
+    This function produces the same output as iter_spatial_correlation_sample, but instead of iterating over each
+    displacement of the patch, it builds a strided view of input2 containing the whole displacement window and
+    reduces it against input1 in a single batched operation. The view is created with Tensor.unfold, so no copy
+    of input2 is made before the reduction.
+
+    Parameters
+    ----------
+    input1 : torch.Tensor
+        The origin feature map.
+    input2 : torch.Tensor
+        The target feature map.
+    kernel_size : Union[int, Tuple[int, int]], default 1
+        Total size of your correlation kernel, in pixels
+    patch_size : Union[int, Tuple[int, int]], default 1
+        Total size of your patch, determining how many different shifts will be applied.
+    stride : Union[int, Tuple[int, int]], default 1
+        Stride of the spatial sampler, will modify output height and width.
+    padding : Union[int, Tuple[int, int]], default 0
+        Padding applied to input1 and input2 before applying the correlation sampling, will modify output height and width.
+    dilation : Union[int, Tuple[int, int]], default 1
+        Similar to dilation in convolution.
+    dilation_patch : Union[int, Tuple[int, int]], default 1
+        Step for every shift in patch.
+    max_chunk_elements : Optional[int], default DEFAULT_CORRELATION_MAX_CHUNK_ELEMENTS
+        The displacements of the patch are processed in chunks, such that the intermediate product of each chunk has
+        at most this many elements (at least one displacement is always processed at once). The chunks contain whole
+        rows of the patch when possible, and parts of a row otherwise. This caps the peak memory at the cost of some
+        speed. If None, all the displacements are computed in a single pass, which requires
+        b * c * patch_size[0] * patch_size[1] * out_h * out_w elements.
+
+    Returns
+    -------
+    torch.Tensor
+        Result of correlation sampling.
+
+    Raises
+    ------
+    NotImplementedError
+        If kernel_size != 1.
+    NotImplementedError
+        If dilation != 1.
+    """
+    kernel_size = _to_pair(kernel_size)
+    patch_size = _to_pair(patch_size)
+    stride = _to_pair(stride)
+    padding = _to_pair(padding)
+    dilation = _to_pair(dilation)
+    dilation_patch = _to_pair(dilation_patch)
+
+    if kernel_size[0] != 1 or kernel_size[1] != 1:
+        raise NotImplementedError("Only kernel_size=1 is supported.")
+    if dilation[0] != 1 or dilation[1] != 1:
+        raise NotImplementedError("Only dilation=1 is supported.")
+
+    if max(padding) > 0:
+        input1 = F.pad(input1, (padding[1], padding[1], padding[0], padding[0]))
+        input2 = F.pad(input2, (padding[1], padding[1], padding[0], padding[0]))
+
+    input2 = F.pad(
+        input2,
+        (
+            dilation_patch[1] * ((patch_size[1] - 1) // 2),
+            dilation_patch[1] * (patch_size[1] // 2),
+            dilation_patch[0] * ((patch_size[0] - 1) // 2),
+            dilation_patch[0] * (patch_size[0] // 2),
+        ),
+    )
+
+    input1 = input1[:, :, :: stride[0], :: stride[1]]
+    b, c, sh, sw = input1.shape
+
+    # windows has shape (b, c, patch_size[0], patch_size[1], sh, sw), where windows[:, :, i, j] is the same as
+    # the (i, j) displaced and strided slice of input2 in iter_spatial_correlation_sample
+    span_h = (sh - 1) * stride[0] + 1
+    span_w = (sw - 1) * stride[1] + 1
+    windows = input2.unfold(2, span_h, dilation_patch[0])[:, :, : patch_size[0]]
+    windows = windows[..., :: stride[0]]
+    windows = windows.unfold(3, span_w, dilation_patch[1])[:, :, :, : patch_size[1]]
+    windows = windows[..., :: stride[1]]
+
+    input1 = input1[:, :, None, None]
+    if max_chunk_elements is None:
+        return (input1 * windows).sum(dim=1)
+
+    disps_per_chunk = max(1, max_chunk_elements // max(1, b * c * sh * sw))
+    if disps_per_chunk >= patch_size[0] * patch_size[1]:
+        return (input1 * windows).sum(dim=1)
+
+    # Chunks of whole patch rows if at least one row fits in the budget, otherwise chunks of part of one row
+    rows_per_chunk = max(1, disps_per_chunk // patch_size[1])
+    cols_per_chunk = min(patch_size[1], disps_per_chunk)
+    corr = torch.empty(
+        b,
+        patch_size[0],
+        patch_size[1],
+        sh,
+        sw,
+        dtype=torch.result_type(input1, windows),
+        device=input1.device,
+    )
+    for i in range(0, patch_size[0], rows_per_chunk):
+        for j in range(0, patch_size[1], cols_per_chunk):
+            corr[:, i : i + rows_per_chunk, j : j + cols_per_chunk] = (
+                input1
+                * windows[:, :, i : i + rows_per_chunk, j : j + cols_per_chunk]
+            ).sum(dim=1)
+    return corr
+
+
+class BatchedSpatialCorrelationSampler(nn.Module):
+    """Apply spatial correlation sampling from two inputs computing all the displacements at once in PyTorch."""
+
+    def __init__(
+        self,
+        kernel_size: Union[int, Tuple[int, int]] = 1,
+        patch_size: Union[int, Tuple[int, int]] = 1,
+        stride: Union[int, Tuple[int, int]] = 1,
+        padding: Union[int, Tuple[int, int]] = 0,
+        dilation: Union[int, Tuple[int, int]] = 1,
+        dilation_patch: Union[int, Tuple[int, int]] = 1,
+        max_chunk_elements: Optional[int] = DEFAULT_CORRELATION_MAX_CHUNK_ELEMENTS,
+    ) -> None:
+        """Initialize BatchedSpatialCorrelationSampler.
+
+        Parameters
+        ----------
+        kernel_size : Union[int, Tuple[int, int]], default 1
+            Total size of your correlation kernel, in pixels
+        patch_size : Union[int, Tuple[int, int]], default 1
+            Total size of your patch, determining how many different shifts will be applied.
+        stride : Union[int, Tuple[int, int]], default 1
+            Stride of the spatial sampler, will modify output height and width.
+        padding : Union[int, Tuple[int, int]], default 0
+            Padding applied to input1 and input2 before applying the correlation sampling, will modify output height and width.
+        dilation : Union[int, Tuple[int, int]], default 1
+            Similar to dilation in convolution.
+        dilation_patch : Union[int, Tuple[int, int]], default 1
+            Step for every shift in patch.
+        max_chunk_elements : Optional[int], default DEFAULT_CORRELATION_MAX_CHUNK_ELEMENTS
+            Maximum number of elements of the intermediate product of each chunk, or None to disable the chunking.
+            See batched_spatial_correlation_sample.
+        """
+        super(BatchedSpatialCorrelationSampler, self).__init__()
+        self.kernel_size = kernel_size
+        self.patch_size = patch_size
+        self.stride = stride
+        self.padding = padding
+        self.dilation = dilation
+        self.dilation_patch = dilation_patch
+        self.max_chunk_elements = max_chunk_elements
+
+    def forward(self, input1: torch.Tensor, input2: torch.Tensor) -> torch.Tensor:
+        """Compute the correlation sampling from input1 to input2.
+
+        Parameters
+        ----------
+        input1 : torch.Tensor
+            The origin feature map.
+        input2 : torch.Tensor
+            The target feature map.
+
+        Returns
+        -------
+        torch.Tensor
+            Result of correlation sampling.
+        """
+        return batched_spatial_correlation_sample(
+            input1=input1,
+            input2=input2,
+            kernel_size=self.kernel_size,
+            patch_size=self.patch_size,
+            stride=self.stride,
+            padding=self.padding,
+            dilation=self.dilation,
+            dilation_patch=self.dilation_patch,
+            max_chunk_elements=self.max_chunk_elements,
+        )
+
+
+def is_alt_cuda_corr_supported(
+    alt_cuda_corr: Optional[ModuleType], tensor: torch.Tensor
+) -> bool:
+    """Check if the compiled alt_cuda_corr extension can process the given tensor.
+
+    The extension in ptlflow/utils/external/alt_cuda_corr always includes a CPU implementation, and the CUDA one
+    is added when it is compiled with CUDA. Older builds only contain the CUDA implementation.
+
+    Parameters
+    ----------
+    alt_cuda_corr : Optional[ModuleType]
+        The imported alt_cuda_corr module, or None if it could not be imported.
+    tensor : torch.Tensor
+        One of the inputs of the correlation, used to check its device.
+
+    Returns
+    -------
+    bool
+        True if alt_cuda_corr can be used with tensors on this device.
+    """
+    if alt_cuda_corr is None:
+        return False
+    if tensor.is_cuda:
+        return getattr(alt_cuda_corr, "with_cuda", True)
+    return tensor.device.type == "cpu" and getattr(alt_cuda_corr, "with_cpu", False)
+
+
+def _to_pair(x: Union[int, Tuple[int, int]]) -> Tuple[int, int]:
+    return (x, x) if isinstance(x, int) else tuple(x)
+
+
 def _init_coords_grid(flow: torch.Tensor) -> torch.Tensor:
     """Creates a grid of absolute 2D coordinates.
 
@@ -439,12 +673,245 @@ class IterTranslatedSpatialCorrelationSampler(nn.Module):
         )
 
 
+def batched_translated_spatial_correlation_sample(
+    input1: torch.Tensor,
+    input2: torch.Tensor,
+    flow: Optional[torch.Tensor] = None,
+    coords: Optional[torch.Tensor] = None,
+    kernel_size: Union[int, Tuple[int, int]] = 1,
+    patch_size: Union[int, Tuple[int, int]] = 1,
+    stride: Union[int, Tuple[int, int]] = 1,
+    padding: Union[int, Tuple[int, int]] = 0,
+    dilation: Union[int, Tuple[int, int]] = 1,
+    dilation_patch: Union[int, Tuple[int, int]] = 1,
+    coords_grid: Optional[torch.Tensor] = None,
+    max_chunk_elements: Optional[int] = None,
+) -> torch.Tensor:
+    """Apply spatial correlation sampling with translation from input1 to input2 sampling all the displacements at once.
+
+    This function produces the same output as iter_translated_spatial_correlation_sample, but instead of calling
+    grid_sample once for each displacement of the patch, the grids of all the displacements are stacked and sampled
+    with a single grid_sample call. Only the strided output positions are sampled.
+
+    Parameters
+    ----------
+    input1 : torch.Tensor
+        The origin feature map.
+    input2 : torch.Tensor
+        The target feature map.
+    flow : Optional[torch.Tensor]
+        This argument and "coords" are mutually exclusive, only one of them can be not None.
+        The optical flow field to translate the points from input1. The flow values should be represented in number of pixels
+        (do not provide normalized values, e.g. between -1 and 1). It should be a 4D tensor (b, 2, h, w), where
+        flow[:, 0] represent the horizontal flow and flow[:, 1] the vertical ones.
+    coords : torch.Tensor
+        This argument and "flow" are mutually exclusive, only one of them can be not None.
+        This value should be equivalent to "flow" + "coords_grid".
+    kernel_size : Union[int, Tuple[int, int]], default 1
+        Total size of your correlation kernel, in pixels
+    patch_size : Union[int, Tuple[int, int]], default 1
+        Total size of your patch, determining how many different shifts will be applied.
+    stride : Union[int, Tuple[int, int]], default 1
+        Stride of the spatial sampler, will modify output height and width.
+    padding : Union[int, Tuple[int, int]], default 0
+        Padding applied to input1 and input2 before applying the correlation sampling, will modify output height and width.
+    dilation : Union[int, Tuple[int, int]], default 1
+        Similar to dilation in convolution.
+    dilation_patch : Union[int, Tuple[int, int]], default 1
+        Step for every shift in patch.
+    coords_grid : Optional[torch.Tensor], default None
+        A tensor with the same shape as flow containing a grid of 2D coordinates of the pixels. See
+        iter_translated_spatial_correlation_sample.
+    max_chunk_elements : Optional[int], optional
+        If provided, the displacements are sampled in chunks, and each chunk is multiplied by input1 and reduced
+        before sampling the next one. The chunks are chosen such that the sampled features of each chunk have at most
+        this many elements (at least one displacement is always sampled at once). This caps the peak memory, since the
+        sampled features of the whole patch are never stored together. If None, all the displacements are sampled
+        in a single pass.
+
+    Returns
+    -------
+    torch.Tensor
+        Result of correlation sampling.
+
+    Raises
+    ------
+    NotImplementedError
+        If kernel_size != 1.
+    NotImplementedError
+        If dilation != 1.
+    """
+    assert (flow is None and coords is not None) or (
+        flow is not None and coords is None
+    )
+    kernel_size = _to_pair(kernel_size)
+    patch_size = _to_pair(patch_size)
+    stride = _to_pair(stride)
+    padding = _to_pair(padding)
+    dilation = _to_pair(dilation)
+    dilation_patch = _to_pair(dilation_patch)
+
+    if kernel_size[0] != 1 or kernel_size[1] != 1:
+        raise NotImplementedError("Only kernel_size=1 is supported.")
+    if dilation[0] != 1 or dilation[1] != 1:
+        raise NotImplementedError("Only dilation=1 is supported.")
+
+    if max(padding) > 0:
+        input1 = F.pad(input1, (padding[1], padding[1], padding[0], padding[0]))
+        input2 = F.pad(input2, (padding[1], padding[1], padding[0], padding[0]))
+
+    b, c, h, w = input2.shape
+    input1 = input1[:, :, :: stride[0], :: stride[1]]
+
+    if coords is None:
+        if coords_grid is None:
+            coords_grid = _init_coords_grid(flow)
+        coords = coords_grid + flow
+    coords = coords[:, :, :: stride[0], :: stride[1]]
+    sh, sw = coords.shape[2:4]
+
+    dy = dilation_patch[0] * (
+        torch.arange(patch_size[0], dtype=coords.dtype, device=coords.device)
+        - (patch_size[0] - 1) // 2
+    )
+    dx = dilation_patch[1] * (
+        torch.arange(patch_size[1], dtype=coords.dtype, device=coords.device)
+        - (patch_size[1] - 1) // 2
+    )
+    # Normalized sampling positions of all the displacements, with shape (b, patch_size[0] * patch_size[1], sh, sw)
+    gx = 2 * (coords[:, None, None, 0] + dx[None, None, :, None, None]) / (w - 1) - 1
+    gy = 2 * (coords[:, None, None, 1] + dy[None, :, None, None, None]) / (h - 1) - 1
+    num_disps = patch_size[0] * patch_size[1]
+    gx = gx.expand(-1, patch_size[0], -1, -1, -1).reshape(b, num_disps, sh, sw)
+    gy = gy.expand(-1, -1, patch_size[1], -1, -1).reshape(b, num_disps, sh, sw)
+
+    disps_per_chunk = num_disps
+    if max_chunk_elements is not None:
+        disps_per_chunk = max(1, max_chunk_elements // max(1, b * c * sh * sw))
+
+    input1 = input1[:, :, None]
+    corr_list = []
+    for i in range(0, num_disps, disps_per_chunk):
+        grid = torch.stack(
+            [gx[:, i : i + disps_per_chunk], gy[:, i : i + disps_per_chunk]], dim=-1
+        )
+        n = grid.shape[1]
+        p2 = F.grid_sample(
+            input2,
+            grid.view(b, n * sh, sw, 2),
+            mode="bilinear",
+            align_corners=True,
+        )
+        p2 = p2.view(b, c, n, sh, sw)
+        corr_list.append((input1 * p2).sum(dim=1))
+    corr = corr_list[0] if len(corr_list) == 1 else torch.cat(corr_list, dim=1)
+    return corr.view(b, patch_size[0], patch_size[1], sh, sw)
+
+
+class BatchedTranslatedSpatialCorrelationSampler(nn.Module):
+    """Apply translated spatial correlation sampling from two inputs sampling all the displacements at once in PyTorch.
+
+    This operation is equivalent to first translating the points from input1 using the given flow, and then doing a local
+    correlation sampling around the translated points.
+
+    This allows us to do correlation sampling without warping the second input.
+    """
+
+    def __init__(
+        self,
+        kernel_size: Union[int, Tuple[int, int]] = 1,
+        patch_size: Union[int, Tuple[int, int]] = 1,
+        stride: Union[int, Tuple[int, int]] = 1,
+        padding: Union[int, Tuple[int, int]] = 0,
+        dilation: Union[int, Tuple[int, int]] = 1,
+        dilation_patch: Union[int, Tuple[int, int]] = 1,
+        max_chunk_elements: Optional[int] = None,
+    ) -> None:
+        """Initialize BatchedTranslatedSpatialCorrelationSampler.
+
+        Parameters
+        ----------
+        kernel_size : Union[int, Tuple[int, int]], default 1
+            Total size of your correlation kernel, in pixels
+        patch_size : Union[int, Tuple[int, int]], default 1
+            Total size of your patch, determining how many different shifts will be applied.
+        stride : Union[int, Tuple[int, int]], default 1
+            Stride of the spatial sampler, will modify output height and width.
+        padding : Union[int, Tuple[int, int]], default 0
+            Padding applied to input1 and input2 before applying the correlation sampling, will modify output height and width.
+        dilation : Union[int, Tuple[int, int]], default 1
+            Similar to dilation in convolution.
+        dilation_patch : Union[int, Tuple[int, int]], default 1
+            Step for every shift in patch.
+        max_chunk_elements : Optional[int], optional
+            Maximum number of elements of the sampled features of each chunk. See
+            batched_translated_spatial_correlation_sample.
+        """
+        super(BatchedTranslatedSpatialCorrelationSampler, self).__init__()
+        self.kernel_size = kernel_size
+        self.patch_size = patch_size
+        self.stride = stride
+        self.padding = padding
+        self.dilation = dilation
+        self.dilation_patch = dilation_patch
+        self.max_chunk_elements = max_chunk_elements
+
+        self.coords_grid = None
+
+    def forward(
+        self, input1: torch.Tensor, input2: torch.Tensor, flow: torch.Tensor
+    ) -> torch.Tensor:
+        """Compute the correlation sampling from input1 to input2.
+
+        Parameters
+        ----------
+        input1 : torch.Tensor
+            The origin feature map.
+        input2 : torch.Tensor
+            The target feature map.
+        flow : torch.Tensor
+            The optical flow field to translate the points from input1. The flow values should be represented in number of pixels
+            (do not provide normalized values, e.g. between -1 and 1). It should be a 4D tensor (b, 2, h, w), where
+            flow[:, 0] represent the horizontal flow and flow[:, 1] the vertical ones.
+
+        Returns
+        -------
+        torch.Tensor
+            Result of correlation sampling.
+        """
+        b, _, h, w = flow.shape
+        if (
+            self.coords_grid is None
+            or self.coords_grid.shape[2] != h
+            or self.coords_grid.shape[3] != w
+        ):
+            self.coords_grid = _init_coords_grid(flow)
+        if self.coords_grid.shape[0] != b:
+            self.coords_grid = self.coords_grid[:1].repeat(b, 1, 1, 1)
+
+        return batched_translated_spatial_correlation_sample(
+            input1=input1,
+            input2=input2,
+            flow=flow,
+            kernel_size=self.kernel_size,
+            patch_size=self.patch_size,
+            stride=self.stride,
+            padding=self.padding,
+            dilation=self.dilation,
+            dilation_patch=self.dilation_patch,
+            coords_grid=self.coords_grid,
+            max_chunk_elements=self.max_chunk_elements,
+        )
+
+
 class IterativeCorrBlock(nn.Module):
-    """Another wrapper for iter_translated_spatial_correlation_sample.
+    """Another wrapper for batched_translated_spatial_correlation_sample.
 
     This block is designed to mimic the operations of RAFT's AlternateCorrBlock package (see ptlflow/models/raft/corr.py).
     This block can be used when alt_cuda_corr has not been compiled (see ptlflow/utils/external/alt_cuda_corr).
 
+    All the displacements of each pyramid level are sampled together, in chunks limited by max_chunk_elements.
+
     IMPORTANT: this implementation is slower than alt_cuda_corr.
     """
 
@@ -454,6 +921,7 @@ class IterativeCorrBlock(nn.Module):
         fmap2: torch.Tensor,
         radius: int = 1,
         num_levels: int = 1,
+        max_chunk_elements: Optional[int] = DEFAULT_CORR_BLOCK_MAX_CHUNK_ELEMENTS,
     ):
         """Initialize IterativeCorrBlock.
 
@@ -467,11 +935,16 @@ class IterativeCorrBlock(nn.Module):
             The radius if the correlation patch. The patch_size will be 2 * radius + 1.
         num_levels : int, default 1
             Number of correlation pooling levels to use (see ptlflow/models/raft/corr.py).
+        max_chunk_elements : Optional[int], default DEFAULT_CORR_BLOCK_MAX_CHUNK_ELEMENTS
+            Memory budget of each level, given by the maximum number of elements of the features sampled at once.
+            Larger values are faster, but use more memory. If None, all the displacements are sampled at once.
+            See batched_translated_spatial_correlation_sample.
         """
         super(IterativeCorrBlock, self).__init__()
 
         self.patch_size = 2 * radius + 1
         self.num_levels = num_levels
+        self.max_chunk_elements = max_chunk_elements
 
         self.pyramid = [(fmap1, fmap2)]
         for _ in range(self.num_levels):
@@ -502,11 +975,12 @@ class IterativeCorrBlock(nn.Module):
             fmap2_i = self.pyramid[i][1]
 
             coords_i = coords / 2**i
-            corr = iter_translated_spatial_correlation_sample(
+            corr = batched_translated_spatial_correlation_sample(
                 input1=fmap1_i,
                 input2=fmap2_i,
                 coords=coords_i,
                 patch_size=self.patch_size,
+                max_chunk_elements=self.max_chunk_elements,
             )
             corr = rearrange(corr, "b c d h w -> b (d c) h w")
             corr_list.append(corr)
@@ -1,6 +1,7 @@
 #include <torch/extension.h>
 #include <vector>
 
+#ifdef WITH_CUDA
 // CUDA forward declarations
 std::vector<torch::Tensor> corr_cuda_forward(
     torch::Tensor fmap1,
@@ -14,22 +15,50 @@ std::vector<torch::Tensor> corr_cuda_backward(
   torch::Tensor coords,
   torch::Tensor corr_grad,
   int radius);
+#endif
+
+// CPU forward declarations
+std::vector<torch::Tensor> corr_cpu_forward(
+    torch::Tensor fmap1,
+    torch::Tensor fmap2,
+    torch::Tensor coords,
+    int radius);
+
+std::vector<torch::Tensor> corr_cpu_backward(
+  torch::Tensor fmap1,
+  torch::Tensor fmap2,
+  torch::Tensor coords,
+  torch::Tensor corr_grad,
+  int radius);
 
 // C++ interface
-#define CHECK_CUDA(x) TORCH_CHECK(x.type().is_cuda(), #x " must be a CUDA tensor")
+#define CHECK_CUDA(x) TORCH_CHECK(x.is_cuda(), #x " must be a CUDA tensor")
+#define CHECK_CPU(x) TORCH_CHECK(x.is_cpu(), #x " must be a CPU tensor")
 #define CHECK_CONTIGUOUS(x) TORCH_CHECK(x.is_contiguous(), #x " must be contiguous")
 #define CHECK_INPUT(x) CHECK_CUDA(x); CHECK_CONTIGUOUS(x)
+#define CHECK_CPU_INPUT(x) CHECK_CPU(x); CHECK_CONTIGUOUS(x)
 
 std::vector<torch::Tensor> corr_forward(
     torch::Tensor fmap1,
     torch::Tensor fmap2,
     torch::Tensor coords,
     int radius) {
-  CHECK_INPUT(fmap1);
-  CHECK_INPUT(fmap2);
-  CHECK_INPUT(coords);
+  if (fmap1.is_cuda()) {
+#ifdef WITH_CUDA
+    CHECK_INPUT(fmap1);
+    CHECK_INPUT(fmap2);
+    CHECK_INPUT(coords);
 
-  return corr_cuda_forward(fmap1, fmap2, coords, radius);
+    return corr_cuda_forward(fmap1, fmap2, coords, radius);
+#else
+    TORCH_CHECK(false, "alt_cuda_corr was compiled without CUDA support");
+#endif
+  }
+  CHECK_CPU_INPUT(fmap1);
+  CHECK_CPU_INPUT(fmap2);
+  CHECK_CPU_INPUT(coords);
+
+  return corr_cpu_forward(fmap1, fmap2, coords, radius);
 }
 
 
@@ -39,16 +68,34 @@ std::vector<torch::Tensor> corr_backward(
     torch::Tensor coords,
     torch::Tensor corr_grad,
     int radius) {
-  CHECK_INPUT(fmap1);
-  CHECK_INPUT(fmap2);
-  CHECK_INPUT(coords);
-  CHECK_INPUT(corr_grad);
+  if (fmap1.is_cuda()) {
+#ifdef WITH_CUDA
+    CHECK_INPUT(fmap1);
+    CHECK_INPUT(fmap2);
+    CHECK_INPUT(coords);
+    CHECK_INPUT(corr_grad);
+
+    return corr_cuda_backward(fmap1, fmap2, coords, corr_grad, radius);
+#else
+    TORCH_CHECK(false, "alt_cuda_corr was compiled without CUDA support");
+#endif
+  }
+  CHECK_CPU_INPUT(fmap1);
+  CHECK_CPU_INPUT(fmap2);
+  CHECK_CPU_INPUT(coords);
+  CHECK_CPU_INPUT(corr_grad);
 
-  return corr_cuda_backward(fmap1, fmap2, coords, corr_grad, radius);
+  return corr_cpu_backward(fmap1, fmap2, coords, corr_grad, radius);
 }
 
 
 PYBIND11_MODULE(TORCH_EXTENSION_NAME, m) {
   m.def("forward", &corr_forward, "CORR forward");
   m.def("backward", &corr_backward, "CORR backward");
-}
\ No newline at end of file
+  m.attr("with_cpu") = true;
+#ifdef WITH_CUDA
+  m.attr("with_cuda") = true;
+#else
+  m.attr("with_cuda") = false;
+#endif
+}
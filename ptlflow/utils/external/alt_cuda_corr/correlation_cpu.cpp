@@ -0,0 +1,220 @@
+#include <torch/extension.h>
+#include <ATen/Parallel.h>
+#include <algorithm>
+#include <cmath>
+#include <vector>
+
+// CPU version of the kernels in correlation_kernel.cu.
+// The inputs and outputs follow the same layout:
+//   fmap1: (B, H1, W1, C), fmap2: (B, H2, W2, C), coords: (B, N, H1, W1, 2)
+//   corr: (B, N, (2r+1)*(2r+1), H1, W1)
+
+
+static inline bool within_bounds(int64_t h, int64_t w, int64_t H, int64_t W) {
+  return h >= 0 && h < H && w >= 0 && w < W;
+}
+
+template <typename scalar_t>
+static inline scalar_t dot(const scalar_t* a, const scalar_t* b, int64_t C) {
+  scalar_t s = 0.0;
+  for (int64_t c=0; c<C; c++)
+    s += a[c] * b[c];
+  return s;
+}
+
+template <typename scalar_t>
+static void corr_forward_cpu_kernel(
+    const torch::Tensor& fmap1,
+    const torch::Tensor& fmap2,
+    const torch::Tensor& coords,
+    torch::Tensor& corr,
+    int r)
+{
+  const int64_t B = fmap1.size(0);
+  const int64_t H1 = fmap1.size(1);
+  const int64_t W1 = fmap1.size(2);
+  const int64_t C = fmap1.size(3);
+  const int64_t H2 = fmap2.size(1);
+  const int64_t W2 = fmap2.size(2);
+  const int64_t N = coords.size(1);
+  const int64_t rd = 2*r + 1;
+  const int64_t HW1 = H1 * W1;
+
+  const scalar_t* f1_data = fmap1.data_ptr<scalar_t>();
+  const scalar_t* f2_data = fmap2.data_ptr<scalar_t>();
+  const scalar_t* coords_data = coords.data_ptr<scalar_t>();
+  scalar_t* corr_data = corr.data_ptr<scalar_t>();
+
+  // Each task processes one row of fmap1, so the writes to corr never overlap
+  at::parallel_for(0, B*H1, 1, [&](int64_t begin, int64_t end) {
+    for (int64_t bh=begin; bh<end; bh++) {
+      const int64_t b = bh / H1;
+      const int64_t h1 = bh % H1;
+      for (int64_t w1=0; w1<W1; w1++) {
+        const scalar_t* f1 = f1_data + ((b*H1 + h1)*W1 + w1)*C;
+        for (int64_t n=0; n<N; n++) {
+          const scalar_t* xy = coords_data + (((b*N + n)*H1 + h1)*W1 + w1)*2;
+          const scalar_t x2 = xy[0];
+          const scalar_t y2 = xy[1];
+          const scalar_t dx = x2 - std::floor(x2);
+          const scalar_t dy = y2 - std::floor(y2);
+          const int64_t x0 = static_cast<int64_t>(std::floor(x2)) - r;
+          const int64_t y0 = static_cast<int64_t>(std::floor(y2)) - r;
+
+          scalar_t* corr_ptr = corr_data + (b*N + n)*rd*rd*HW1 + h1*W1 + w1;
+          for (int64_t iy=0; iy<rd+1; iy++) {
+            for (int64_t ix=0; ix<rd+1; ix++) {
+              const int64_t h2 = y0 + iy;
+              const int64_t w2 = x0 + ix;
+              if (!within_bounds(h2, w2, H2, W2))
+                continue;
+
+              const scalar_t s = dot(f1, f2_data + ((b*H2 + h2)*W2 + w2)*C, C);
+
+              if (iy > 0 && ix > 0)
+                corr_ptr[HW1*((iy-1) + rd*(ix-1))] += s * dy * dx;
+              if (iy > 0 && ix < rd)
+                corr_ptr[HW1*((iy-1) + rd*ix)] += s * dy * (1-dx);
+              if (iy < rd && ix > 0)
+                corr_ptr[HW1*(iy + rd*(ix-1))] += s * (1-dy) * dx;
+              if (iy < rd && ix < rd)
+                corr_ptr[HW1*(iy + rd*ix)] += s * (1-dy) * (1-dx);
+            }
+          }
+        }
+      }
+    }
+  });
+}
+
+template <typename scalar_t>
+static void corr_backward_cpu_kernel(
+    const torch::Tensor& fmap1,
+    const torch::Tensor& fmap2,
+    const torch::Tensor& coords,
+    const torch::Tensor& corr_grad,
+    torch::Tensor& fmap1_grad,
+    torch::Tensor& fmap2_grad,
+    int r)
+{
+  const int64_t B = fmap1.size(0);
+  const int64_t H1 = fmap1.size(1);
+  const int64_t W1 = fmap1.size(2);
+  const int64_t C = fmap1.size(3);
+  const int64_t H2 = fmap2.size(1);
+  const int64_t W2 = fmap2.size(2);
+  const int64_t N = coords.size(1);
+  const int64_t rd = 2*r + 1;
+  const int64_t HW1 = H1 * W1;
+
+  const scalar_t* f1_data = fmap1.data_ptr<scalar_t>();
+  const scalar_t* f2_data = fmap2.data_ptr<scalar_t>();
+  const scalar_t* coords_data = coords.data_ptr<scalar_t>();
+  const scalar_t* grad_data = corr_grad.data_ptr<scalar_t>();
+  scalar_t* f1_grad_data = fmap1_grad.data_ptr<scalar_t>();
+  scalar_t* f2_grad_data = fmap2_grad.data_ptr<scalar_t>();
+
+  // Many pixels of fmap1 accumulate gradients into the same pixel of fmap2. To avoid
+  // atomic operations, each task processes a disjoint block of channels instead.
+  const int64_t channel_block = 8;
+  const int64_t num_channel_blocks = (C + channel_block - 1) / channel_block;
+  at::parallel_for(0, B*num_channel_blocks, 1, [&](int64_t begin, int64_t end) {
+    for (int64_t bc=begin; bc<end; bc++) {
+      const int64_t b = bc / num_channel_blocks;
+      const int64_t c0 = (bc % num_channel_blocks) * channel_block;
+      const int64_t c1 = std::min(c0 + channel_block, C);
+      for (int64_t h1=0; h1<H1; h1++) {
+        for (int64_t w1=0; w1<W1; w1++) {
+          const int64_t p1 = ((b*H1 + h1)*W1 + w1)*C;
+          for (int64_t n=0; n<N; n++) {
+            const scalar_t* xy = coords_data + (((b*N + n)*H1 + h1)*W1 + w1)*2;
+            const scalar_t x2 = xy[0];
+            const scalar_t y2 = xy[1];
+            const scalar_t dx = x2 - std::floor(x2);
+            const scalar_t dy = y2 - std::floor(y2);
+            const int64_t x0 = static_cast<int64_t>(std::floor(x2)) - r;
+            const int64_t y0 = static_cast<int64_t>(std::floor(y2)) - r;
+
+            const scalar_t* grad_ptr = grad_data + (b*N + n)*rd*rd*HW1 + h1*W1 + w1;
+            for (int64_t iy=0; iy<rd+1; iy++) {
+              for (int64_t ix=0; ix<rd+1; ix++) {
+                const int64_t h2 = y0 + iy;
+                const int64_t w2 = x0 + ix;
+                if (!within_bounds(h2, w2, H2, W2))
+                  continue;
+
+                scalar_t g = 0.0;
+                if (iy > 0 && ix > 0)
+                  g += grad_ptr[HW1*((iy-1) + rd*(ix-1))] * dy * dx;
+                if (iy > 0 && ix < rd)
+                  g += grad_ptr[HW1*((iy-1) + rd*ix)] * dy * (1-dx);
+                if (iy < rd && ix > 0)
+                  g += grad_ptr[HW1*(iy + rd*(ix-1))] * (1-dy) * dx;
+                if (iy < rd && ix < rd)
+                  g += grad_ptr[HW1*(iy + rd*ix)] * (1-dy) * (1-dx);
+
+                const int64_t p2 = ((b*H2 + h2)*W2 + w2)*C;
+                for (int64_t c=c0; c<c1; c++) {
+                  f1_grad_data[p1+c] += g * f2_data[p2+c];
+                  f2_grad_data[p2+c] += g * f1_data[p1+c];
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  });
+}
+
+
+std::vector<torch::Tensor> corr_cpu_forward(
+  torch::Tensor fmap1,
+  torch::Tensor fmap2,
+  torch::Tensor coords,
+  int radius)
+{
+  const auto B = coords.size(0);
+  const auto N = coords.size(1);
+  const auto H = coords.size(2);
+  const auto W = coords.size(3);
+
+  const auto rd = 2 * radius + 1;
+  auto opts = fmap1.options();
+  auto corr = torch::zeros({B, N, rd*rd, H, W}, opts);
+
+  AT_DISPATCH_FLOATING_TYPES(fmap1.scalar_type(), "corr_cpu_forward", ([&] {
+    corr_forward_cpu_kernel<scalar_t>(fmap1, fmap2, coords, corr, radius);
+  }));
+
+  return {corr};
+}
+
+std::vector<torch::Tensor> corr_cpu_backward(
+  torch::Tensor fmap1,
+  torch::Tensor fmap2,
+  torch::Tensor coords,
+  torch::Tensor corr_grad,
+  int radius)
+{
+  const auto B = coords.size(0);
+  const auto N = coords.size(1);
+
+  const auto H1 = fmap1.size(1);
+  const auto W1 = fmap1.size(2);
+  const auto H2 = fmap2.size(1);
+  const auto W2 = fmap2.size(2);
+  const auto C = fmap1.size(3);
+
+  auto opts = fmap1.options();
+  auto fmap1_grad = torch::zeros({B, H1, W1, C}, opts);
+  auto fmap2_grad = torch::zeros({B, H2, W2, C}, opts);
+  auto coords_grad = torch::zeros({B, N, H1, W1, 2}, opts);
+
+  AT_DISPATCH_FLOATING_TYPES(fmap1.scalar_type(), "corr_cpu_backward", ([&] {
+    corr_backward_cpu_kernel<scalar_t>(
+      fmap1, fmap2, coords, corr_grad, fmap1_grad, fmap2_grad, radius);
+  }));
+
+  return {fmap1_grad, fmap2_grad, coords_grad};
+}
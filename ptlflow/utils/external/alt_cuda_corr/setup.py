@@ -1,15 +1,33 @@
+import os
+
 from setuptools import setup
-from torch.utils.cpp_extension import BuildExtension, CUDAExtension
+from torch.utils.cpp_extension import (
+    CUDA_HOME,
+    BuildExtension,
+    CppExtension,
+    CUDAExtension,
+)
 
+# The CPU version is always compiled. The CUDA version is added when the CUDA toolkit is found,
+# unless the environment variable ALT_CORR_CPU_ONLY=1 is set.
+sources = ["correlation.cpp", "correlation_cpu.cpp"]
+cxx_args = ["/O2"] if os.name == "nt" else ["-O3"]
+if CUDA_HOME is not None and os.environ.get("ALT_CORR_CPU_ONLY", "0") != "1":
+    extension = CUDAExtension(
+        "alt_cuda_corr",
+        sources=sources + ["correlation_kernel.cu"],
+        define_macros=[("WITH_CUDA", None)],
+        extra_compile_args={"cxx": cxx_args, "nvcc": ["-O3"]},
+    )
+else:
+    extension = CppExtension(
+        "alt_cuda_corr",
+        sources=sources,
+        extra_compile_args={"cxx": cxx_args},
+    )
 
 setup(
     name="correlation",
-    ext_modules=[
-        CUDAExtension(
-            "alt_cuda_corr",
-            sources=["correlation.cpp", "correlation_kernel.cu"],
-            extra_compile_args={"cxx": [], "nvcc": ["-O3"]},
-        ),
-    ],
+    ext_modules=[extension],
     cmdclass={"build_ext": BuildExtension},
 )
@@ -121,6 +121,7 @@ class FlowMetrics(Metric):
 
         self.include_occlusion = False
 
+        self.flow_metric_names = ["epe", "px1", "px3", "px5", "outlier"]
         self.used_keys = []
 
     def update(
@@ -170,45 +171,44 @@ class FlowMetrics(Metric):
         px3_mask = (epe < 3).float()
         px5_mask = (epe < 5).float()
         outlier_mask = ((epe > 3) & (epe > (0.05 * target_norm))).float() * 100
-        self.used_keys = [
-            ("epe", "epe", "valid_target"),
-            ("px1", "px1_mask", "valid_target"),
-            ("px3", "px3_mask", "valid_target"),
-            ("px5", "px5_mask", "valid_target"),
-            ("outlier", "outlier_mask", "valid_target"),
-        ]
 
+        # All the flow metrics are reduced at once for every valid region (all, occluded, non-occluded)
+        flow_values = torch.stack([epe, px1_mask, px3_mask, px5_mask, outlier_mask], 1)
+        flow_masks = [valid_target]
+        mask_suffixes = [""]
         if occlusion_target is not None:
-            valid_occ = occlusion_target[:, 0] * valid_target
-            valid_non_occ = (1 - occlusion_target[:, 0]) * valid_target
-            self.used_keys.extend(
-                [
-                    ("epe_occ", "epe", "valid_occ"),
-                    ("epe_non_occ", "epe", "valid_non_occ"),
-                    ("px1_occ", "px1_mask", "valid_occ"),
-                    ("px1_non_occ", "px1_mask", "valid_non_occ"),
-                    ("px3_occ", "px3_mask", "valid_occ"),
-                    ("px3_non_occ", "px3_mask", "valid_non_occ"),
-                    ("px5_occ", "px5_mask", "valid_occ"),
-                    ("px5_non_occ", "px5_mask", "valid_non_occ"),
-                    ("outlier_occ", "outlier_mask", "valid_occ"),
-                    ("outlier_non_occ", "outlier_mask", "valid_non_occ"),
-                ]
-            )
+            flow_masks.append(occlusion_target[:, 0] * valid_target)
+            flow_masks.append((1 - occlusion_target[:, 0]) * valid_target)
+            mask_suffixes.extend(["_occ", "_non_occ"])
             self.include_occlusion = True
+        flow_totals = self._compute_masked_totals(
+            flow_values, torch.stack(flow_masks, 1)
+        )
+
+        totals = {}
+        for i, suffix in enumerate(mask_suffixes):
+            for j, name in enumerate(self.flow_metric_names):
+                totals[name + suffix] = flow_totals[i, j]
+
+        self.used_keys = list(self.flow_metric_names)
+        if occlusion_target is not None:
+            for name in self.flow_metric_names:
+                self.used_keys.extend([name + "_occ", name + "_non_occ"])
 
             if preds.get("occs") is not None:
                 occlusion_pred = self._fix_shape(preds["occs"], batch_size)
                 occ_f1 = self._f1_score(
                     occlusion_pred, occlusion_target, mode=self.f1_mode
                 )
-                self.used_keys.extend([("occ_f1", "occ_f1", "valid_target")])
+                totals["occ_f1"] = self._compute_total(occ_f1, valid_target)
+                self.used_keys.append("occ_f1")
 
         if preds.get("mbs") is not None and targets.get("mbs") is not None:
             mb_pred = self._fix_shape(preds["mbs"], batch_size)
             mb_target = self._fix_shape(targets["mbs"], batch_size)
             mb_f1 = self._f1_score(mb_pred, mb_target, mode=self.f1_mode)
-            self.used_keys.extend([("mb_f1", "mb_f1", "valid_target")])
+            totals["mb_f1"] = self._compute_total(mb_f1, valid_target)
+            self.used_keys.append("mb_f1")
 
         if preds.get("confs") is not None:
             conf_target = torch.exp(
@@ -216,15 +216,11 @@ class FlowMetrics(Metric):
             )
             conf_pred = self._fix_shape(preds["confs"], batch_size)
             conf_f1 = self._f1_score(conf_pred, conf_target, mode=self.f1_mode)
-            self.used_keys.extend([("conf_f1", "conf_f1", "valid_target")])
-
-        for v1, v2, v3 in self.used_keys:
-            setattr(
-                self,
-                v1,
-                prev_weight * getattr(self, v1)
-                + next_weight * self._compute_total(locals()[v2], locals()[v3]),
-            )
+            totals["conf_f1"] = self._compute_total(conf_f1, valid_target)
+            self.used_keys.append("conf_f1")
+
+        for k in self.used_keys:
+            setattr(self, k, prev_weight * getattr(self, k) + next_weight * totals[k])
 
         self.sample_count += batch_size
         self.step_count += 1
@@ -249,7 +245,7 @@ class FlowMetrics(Metric):
 
         metrics = {}
         for k in self.used_keys:
-            metrics[self.prefix + k[0]] = getattr(self, k[0]) / divider
+            metrics[self.prefix + k] = getattr(self, k) / divider
 
         return metrics
 
@@ -279,6 +275,34 @@ class FlowMetrics(Metric):
             tensor = tensor.mean()
         return tensor
 
+    def _compute_masked_totals(
+        self, values: torch.Tensor, masks: torch.Tensor
+    ) -> torch.Tensor:
+        """Compute _compute_total for every pair of value and mask channels with a single reduction.
+
+        Parameters
+        ----------
+        values : torch.Tensor
+            Tensor with shape (B, K, H, W) with K per-pixel metrics.
+        masks : torch.Tensor
+            Tensor with shape (B, M, H, W) with M valid masks.
+
+        Returns
+        -------
+        torch.Tensor
+            Tensor with shape (M, K), where the element (m, k) is equal to _compute_total(values[:, k], masks[:, m]).
+        """
+        values = values.reshape(values.shape[0], values.shape[1], -1)
+        masks = masks.reshape(masks.shape[0], masks.shape[1], -1).to(values.dtype)
+        masked_sums = torch.einsum("bkn,bmn->bmk", values, masks)
+        valid_sums = torch.clamp(masks.sum(dim=2), 1)
+        totals = masked_sums / valid_sums[:, :, None]
+        if self.average_mode == "epoch_mean":
+            totals = totals.sum(dim=0)
+        else:
+            totals = totals.mean(dim=0)
+        return totals
+
     def _f1_score(
         self, pred: torch.Tensor, target: torch.Tensor, mode: str = "macro"
     ) -> torch.Tensor:
@@ -17,7 +17,9 @@
 # =============================================================================
 
 import pathlib
-from typing import IO, Optional, Union
+import re
+import warnings
+from typing import IO, Optional, Sequence, Union
 
 import cv2 as cv
 import numpy as np
@@ -79,6 +81,7 @@ def flow_read(
     format: Optional[str] = None,
     flow_min: Optional[float] = None,
     flow_max: Optional[float] = None,
+    mmap: bool = False,
 ) -> np.ndarray:
     """Read optical flow from file.
 
@@ -91,6 +94,9 @@ def flow_read(
     format: str, optional
         Specify in what format the flow is read, accepted formats: "png", "flo", "pfm", "flo5", "kubric_png".
         If None, it is guessed on the file extension.
+    mmap: bool, default False
+        If True, .flo and .pfm files are memory-mapped instead of being read into new arrays. The returned array is a
+        copy-on-write view of the file, so it can be modified without changing the file. Other formats ignore this option.
 
     Returns
     -------
@@ -106,16 +112,184 @@ def flow_read(
     ptlflow.utils.external.flow_IO.readFlo5Flow
     write_pfm
     """
-    if (format is not None and format == "pfm") or str(input_file).endswith("pfm"):
+    input_format = _get_flow_format(input_file, format)
+    if mmap and isinstance(input_file, (str, pathlib.Path)):
+        if input_format == "flo":
+            return flow_read_flo_mmap(input_file)
+        elif input_format == "pfm":
+            return flow_read_pfm_mmap(input_file)
+
+    if input_format == "pfm":
         return raft.read_pfm(input_file)
-    elif (format is not None and format == "flo5") or str(input_file).endswith("flo5"):
+    elif input_format == "flo5":
         return flow_IO.readFlo5Flow(input_file)
-    elif format is not None and format == "kubric_png":
+    elif input_format == "kubric_png":
         return read_kubric_flow(input_file, flow_min=flow_min, flow_max=flow_max)
     else:
         return flowpy.flow_read(input_file, format)
 
 
+def flow_read_many(
+    input_files: Sequence[Union[str, pathlib.Path]],
+    format: Optional[str] = None,
+    flow_min: Optional[float] = None,
+    flow_max: Optional[float] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Read multiple optical flow files with the same size into a single array.
+
+    The .flo files are read directly into the output array, and the .pfm files are copied from memory-mapped views, so no
+    intermediate arrays are allocated for these formats. Passing the array returned by a previous call as out allows to
+    read many batches of files reusing the same buffer.
+
+    Parameters
+    ----------
+    input_files : Sequence[Union[str, pathlib.Path]]
+        Paths of the files to read.
+    format: str, optional
+        Specify in what format the flow is read. See flow_read().
+    flow_min: float, optional
+        Only used by the kubric_png format. See read_kubric_flow().
+    flow_max: float, optional
+        Only used by the kubric_png format. See read_kubric_flow().
+    out : Optional[np.ndarray], optional
+        A float32 array with shape (N, H, W, 2) to store the flows. If it is not provided, or if its shape does not
+        match the files, a new array is allocated.
+
+    Returns
+    -------
+    numpy.ndarray
+        4D flows in the NHWF (Number of files, Height, Width, Flow) layout.
+    """
+    for i, path in enumerate(input_files):
+        input_format = _get_flow_format(path, format)
+        flow = None
+        if input_format == "flo":
+            width, height = _read_flo_header(path)
+        elif input_format == "pfm":
+            flow = flow_read_pfm_mmap(path)
+            height, width = flow.shape[:2]
+        else:
+            flow = flow_read(path, format, flow_min=flow_min, flow_max=flow_max)
+            height, width = flow.shape[:2]
+
+        if i == 0 and (
+            out is None
+            or out.shape != (len(input_files), height, width, 2)
+            or out.dtype != np.float32
+            or not out.flags.c_contiguous
+        ):
+            out = np.empty((len(input_files), height, width, 2), np.float32)
+
+        if input_format == "flo":
+            with open(path, "rb") as f:
+                f.seek(12)
+                num_bytes = f.readinto(memoryview(out[i]).cast("B"))
+            if num_bytes != out[i].nbytes:
+                raise ValueError(f"{path} is truncated.")
+            if np.dtype("<f4") != np.dtype("=f4"):
+                out[i].byteswap(inplace=True)
+            _mark_invalid_flo_values(out[i])
+        else:
+            np.copyto(out[i], flow)
+    return out
+
+
+def flow_read_flo_mmap(input_file: Union[str, pathlib.Path]) -> np.ndarray:
+    """Read a .flo file by memory-mapping it.
+
+    Parameters
+    ----------
+    input_file: str or pathlib.Path
+        Path of the file to read.
+
+    Returns
+    -------
+    numpy.ndarray
+        3D flow in the HWF (Height, Width, Flow) layout. It is a copy-on-write view of the file. Invalid values are set to
+        NaN, as in flowpy.flow_read.
+    """
+    width, height = _read_flo_header(input_file)
+    flow = np.memmap(
+        input_file, dtype="<f4", mode="c", offset=12, shape=(height, width, 2)
+    )
+    _mark_invalid_flo_values(flow)
+    return flow
+
+
+def flow_read_pfm_mmap(input_file: Union[str, pathlib.Path]) -> np.ndarray:
+    """Read a .pfm flow file by memory-mapping it.
+
+    The rows are flipped and the validity channel is removed with views, so no data is copied, unless the file is
+    big-endian.
+
+    Parameters
+    ----------
+    input_file: str or pathlib.Path
+        Path of the file to read.
+
+    Returns
+    -------
+    numpy.ndarray
+        3D flow in the HWF (Height, Width, Flow) layout. Invalid values are set to NaN, as in raft.read_pfm.
+    """
+    with open(input_file, "rb") as f:
+        header = f.readline().rstrip()
+        dim_match = re.match(rb"^(\d+)\s(\d+)\s$", f.readline())
+        scale = f.readline()
+        offset = f.tell()
+    if header != b"PF" or not dim_match:
+        # Grayscale or unusual headers are handled by the default reader
+        return raft.read_pfm(input_file)
+    width, height = map(int, dim_match.groups())
+    endian = "<" if float(scale.rstrip()) < 0 else ">"
+
+    data = np.memmap(
+        input_file,
+        dtype=endian + "f4",
+        mode="c",
+        offset=offset,
+        shape=(height, width, 3),
+    )
+    data = data[::-1]
+    flow = data[:, :, :2]
+    if endian != "<" or np.dtype("<f4") != np.dtype("=f4"):
+        flow = flow.astype(np.float32)
+    invalid = data[:, :, 2] > 0.5
+    if invalid.any():
+        flow[invalid] = float("nan")
+    return flow
+
+
+def _get_flow_format(
+    input_file: Union[str, pathlib.Path, IO], format: Optional[str]
+) -> str:
+    # Same priority as the dispatch originally done in flow_read
+    if (format is not None and format == "pfm") or str(input_file).endswith("pfm"):
+        return "pfm"
+    elif (format is not None and format == "flo5") or str(input_file).endswith("flo5"):
+        return "flo5"
+    elif format is not None:
+        return format
+    elif isinstance(input_file, (str, pathlib.Path)):
+        return pathlib.Path(input_file).suffix[1:]
+    return pathlib.Path(input_file.name).suffix[1:]
+
+
+def _read_flo_header(input_file: Union[str, pathlib.Path]) -> Sequence[int]:
+    with open(input_file, "rb") as f:
+        header = f.read(12)
+    if header[:4] != b"PIEH":
+        warnings.warn(f"{input_file} does not have a .flo file signature")
+    return np.frombuffer(header[4:], dtype="<u4").tolist()
+
+
+def _mark_invalid_flo_values(flow: np.ndarray) -> None:
+    invalid = (np.abs(flow) > 1e9).any(axis=2)
+    if invalid.any():
+        flow[invalid] = np.nan
+
+
 def flow_write(
     output_file: Union[str, pathlib.Path, IO], flow: np.ndarray, format: str = None
 ) -> None:
@@ -0,0 +1,340 @@
+"""Estimate optical flow on large images by splitting them into overlapping tiles.
+
+Models with correlation volumes or global attention need memory that grows quickly with the image size, so they often
+cannot process 4K frames at once. TiledInference wraps any BaseModel, runs it on overlapping crops of the input pair,
+and blends the flows of the crops with smooth weight windows. Optionally, a first pass on a downscaled version of the
+whole pair is used to shift the crops of the second image, so that displacements larger than the tiles are still found.
+
+Only the flows are produced: other outputs of the models (e.g., occlusions) and inputs such as the previous
+predictions used for warm start are not supported.
+"""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import logging
+import math
+from argparse import ArgumentParser, Namespace
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+import torch.nn.functional as F
+
+from ptlflow.models.base_model.base_model import BaseModel
+
+# Default number of pixels of one forward pass of the model: the area of a 1024x1024 image
+DEFAULT_TILE_MAX_PIXELS = 2**20
+
+
+class TiledInference(object):
+    """Run a model on overlapping tiles of the inputs and blend the predicted flows.
+
+    The tiles of all the pairs of the batch are forwarded in batches of up to max_pixels pixels. The flow of each
+    tile is weighted by a window that decays linearly inside the overlap region, so that the seams between tiles are
+    smooth, and the weighted sum is normalized by the sum of the windows.
+
+    When guided is True, the whole pair is first downscaled to fit in max_pixels and forwarded once. Then, the crop
+    of the second image of each tile is shifted by the median of this coarse flow inside the tile, and the shift is
+    added back to the predicted flow. This allows the tiles to capture displacements which are larger than the tile.
+    """
+
+    def __init__(
+        self,
+        model: BaseModel,
+        tile_size: Optional[Tuple[int, int]] = None,
+        overlap: int = 64,
+        max_pixels: int = DEFAULT_TILE_MAX_PIXELS,
+        guided: bool = False,
+    ) -> None:
+        """Initialize TiledInference.
+
+        Parameters
+        ----------
+        model : BaseModel
+            The model to be used for each tile.
+        tile_size : Optional[Tuple[int, int]], default None
+            The (height, width) of the tiles. If None, the tiles are the largest squares with at most max_pixels
+            pixels, and with sides which are multiples of the model output_stride.
+        overlap : int, default 64
+            Number of pixels shared by neighboring tiles.
+        max_pixels : int, default DEFAULT_TILE_MAX_PIXELS
+            Memory budget, as the maximum number of pixels of each forward pass (number of tiles x tile area).
+        guided : bool, default False
+            If True, a downscaled pass on the whole pair is used to shift the tiles of the second image.
+
+        Raises
+        ------
+        ValueError
+            If max_pixels is not positive or if the overlap is negative.
+        """
+        if max_pixels <= 0:
+            raise ValueError(f"max_pixels must be positive. Found: {max_pixels}.")
+        if overlap < 0:
+            raise ValueError(f"overlap cannot be negative. Found: {overlap}.")
+
+        self.model = model
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.max_pixels = max_pixels
+        self.guided = guided
+
+    def __call__(self, inputs: Dict[str, Any]) -> Dict[str, torch.Tensor]:
+        """Estimate the flow of the whole input pairs.
+
+        Parameters
+        ----------
+        inputs : Dict[str, Any]
+            The inputs of the model, as prepared by IOAdapter. Only inputs["images"], with shape [B, 2, 3, H, W], is
+            used.
+
+        Returns
+        -------
+        Dict[str, torch.Tensor]
+            The blended predictions. It contains only the key "flows", with shape [B, 1, 2, H, W].
+
+        Raises
+        ------
+        ValueError
+            If the overlap is not smaller than the tile size along an axis which is split into multiple tiles.
+        """
+        images = inputs["images"]
+        b, _, _, height, width = images.shape
+        tile_h, tile_w = self._get_tile_size(height, width)
+        if tile_h >= height and tile_w >= width:
+            return {"flows": self.model({"images": images})["flows"]}
+        # The overlap only matters for the axes which are split into multiple tiles
+        for size, tile_size in [(height, tile_h), (width, tile_w)]:
+            if tile_size < size and self.overlap >= tile_size:
+                raise ValueError(
+                    f"The overlap ({self.overlap}) must be smaller than the tile size ({tile_h}, {tile_w})."
+                )
+
+        jobs = [
+            (ib, y0, x0)
+            for ib in range(b)
+            for y0 in _get_tile_starts(height, tile_h, self.overlap)
+            for x0 in _get_tile_starts(width, tile_w, self.overlap)
+        ]
+        shifts = self._get_tile_shifts(images, jobs, tile_h, tile_w)
+
+        window = _get_blend_window(tile_h, tile_w, self.overlap, images.device)
+        flow_sum = torch.zeros(
+            b, 2, height, width, dtype=torch.float32, device=images.device
+        )
+        weight_sum = torch.zeros(
+            b, 1, height, width, dtype=torch.float32, device=images.device
+        )
+        tiles_per_forward = max(1, self.max_pixels // (tile_h * tile_w))
+        for i in range(0, len(jobs), tiles_per_forward):
+            batch_jobs = jobs[i : i + tiles_per_forward]
+            batch_shifts = shifts[i : i + tiles_per_forward]
+            tiles = [
+                torch.stack(
+                    [
+                        images[ib, 0, :, y0 : y0 + tile_h, x0 : x0 + tile_w],
+                        images[
+                            ib,
+                            1,
+                            :,
+                            y0 + dy : y0 + dy + tile_h,
+                            x0 + dx : x0 + dx + tile_w,
+                        ],
+                    ]
+                )
+                for (ib, y0, x0), (dx, dy) in zip(batch_jobs, batch_shifts)
+            ]
+            flows = self.model({"images": torch.stack(tiles)})["flows"][:, 0].float()
+            for (ib, y0, x0), (dx, dy), flow in zip(batch_jobs, batch_shifts, flows):
+                if dx != 0 or dy != 0:
+                    flow = flow + flow.new_tensor([dx, dy]).view(2, 1, 1)
+                flow_sum[ib, :, y0 : y0 + tile_h, x0 : x0 + tile_w] += flow * window
+                weight_sum[ib, :, y0 : y0 + tile_h, x0 : x0 + tile_w] += window
+
+        flows = (flow_sum / weight_sum).to(dtype=images.dtype)
+        return {"flows": flows[:, None]}
+
+    def _get_tile_size(self, height: int, width: int) -> Tuple[int, int]:
+        if self.tile_size is not None:
+            tile_h, tile_w = self.tile_size
+        else:
+            stride = self.model.output_stride
+            side = int(math.sqrt(self.max_pixels))
+            side = max(stride, side // stride * stride)
+            tile_h = tile_w = side
+        return min(tile_h, height), min(tile_w, width)
+
+    def _get_tile_shifts(
+        self,
+        images: torch.Tensor,
+        jobs: List[Tuple[int, int, int]],
+        tile_h: int,
+        tile_w: int,
+    ) -> List[Tuple[int, int]]:
+        if not self.guided:
+            return [(0, 0)] * len(jobs)
+
+        global_flow = self._forward_global(images)
+        medians = torch.stack(
+            [
+                global_flow[ib, :, y0 : y0 + tile_h, x0 : x0 + tile_w]
+                .flatten(1)
+                .median(dim=1)
+                .values
+                for ib, y0, x0 in jobs
+            ]
+        )
+        medians = medians.round().long().tolist()
+
+        # Keep the shifted crops inside the image
+        height, width = images.shape[-2:]
+        shifts = []
+        for (_, y0, x0), (dx, dy) in zip(jobs, medians):
+            dx = min(max(dx, -x0), width - tile_w - x0)
+            dy = min(max(dy, -y0), height - tile_h - y0)
+            shifts.append((dx, dy))
+        return shifts
+
+    def _forward_global(self, images: torch.Tensor) -> torch.Tensor:
+        b, _, _, height, width = images.shape
+        scale = min(1.0, math.sqrt(self.max_pixels / (height * width)))
+        small_h = max(1, int(round(height * scale)))
+        small_w = max(1, int(round(width * scale)))
+        small_images = F.interpolate(
+            images.flatten(0, 1),
+            size=(small_h, small_w),
+            mode="bilinear",
+            align_corners=False,
+        ).view(b, 2, -1, small_h, small_w)
+
+        flows = [
+            self.model({"images": small_images[i : i + 1]})["flows"][:, 0]
+            for i in range(b)
+        ]
+        flow = torch.cat(flows, 0).float()
+        flow = F.interpolate(
+            flow, size=(height, width), mode="bilinear", align_corners=False
+        )
+        flow[:, 0] *= float(width) / small_w
+        flow[:, 1] *= float(height) / small_h
+        return flow
+
+
+def add_tiling_args_to_parser(parser: ArgumentParser) -> ArgumentParser:
+    """Add the arguments to configure TiledInference to a parser.
+
+    Parameters
+    ----------
+    parser : ArgumentParser
+        An initialized parser.
+
+    Returns
+    -------
+    ArgumentParser
+        The same parser, with the tiling arguments.
+    """
+    parser.add_argument(
+        "--tiled",
+        action="store_true",
+        help=(
+            "If set, the flow is estimated on overlapping tiles of the inputs, which are blended together. Useful for "
+            "high resolution inputs that do not fit in memory. Only the flows are produced (e.g., occlusions are not "
+            "available), and it cannot be combined with --warm_start. See ptlflow.utils.tiling.TiledInference."
+        ),
+    )
+    parser.add_argument(
+        "--tile_size",
+        type=int,
+        nargs=2,
+        default=None,
+        help="Only used with --tiled. (height, width) of the tiles. If not set, it is derived from --tile_max_pixels.",
+    )
+    parser.add_argument(
+        "--tile_overlap",
+        type=int,
+        default=64,
+        help="Only used with --tiled. Number of pixels shared by neighboring tiles.",
+    )
+    parser.add_argument(
+        "--tile_max_pixels",
+        type=int,
+        default=DEFAULT_TILE_MAX_PIXELS,
+        help="Only used with --tiled. Memory budget, as the maximum number of pixels forwarded by the model at once.",
+    )
+    parser.add_argument(
+        "--tile_guided",
+        action="store_true",
+        help=(
+            "Only used with --tiled. If set, a downscaled pass on the whole inputs is used to shift the tiles of the "
+            "second image, to capture displacements larger than the tiles."
+        ),
+    )
+    return parser
+
+
+def get_tiled_inference(model: BaseModel, args: Namespace) -> Optional[TiledInference]:
+    """Create a TiledInference from the arguments added by add_tiling_args_to_parser().
+
+    Parameters
+    ----------
+    model : BaseModel
+        The model to be used for each tile.
+    args : Namespace
+        The parsed arguments.
+
+    Returns
+    -------
+    Optional[TiledInference]
+        The configured TiledInference, or None if args.tiled is not set.
+
+    Notes
+    -----
+    TiledInference does not use the previous predictions, so args.warm_start is set to False if it is enabled.
+    """
+    if not getattr(args, "tiled", False):
+        return None
+    if getattr(args, "warm_start", False):
+        logging.warning(
+            "--tiled does not support --warm_start, the predictions will not be initialized from the previous ones."
+        )
+        args.warm_start = False
+    return TiledInference(
+        model,
+        tile_size=args.tile_size,
+        overlap=args.tile_overlap,
+        max_pixels=args.tile_max_pixels,
+        guided=args.tile_guided,
+    )
+
+
+def _get_tile_starts(size: int, tile_size: int, overlap: int) -> List[int]:
+    if tile_size >= size:
+        return [0]
+    stride = tile_size - overlap
+    starts = list(range(0, size - tile_size, stride))
+    starts.append(size - tile_size)
+    return starts
+
+
+def _get_blend_window(
+    tile_h: int, tile_w: int, overlap: int, device: torch.device
+) -> torch.Tensor:
+    def _ramp(n: int) -> torch.Tensor:
+        i = torch.arange(n, dtype=torch.float32, device=device)
+        return torch.minimum((i + 1) / (overlap + 1), (n - i) / (overlap + 1)).clamp(
+            max=1.0
+        )
+
+    return _ramp(tile_h)[:, None] * _ramp(tile_w)[None]
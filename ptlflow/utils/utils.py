@@ -19,6 +19,7 @@
 import logging
 import math
 from argparse import ArgumentParser
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
@@ -213,6 +214,279 @@ class InputScaler(object):
         return x
 
 
+class LRUCache(object):
+    """A small dict-like cache which keeps only the most recently used entries.
+
+    It is used to reuse objects which only depend on the input shape (e.g., InputPadder, InputScaler, IOAdapter), so that
+    they are not rebuilt for every input.
+    """
+
+    def __init__(self, max_size: int = 8) -> None:
+        """Initialize LRUCache.
+
+        Parameters
+        ----------
+        max_size : int, default 8
+            Maximum number of entries. When a new entry is added to a full cache, the least recently used one is removed.
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Return the value of key and mark it as the most recently used one.
+
+        Parameters
+        ----------
+        key : Any
+            A hashable key.
+        default : Any, optional
+            The value returned if key is not in the cache.
+
+        Returns
+        -------
+        Any
+            The cached value, or default.
+        """
+        if key not in self._entries:
+            return default
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def clear(self) -> None:
+        """Remove all the entries."""
+        self._entries.clear()
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FeatureCache(object):
+    """Keep the features of the second image of a pair, to reuse them as the features of the first image of the next pair.
+
+    When a two-frame model runs on consecutive frames of a video, the second image of one pair is the first image of
+    the next one. Reusing its features avoids running the feature encoder twice on the same frame.
+
+    The frames are identified by their paths, when the inputs contain meta["image_paths"] (as the ones from the datasets).
+    Otherwise, the cached image tensor is compared with the new first image. The cache is cleared when
+    meta["is_seq_start"] is True.
+    """
+
+    def __init__(self) -> None:
+        """Initialize FeatureCache."""
+        self._key = None
+        self._image = None
+        self._features = None
+
+    def get(self, image: torch.Tensor, inputs: Optional[Dict[str, Any]] = None) -> Any:
+        """Return the cached features if image is the same frame as the second image of the last update.
+
+        Parameters
+        ----------
+        image : torch.Tensor
+            The first image of the current pair.
+        inputs : Optional[Dict[str, Any]], optional
+            The inputs of the model, used to read the optional meta["image_paths"] and meta["is_seq_start"].
+
+        Returns
+        -------
+        Any
+            The cached features, or None if there are no features for this frame.
+        """
+        meta = inputs.get("meta") if inputs is not None else None
+        if _is_seq_start(meta):
+            self.clear()
+        if self._features is None:
+            return None
+
+        key = _get_frame_key(meta, 0)
+        if key is not None or self._key is not None:
+            is_same_frame = key == self._key
+        else:
+            is_same_frame = (
+                self._image.shape == image.shape
+                and self._image.device == image.device
+                and torch.equal(self._image, image)
+            )
+        return self._features if is_same_frame else None
+
+    def update(
+        self,
+        image: torch.Tensor,
+        features: Any,
+        inputs: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Store the features of the second image of the current pair.
+
+        Parameters
+        ----------
+        image : torch.Tensor
+            The second image of the current pair.
+        features : Any
+            The features of image. It can be any structure (e.g., a tensor or a list of tensors of a pyramid).
+        inputs : Optional[Dict[str, Any]], optional
+            The inputs of the model, used to read the optional meta["image_paths"].
+        """
+        meta = inputs.get("meta") if inputs is not None else None
+        self._key = _get_frame_key(meta, 1)
+        self._image = image if self._key is None else None
+        self._features = features
+
+    def clear(self) -> None:
+        """Remove the cached features."""
+        self._key = None
+        self._image = None
+        self._features = None
+
+
+def _is_seq_start(meta: Optional[Dict[str, Any]]) -> bool:
+    if meta is None or "is_seq_start" not in meta:
+        return False
+    is_seq_start = meta["is_seq_start"]
+    if isinstance(is_seq_start, torch.Tensor):
+        return bool(is_seq_start.any())
+    if isinstance(is_seq_start, (list, tuple)):
+        return any(is_seq_start)
+    return bool(is_seq_start)
+
+
+def _get_frame_key(
+    meta: Optional[Dict[str, Any]], frame_idx: int
+) -> Optional[Tuple[str, ...]]:
+    if meta is None or "image_paths" not in meta:
+        return None
+    image_paths = meta["image_paths"]
+    if len(image_paths) <= frame_idx:
+        return None
+    paths = image_paths[frame_idx]
+    # A single sample has one path per frame, while a collated batch has one list of paths per frame
+    if isinstance(paths, str):
+        return (paths,)
+    return tuple(str(p) for p in paths)
+
+
+class EarlyExitMonitor(object):
+    """Stop the recurrent refinement of a model once the flow updates become small.
+
+    RAFT-like models refine the flow with a fixed number of iterations, but easy inputs (e.g., with small motions)
+    often converge after only a few of them. This monitor receives the flow update of each iteration, measures its
+    magnitude for each sample, and marks a sample as converged once the magnitude is below a threshold. The updates
+    of converged samples are zeroed, so their flow does not change while the rest of the batch is refined. The model
+    can stop iterating when all the samples have converged. The maximum number of iterations is still given by the
+    model (e.g., by --iters).
+
+    The model would use it as:
+
+    >>>
+    early_exit = self.get_early_exit_monitor()
+    for itr in range(self.args.iters):
+        ...
+        if early_exit is not None:
+            delta_flow = early_exit.step(delta_flow)
+        coords1 = coords1 + delta_flow
+        ...
+        if early_exit is not None and early_exit.all_converged:
+            break
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        statistic: str = "mean",
+        percentile: float = 90.0,
+        min_iters: int = 1,
+    ) -> None:
+        """Initialize EarlyExitMonitor.
+
+        Parameters
+        ----------
+        threshold : float
+            A sample converges when the statistic of the magnitude of its update is smaller than this value. The
+            update is measured in pixels at the resolution in which the model refines the flow (e.g., 1/8 for RAFT).
+        statistic : str, default "mean"
+            How to summarize the update magnitudes of all the pixels. It can be one of {"mean", "percentile"}.
+        percentile : float, default 90.0
+            The percentile, in [0, 100], used when statistic == "percentile".
+        min_iters : int, default 1
+            Minimum number of iterations before a sample is allowed to converge.
+
+        Raises
+        ------
+        ValueError
+            If statistic or percentile are invalid.
+        """
+        if statistic not in ["mean", "percentile"]:
+            raise ValueError(
+                f"statistic must be one of (mean, percentile). Found: {statistic}."
+            )
+        if percentile < 0 or percentile > 100:
+            raise ValueError(f"percentile must be in [0, 100]. Found: {percentile}.")
+
+        self.threshold = threshold
+        self.statistic = statistic
+        self.percentile = percentile
+        self.min_iters = min_iters
+
+        self.iters = None
+        self._active = None
+        self._level_iters = None
+
+    @property
+    def all_converged(self) -> bool:
+        """Whether all the samples have converged. Note that reading it synchronizes the device."""
+        return self._active is not None and not bool(self._active.any())
+
+    def reset(self) -> None:
+        """Mark all the samples as active again, e.g., at the start of a new refinement level.
+
+        The total number of iterations of each sample, in self.iters, is kept.
+        """
+        self._active = None
+        self._level_iters = None
+
+    def step(self, delta_flow: torch.Tensor) -> torch.Tensor:
+        """Register the flow update of one iteration.
+
+        Parameters
+        ----------
+        delta_flow : torch.Tensor
+            The flow update of the current iteration, with shape [B, 2, H, W].
+
+        Returns
+        -------
+        torch.Tensor
+            The update to be applied, where the updates of the samples that had already converged are zero.
+        """
+        b = delta_flow.shape[0]
+        if self.iters is None:
+            self.iters = torch.zeros(b, dtype=torch.long, device=delta_flow.device)
+        if self._active is None:
+            self._active = torch.ones(b, dtype=torch.bool, device=delta_flow.device)
+            self._level_iters = torch.zeros_like(self.iters)
+
+        active = self._active
+        delta_flow = delta_flow * active.view(b, 1, 1, 1).to(dtype=delta_flow.dtype)
+        self.iters = self.iters + active.long()
+        self._level_iters = self._level_iters + active.long()
+
+        magnitude = torch.linalg.vector_norm(delta_flow.float(), dim=1).flatten(1)
+        if self.statistic == "mean":
+            value = magnitude.mean(dim=1)
+        else:
+            value = torch.quantile(magnitude, self.percentile / 100.0, dim=1)
+        converged = (value < self.threshold) & (self._level_iters >= self.min_iters)
+        self._active = active & ~converged
+        return delta_flow
+
+
 def add_datasets_to_parser(
     parser: ArgumentParser, dataset_config_path: str
 ) -> ArgumentParser:
@@ -451,7 +725,9 @@ def bgr_val_as_tensor(
     return bgr_val
 
 
-def forward_interpolate_batch(prev_flow: torch.Tensor) -> torch.Tensor:
+def forward_interpolate_batch(
+    prev_flow: torch.Tensor, method: str = "griddata"
+) -> torch.Tensor:
     """Apply RAFT's forward_interpolate in a batch of torch.Tensors.
 
     forward_interpolate in the warm start strategy where the previous flow estimation is forward projected
@@ -461,12 +737,32 @@ def forward_interpolate_batch(prev_flow: torch.Tensor) -> torch.Tensor:
     ----------
     prev_flow : torch.Tensor
         A 4D tensor [B, 2, H, W] containing a batch of previous flow predictions.
+    method : str, default "griddata"
+        Which implementation to use. Accepted values are "griddata" and "torch". "griddata" uses the original RAFT
+        implementation, which runs scipy.interpolate.griddata on the CPU for each sample. "torch" uses
+        forward_interpolate_torch, which processes the whole batch on the same device as prev_flow.
 
     Returns
     -------
     torch.Tensor
         The previous flow predictions after being forward interpolated.
+
+    Raises
+    ------
+    ValueError
+        If method is not one of the accepted values.
+
+    See Also
+    --------
+    forward_interpolate_torch : The batched torch implementation.
     """
+    if method == "torch":
+        return forward_interpolate_torch(prev_flow)
+    elif method != "griddata":
+        raise ValueError(
+            f"method must be one of (griddata, torch). Found: {method}."
+        )
+
     forward_flow = []
     for i in range(prev_flow.shape[0]):
         forward_flow.append(
@@ -476,3 +772,93 @@ def forward_interpolate_batch(prev_flow: torch.Tensor) -> torch.Tensor:
         )
     forward_flow = torch.stack(forward_flow, 0)
     return forward_flow
+
+
+def forward_interpolate_torch(prev_flow: torch.Tensor) -> torch.Tensor:
+    """Forward interpolate a batch of flows using only torch operations.
+
+    This is an approximation of RAFT's forward_interpolate that runs entirely on the device of the input.
+    Each flow vector is splatted to the pixel closest to its end point. When multiple vectors land on the same pixel,
+    the one whose end point is closest to the pixel center is kept. The remaining empty pixels are then filled with the
+    value of the nearest splatted end point, which is found using the jump flooding algorithm.
+
+    The output is the same as forward_interpolate, except for a few pixels in which either a discarded splat collision
+    or the jump flooding approximation picks a different nearest neighbor.
+
+    Parameters
+    ----------
+    prev_flow : torch.Tensor
+        A 4D tensor [B, 2, H, W] containing a batch of previous flow predictions.
+
+    Returns
+    -------
+    torch.Tensor
+        The previous flow predictions after being forward interpolated.
+    """
+    b, _, h, w = prev_flow.shape
+    n = b * h * w
+    device = prev_flow.device
+    flow = prev_flow.detach().float()
+
+    ys, xs = torch.meshgrid(
+        torch.arange(h, dtype=torch.float32, device=device),
+        torch.arange(w, dtype=torch.float32, device=device),
+        indexing="ij",
+    )
+    grid = torch.stack([xs, ys], -1)  # [H, W, 2]
+
+    flow_flat = flow.permute(0, 2, 3, 1).reshape(n, 2)
+    end_points = (grid[None] + flow.permute(0, 2, 3, 1)).reshape(n, 2)
+    x1, y1 = end_points[:, 0], end_points[:, 1]
+    valid = (x1 > 0) & (x1 < w) & (y1 > 0) & (y1 < h)
+
+    # Splat each end point to its nearest pixel, keeping only the closest one in case of collisions
+    xi = x1.round().clamp(0, w - 1)
+    yi = y1.round().clamp(0, h - 1)
+    dist = torch.where(
+        valid,
+        (x1 - xi) ** 2 + (y1 - yi) ** 2,
+        torch.full_like(x1, float("inf")),
+    )
+    batch_offset = torch.arange(b, device=device).repeat_interleave(h * w) * (h * w)
+    target = batch_offset + yi.long() * w + xi.long()
+    min_dist = torch.full((n,), float("inf"), device=device).scatter_reduce(
+        0, target, dist, reduce="amin"
+    )
+    is_winner = valid & (dist == min_dist[target])
+    src_idx = torch.arange(n, device=device)
+    seeds = torch.full((n,), n, dtype=torch.long, device=device).scatter_reduce(
+        0, target[is_winner], src_idx[is_winner], reduce="amin"
+    )
+    seeds = torch.where(seeds < n, seeds, torch.full_like(seeds, -1)).view(b, h, w)
+
+    # Jump flooding: propagate the nearest seed to the empty pixels
+    steps = []
+    k = 2 ** int(math.floor(math.log2(max(h, w))))
+    while k >= 1:
+        steps.append(k)
+        k //= 2
+    steps.append(1)
+
+    for k in steps:
+        padded_seeds = F.pad(seeds, (k, k, k, k), mode="constant", value=-1)
+        candidates = torch.stack(
+            [
+                padded_seeds[:, k + dy : k + dy + h, k + dx : k + dx + w]
+                for dy in (-k, 0, k)
+                for dx in (-k, 0, k)
+            ],
+            0,
+        )  # [9, B, H, W]
+        cand_points = end_points[candidates.clamp(min=0)]  # [9, B, H, W, 2]
+        cand_dist = ((cand_points - grid[None, None]) ** 2).sum(-1)
+        cand_dist = torch.where(
+            candidates >= 0, cand_dist, torch.full_like(cand_dist, float("inf"))
+        )
+        best = cand_dist.argmin(dim=0, keepdim=True)
+        seeds = torch.gather(candidates, 0, best)[0]
+
+    forward_flow = flow_flat[seeds.clamp(min=0)]
+    forward_flow = forward_flow * (seeds >= 0)[..., None].float()
+    forward_flow = forward_flow.permute(0, 3, 1, 2).to(dtype=prev_flow.dtype)
+    return forward_flow
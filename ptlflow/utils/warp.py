@@ -0,0 +1,177 @@
+"""Backward and forward warping of images with optical flow."""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from typing import Tuple
+
+import torch
+import torch.nn.functional as F
+
+
+def bwarp(x: torch.Tensor, flo: torch.Tensor) -> torch.Tensor:
+    """Backward warp an image with optical flow.
+
+    Adapted from https://github.com/JihyongOh/XVFI/blob/main/XVFInet.py#L237.
+
+    Parameters
+    ----------
+    x : torch.Tensor
+        The image to be warped (typically, the second image of the pair), with shape (B, C, H, W).
+    flo : torch.Tensor
+        The optical flow from the first to the second image, with shape (B, 2, H, W).
+
+    Returns
+    -------
+    torch.Tensor
+        The warped image, with shape (B, C, H, W). Pixels sampled from outside the image are set to zero.
+    """
+    B, C, H, W = x.size()
+    # mesh grid
+    xx = torch.arange(0, W).view(1, 1, 1, W).expand(B, 1, H, W)
+    yy = torch.arange(0, H).view(1, 1, H, 1).expand(B, 1, H, W)
+    grid = torch.cat((xx, yy), 1).float()
+
+    if x.is_cuda:
+        grid = grid.to(x.device)
+    vgrid = grid + flo
+
+    # scale grid to [-1,1]
+    vgrid[:, 0, :, :] = 2.0 * vgrid[:, 0, :, :].clone() / max(W - 1, 1) - 1.0
+    vgrid[:, 1, :, :] = 2.0 * vgrid[:, 1, :, :].clone() / max(H - 1, 1) - 1.0
+
+    vgrid = vgrid.permute(0, 2, 3, 1)  # [B,H,W,2]
+    output = F.grid_sample(x, vgrid, align_corners=True)
+    mask = torch.ones(x.size()).to(x.device)
+    mask = F.grid_sample(mask, vgrid, align_corners=True)
+
+    mask = mask.masked_fill_(mask < 0.999, 0)
+    mask = mask.masked_fill_(mask > 0, 1)
+
+    return output * mask
+
+
+def splat(
+    src: torch.Tensor, flo: torch.Tensor, splat_mode: str = "bilinear"
+) -> torch.Tensor:
+    """Sum the pixels of a tensor into the positions pointed by the optical flow.
+
+    Each pixel is moved by its flow vector and splatted into the four neighbors of its end point. There is one
+    vectorized scatter-add per neighbor over all the channels, so no index tensors are created per channel. The
+    operation is differentiable with respect to both src and flo.
+
+    Parameters
+    ----------
+    src : torch.Tensor
+        The tensor to be splatted, with shape (N, C, H, W).
+    flo : torch.Tensor
+        The optical flow, with shape (N, 2, H, W).
+    splat_mode : str, default 'bilinear'
+        How each pixel is distributed among its four neighbors. It can be one of {'gaussian', 'bilinear'}.
+        'gaussian' uses the weights exp(-d^2), where d is the distance to the neighbor.
+
+    Returns
+    -------
+    torch.Tensor
+        The sum of all the values splatted into each pixel, with shape (N, C, H, W) and the same dtype as src. The sum
+        is accumulated in at least float32 precision.
+
+    Raises
+    ------
+    ValueError
+        If splat_mode is invalid.
+    """
+    if splat_mode not in ["gaussian", "bilinear"]:
+        raise ValueError(
+            f"splat_mode must be one of (gaussian, bilinear). Found: {splat_mode}."
+        )
+
+    N, C, H, W = src.size()
+    device = src.device
+    dtype = src.dtype
+
+    # Accumulate in at least float32, since many pixels may land on the same position
+    acc_dtype = torch.promote_types(dtype, torch.float32)
+    flo = flo.to(acc_dtype).reshape(N, 2, H * W)
+    floor_x = torch.floor(flo[:, 0])
+    floor_y = torch.floor(flo[:, 1])
+    frac_x = flo[:, 0] - floor_x
+    frac_y = flo[:, 1] - floor_y
+
+    base_y, base_x = torch.meshgrid(
+        torch.arange(H, device=device), torch.arange(W, device=device), indexing="ij"
+    )
+    finite = torch.isfinite(floor_x) & torch.isfinite(floor_y)
+    x0 = base_x.reshape(1, -1) + torch.where(finite, floor_x, 0).long()
+    y0 = base_y.reshape(1, -1) + torch.where(finite, floor_y, 0).long()
+    batch_offset = torch.arange(N, device=device).view(N, 1) * (H * W)
+
+    src = src.to(acc_dtype).reshape(N, C, H * W).permute(0, 2, 1).reshape(N * H * W, C)
+    out = src.new_zeros(N * H * W, C)
+    for dy in (0, 1):
+        for dx in (0, 1):
+            if splat_mode == "gaussian":
+                weight = torch.exp(-((frac_x - dx) ** 2 + (frac_y - dy) ** 2))
+            else:
+                weight = (frac_x if dx else 1 - frac_x) * (frac_y if dy else 1 - frac_y)
+            x = x0 + dx
+            y = y0 + dy
+            valid = finite & (x >= 0) & (x < W) & (y >= 0) & (y < H)
+            idx = torch.where(valid, batch_offset + y * W + x, 0)
+            weight = torch.where(valid, weight, 0)
+            out.index_add_(0, idx.view(-1), src * weight.view(-1, 1))
+
+    return out.view(N, H, W, C).permute(0, 3, 1, 2).to(dtype=dtype)
+
+
+def fwarp(
+    img: torch.Tensor, flo: torch.Tensor, splat_mode: str = "gaussian"
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Forward warp (splat) an image with optical flow.
+
+    Each pixel is moved by its flow vector and splatted into the four neighbors of its end point, see splat(). The image
+    channels and the splatting weights are accumulated together by a single call to splat().
+
+    Based on https://github.com/lyh-18/EQVI/blob/EQVI-master/models/forward_warp_gaussian.py.
+
+    Parameters
+    ----------
+    img : torch.Tensor
+        The image to be warped, with shape (N, C, H, W).
+    flo : torch.Tensor
+        The optical flow, with shape (N, 2, H, W).
+    splat_mode : str, default 'gaussian'
+        How each pixel is distributed among its four neighbors. It can be one of {'gaussian', 'bilinear'}.
+        'gaussian' uses the weights exp(-d^2), where d is the distance to the neighbor.
+
+    Returns
+    -------
+    Tuple[torch.Tensor, torch.Tensor]
+        The accumulated weighted image, with shape (N, C, H, W), and the accumulated weights, with the same shape.
+        The normalized warped image can be obtained by dividing the first by the second, where the weights are positive.
+        The accumulated weights are the same for all channels, so the second tensor is an expanded view.
+
+    Raises
+    ------
+    ValueError
+        If splat_mode is invalid.
+    """
+    N, C, H, W = img.size()
+
+    # The weights are accumulated as an extra channel, so that both outputs are computed by the same scatter
+    src = torch.cat([img, img.new_ones(N, 1, H, W)], 1)
+    out = splat(src, flo, splat_mode)
+    return out[:, :C], out[:, C:].expand(N, C, H, W)
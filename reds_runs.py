@@ -25,6 +25,10 @@ List of available checkpoints: https://ptlflow.readthedocs.io/en/latest/models/c
 
 import os
 
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "1")
+
+from infer_manifest import run_manifest  # noqa: E402
+
 # all 15 test clips
 test_clips = [
     #"datasets_realvideo/REDS4/train_blur/000",  # blurred HR
@@ -95,10 +99,16 @@ checkpoints = [
 OUT_DIR = "results/REDS4_runs_auto_sharpLRx4"
 
 # start iterating
-for idx_model, model in enumerate(models):
-    for checkpoint in checkpoints[idx_model]:
-        for test_clip in test_clips:
-            command = f"CUDA_VISIBLE_DEVICES=1 python infer.py {model} --input_path {test_clip}  \
-                --write_outputs --output_path {OUT_DIR} --flow_format flo --fp16 --pretrained_ckpt {checkpoint}"
-            #print(command)
-            os.system(command)
\ No newline at end of file
+# All the clips of one model/checkpoint are processed in a single process, so each model is only loaded once.
+# Completed clips are recorded in OUT_DIR, so running this script again resumes an interrupted sweep.
+manifest = {
+    "script": "infer",
+    "output_path": OUT_DIR,
+    "args": ["--write_outputs", "--flow_format", "flo", "--fp16"],
+    "input_paths": test_clips,
+    "runs": [
+        {"model": model, "checkpoints": checkpoints[idx_model]}
+        for idx_model, model in enumerate(models)
+    ],
+}
+run_manifest(manifest)
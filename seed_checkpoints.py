@@ -0,0 +1,88 @@
+"""Populate the local checkpoint store from a directory of checkpoint files.
+
+Each file is matched to the pretrained checkpoints of all the models by the file name of the checkpoint URL (e.g.,
+raft-things-802bbcfd.ckpt), its hash is verified once, and it is added to the index of the store. After that, the
+checkpoints can be loaded by name without network access, e.g., with get_model("raft", "things").
+
+Example:
+
+.. code-block:: bash
+
+    python seed_checkpoints.py /path/to/downloaded/checkpoints --store_dir /shared/ptlflow_checkpoints
+"""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import logging
+from argparse import ArgumentParser, Namespace
+
+from ptlflow.utils.checkpoint_store import (
+    CheckpointStore,
+    get_pretrained_checkpoint_urls,
+)
+from ptlflow.utils.utils import config_logging
+
+config_logging()
+
+
+def _init_parser() -> ArgumentParser:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "source_dir",
+        type=str,
+        help="Directory containing the checkpoint files. It is searched recursively for .ckpt and .pth files.",
+    )
+    parser.add_argument(
+        "--store_dir",
+        type=str,
+        default=None,
+        help=(
+            "Directory of the checkpoint store. If not set, the environment variable PTLFLOW_CHECKPOINT_DIR is used "
+            "or, if it is also not set, the torch hub directory."
+        ),
+    )
+    parser.add_argument(
+        "--symlink",
+        action="store_true",
+        help="If set, the files are linked into the store instead of copied.",
+    )
+    return parser
+
+
+def seed(args: Namespace) -> None:
+    """Add the checkpoints of args.source_dir to the store.
+
+    Parameters
+    ----------
+    args : Namespace
+        Arguments to configure the store.
+    """
+    store = CheckpointStore(args.store_dir)
+    unmatched = store.seed(
+        args.source_dir, get_pretrained_checkpoint_urls(), args.symlink
+    )
+    for ckpt_path in unmatched:
+        logging.warning(
+            "%s does not match any pretrained checkpoint and was not added.", ckpt_path
+        )
+    logging.info("Checkpoint index saved to %s.", store.index_path)
+
+
+if __name__ == "__main__":
+    parser = _init_parser()
+    args = parser.parse_args()
+    seed(args)
@@ -0,0 +1,531 @@
+"""Run validate.py or model_benchmark.py on many models with multiple worker processes.
+
+When model=all|select, validate.py and model_benchmark.py evaluate the models one after another in a single process.
+This script splits the grid of (model, checkpoint, dataset) cells of the validation, or of (model, input size) cells of
+the benchmark, across worker processes. Each worker can be assigned to its own GPU (--devices) and/or pinned to its own
+group of CPU cores with a fixed number of threads (--threads_per_worker).
+
+The result of each completed cell is written atomically to a file inside {output_path}/sweep_results. The cells which
+already have a result are skipped, so a sweep which crashed or was interrupted is resumed by running the same command
+again. At the end, the results of all the cells are merged into {output_path}/metrics_all.csv (validate) or
+{output_path}/model_benchmark-{model}.csv (benchmark), with the same format as the files created by validate.py and
+model_benchmark.py.
+
+The arguments which are not recognized by this script are forwarded to validate.py or model_benchmark.py.
+
+Examples:
+
+.. code-block:: bash
+
+    # Validate all the pretrained checkpoints of all the models, using four GPUs
+    python sweep.py validate all --devices 0 1 2 3 --val_dataset sintel-clean+sintel-final+kitti-2015
+
+    # Benchmark some models on the CPU with two workers of 8 threads each
+    python sweep.py benchmark select --selection raft rapidflow --num_workers 2 --threads_per_worker 8
+"""
+
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import json
+import logging
+import multiprocessing as mp
+import os
+import re
+import tempfile
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import torch
+
+import model_benchmark
+import ptlflow
+import validate
+from ptlflow import get_model
+from ptlflow.models.base_model.base_model import BaseModel
+from ptlflow.utils.utils import add_datasets_to_parser, config_logging
+
+config_logging()
+
+RESULTS_DIR_NAME = "sweep_results"
+# Same default as BaseModel.val_dataloader()
+DEFAULT_VAL_DATASET = "sintel-clean+sintel-final+kitti-2015"
+
+
+def _init_parser() -> ArgumentParser:
+    # Abbreviations are disabled so that the options of validate.py and model_benchmark.py are not captured by mistake
+    parser = ArgumentParser(allow_abbrev=False)
+    parser.add_argument(
+        "task",
+        type=str,
+        choices=["validate", "benchmark"],
+        help="Whether to run validate.py or model_benchmark.py.",
+    )
+    parser.add_argument(
+        "model",
+        type=str,
+        choices=["all", "select"],
+        help="Run on all the available models, or only on the models in --selection.",
+    )
+    parser.add_argument(
+        "--selection",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Used in combination with model=select. The names of the models to run.",
+    )
+    parser.add_argument(
+        "--exclude",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Names of models to skip.",
+    )
+    parser.add_argument(
+        "--checkpoints",
+        type=str,
+        nargs="+",
+        default=None,
+        help=(
+            "Only used by validate. Names of the pretrained checkpoints to validate. If not set, all the pretrained "
+            "checkpoints of each model are validated."
+        ),
+    )
+    parser.add_argument(
+        "--devices",
+        type=str,
+        nargs="+",
+        default=None,
+        help=(
+            "IDs of the GPUs to use. Each worker only sees one of these devices (through CUDA_VISIBLE_DEVICES). If "
+            "there are more workers than devices, the devices are shared in a round-robin fashion."
+        ),
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=None,
+        help=(
+            "Number of worker processes. If not set, one worker is created for each device in --devices, or a single "
+            "worker if no devices are given."
+        ),
+    )
+    parser.add_argument(
+        "--threads_per_worker",
+        type=int,
+        default=None,
+        help=(
+            "If set, each worker is pinned to its own group of this number of CPU cores, and it uses this number of "
+            "torch threads."
+        ),
+    )
+    parser.add_argument(
+        "--num_shards",
+        type=int,
+        default=1,
+        help=(
+            "Split the grid into this number of shards, and only run the cells of the shard --shard_index. Useful to "
+            "split the sweep across machines which share the same output_path."
+        ),
+    )
+    parser.add_argument(
+        "--shard_index",
+        type=int,
+        default=0,
+        help="Index of the shard to run, from 0 to num_shards-1.",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="If set, the results of previous runs of the cells of this shard are deleted and the cells are run again.",
+    )
+    return parser
+
+
+def sweep(args: Namespace, task_args: List[str]) -> pd.DataFrame:
+    """Run the sweep and merge the results of all the cells.
+
+    Parameters
+    ----------
+    args : Namespace
+        Arguments to configure the grid and the workers.
+    task_args : List[str]
+        Command line arguments which are forwarded to validate.py or model_benchmark.py.
+
+    Returns
+    -------
+    pd.DataFrame
+        The merged results, in the format of metrics_all.csv (validate) or model_benchmark-{model}.csv (benchmark).
+
+    Raises
+    ------
+    ValueError
+        If the sharding or worker options are invalid.
+    """
+    if (
+        args.num_shards < 1
+        or args.shard_index < 0
+        or args.shard_index >= args.num_shards
+    ):
+        raise ValueError(
+            f"--shard_index must be between 0 and num_shards-1. Found: shard_index={args.shard_index}, "
+            f"num_shards={args.num_shards}."
+        )
+
+    task_namespace = _parse_task_args(args, task_args)
+    output_path = Path(task_namespace.output_path)
+    results_dir = output_path / RESULTS_DIR_NAME
+    results_dir.mkdir(parents=True, exist_ok=True)
+
+    cells = _get_cells(args, task_namespace)
+    shard_cells = cells[args.shard_index :: args.num_shards]
+    if args.restart:
+        for cell in shard_cells:
+            _get_result_path(results_dir, cell).unlink(missing_ok=True)
+    pending_cells = [
+        c for c in shard_cells if not _get_result_path(results_dir, c).exists()
+    ]
+    logging.info(
+        "Running %d cells (%d cells of this shard were already completed).",
+        len(pending_cells),
+        len(shard_cells) - len(pending_cells),
+    )
+    if len(pending_cells) > 0:
+        _run_workers(args, task_args, pending_cells, results_dir)
+
+    # The results of the other shards which are already available are also merged
+    df = merge_results(args.task, cells, results_dir, task_namespace)
+    if args.task == "validate":
+        df.to_csv(output_path / "metrics_all.csv", index=False)
+    else:
+        df.to_csv(output_path / f"model_benchmark-{args.model}.csv", index=False)
+        if len(df) > 0:
+            model_benchmark.save_plot(
+                output_path,
+                args.model,
+                df,
+                task_namespace.plot_axes,
+                task_namespace.plot_log_x,
+                task_namespace.plot_log_y,
+                task_namespace.datatypes[0],
+            )
+    return df
+
+
+def merge_results(
+    task: str,
+    cells: List[Dict[str, Any]],
+    results_dir: Path,
+    task_namespace: Namespace,
+) -> pd.DataFrame:
+    """Merge the results of the completed cells into a single table.
+
+    Parameters
+    ----------
+    task : str
+        Either "validate" or "benchmark".
+    cells : List[Dict[str, Any]]
+        The cells of the grid, in the order in which they should appear in the table. The cells without results are
+        skipped.
+    results_dir : Path
+        The directory where the results of the cells are stored.
+    task_namespace : Namespace
+        The parsed arguments of validate.py or model_benchmark.py.
+
+    Returns
+    -------
+    pd.DataFrame
+        The merged results. For validate, there is one row for each model and checkpoint, and one column for each
+        dataset and metric, as in metrics_all.csv. For benchmark, there is one row for each model and input size, as
+        in model_benchmark-{model}.csv.
+    """
+    if task == "validate":
+        model_rows = {}
+        for cell in cells:
+            rows = _read_result(results_dir, cell)
+            if rows is not None:
+                key = (cell["model"], cell["checkpoint"])
+                model_rows.setdefault(key, {}).update(rows[0])
+        return pd.DataFrame(list(model_rows.values()))
+
+    columns = model_benchmark.TABLE_LEGENDS[: model_benchmark.NUM_COMMON_COLUMNS]
+    for dtype_str in task_namespace.datatypes:
+        columns.append(f"{model_benchmark.TABLE_LEGENDS[6]}-{dtype_str}")
+        columns.append(f"{model_benchmark.TABLE_LEGENDS[7]}-{dtype_str}")
+    all_rows = []
+    for cell in cells:
+        rows = _read_result(results_dir, cell)
+        if rows is not None:
+            all_rows.extend(rows)
+    return pd.DataFrame(all_rows, columns=columns).round(3)
+
+
+def _parse_task_args(args: Namespace, task_args: List[str]) -> Namespace:
+    if args.task == "validate":
+        parser = validate._init_parser()
+        parser = BaseModel.add_model_specific_args(parser)
+        add_datasets_to_parser(parser, "datasets.yml")
+    else:
+        parser = model_benchmark._init_parser()
+    # The model-specific arguments are only known by the workers, so they are ignored here
+    task_namespace, _ = parser.parse_known_args([args.model] + task_args)
+    return task_namespace
+
+
+def _get_cells(args: Namespace, task_namespace: Namespace) -> List[Dict[str, Any]]:
+    exclude = args.exclude
+    if exclude is None:
+        exclude = []
+    model_names = [m for m in validate._get_model_names(args) if m not in exclude]
+
+    cells = []
+    if args.task == "validate":
+        val_dataset = task_namespace.val_dataset
+        if val_dataset is None:
+            val_dataset = DEFAULT_VAL_DATASET
+        for mname in model_names:
+            try:
+                model_ref = ptlflow.get_model_reference(mname)
+            except ImportError as e:
+                logging.warning("Skipping model %s: %s", mname, e)
+                continue
+            ckpt_names = list(getattr(model_ref, "pretrained_checkpoints", {}).keys())
+            if args.checkpoints is not None:
+                ckpt_names = [c for c in ckpt_names if c in args.checkpoints]
+            for cname in ckpt_names:
+                for dataset in val_dataset.split("+"):
+                    cells.append(
+                        {"model": mname, "checkpoint": cname, "dataset": dataset}
+                    )
+    else:
+        if len(task_namespace.input_size) % 2 != 0:
+            raise ValueError(
+                f"--input_size must contain pairs of (height, width). Found: {task_namespace.input_size}."
+            )
+        for isize in range(0, len(task_namespace.input_size), 2):
+            input_size = list(task_namespace.input_size[isize : isize + 2])
+            for mname in model_names:
+                cells.append({"model": mname, "input_size": input_size})
+    return cells
+
+
+def _get_core_groups(
+    num_workers: int, threads_per_worker: Optional[int]
+) -> List[Optional[List[int]]]:
+    if threads_per_worker is None:
+        return [None] * num_workers
+
+    if hasattr(os, "sched_getaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count()))
+    if num_workers * threads_per_worker > len(cores):
+        raise ValueError(
+            f"{num_workers} workers with {threads_per_worker} threads each require {num_workers * threads_per_worker} "
+            f"CPU cores, but only {len(cores)} are available."
+        )
+    return [
+        cores[i * threads_per_worker : (i + 1) * threads_per_worker]
+        for i in range(num_workers)
+    ]
+
+
+def _run_workers(
+    args: Namespace,
+    task_args: List[str],
+    cells: List[Dict[str, Any]],
+    results_dir: Path,
+) -> None:
+    num_workers = args.num_workers
+    if num_workers is None:
+        num_workers = len(args.devices) if args.devices is not None else 1
+    core_groups = _get_core_groups(num_workers, args.threads_per_worker)
+
+    ctx = mp.get_context("spawn")
+    cells_queue = ctx.Queue()
+    for cell in cells:
+        cells_queue.put(cell)
+    for _ in range(num_workers):
+        cells_queue.put(None)
+    # If a worker crashes, some items may never be consumed, which should not block the exit
+    cells_queue.cancel_join_thread()
+
+    # CUDA_VISIBLE_DEVICES is set before starting each worker, because it must be defined before CUDA is initialized
+    visible_devices = os.environ.get("CUDA_VISIBLE_DEVICES")
+    workers = []
+    try:
+        for i in range(num_workers):
+            if args.devices is not None:
+                device = args.devices[i % len(args.devices)]
+                os.environ["CUDA_VISIBLE_DEVICES"] = device
+            worker = ctx.Process(
+                target=_run_worker,
+                args=(args.task, task_args, core_groups[i], cells_queue, results_dir),
+            )
+            worker.start()
+            workers.append(worker)
+    finally:
+        if visible_devices is None:
+            os.environ.pop("CUDA_VISIBLE_DEVICES", None)
+        else:
+            os.environ["CUDA_VISIBLE_DEVICES"] = visible_devices
+
+    for i, worker in enumerate(workers):
+        worker.join()
+        if worker.exitcode != 0:
+            logging.warning(
+                "Worker %d exited with code %d. Run the sweep again to resume the missing cells.",
+                i,
+                worker.exitcode,
+            )
+
+
+def _run_worker(
+    task: str,
+    task_args: List[str],
+    cpu_cores: Optional[List[int]],
+    cells_queue: mp.Queue,
+    results_dir: Path,
+) -> None:
+    if cpu_cores is not None:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpu_cores)
+        torch.set_num_threads(len(cpu_cores))
+
+    device_handle = None
+    if task == "benchmark":
+        device_handle = _get_device_handle()
+
+    while True:
+        cell = cells_queue.get()
+        if cell is None:
+            break
+
+        cell_id = _get_cell_id(cell)
+        logging.info("Running cell %s", cell_id)
+        try:
+            if task == "validate":
+                rows = _validate_cell(cell, task_args, results_dir.parent)
+            else:
+                rows = _benchmark_cell(cell, task_args, device_handle)
+        except Exception as e:  # noqa: B902
+            logging.warning("Skipping cell %s due to exception %s", cell_id, e)
+            continue
+
+        if len(rows) == 0:
+            logging.warning("Cell %s did not produce any results.", cell_id)
+        else:
+            _write_result(results_dir, cell, rows)
+
+
+def _validate_cell(
+    cell: Dict[str, Any], task_args: List[str], output_path: Path
+) -> List[Dict[str, Any]]:
+    mname = cell["model"]
+    parser = validate._init_parser()
+    model_ref = ptlflow.get_model_reference(mname)
+    parser = model_ref.add_model_specific_args(parser)
+    add_datasets_to_parser(parser, "datasets.yml")
+    args = parser.parse_args([mname] + task_args)
+
+    args.pretrained_ckpt = cell["checkpoint"]
+    args.val_dataset = cell["dataset"]
+    args.output_path = output_path / f"{mname}_{cell['checkpoint']}"
+
+    model = get_model(mname, args.pretrained_ckpt, args)
+    # Each dataset has its own metrics file, because several workers may validate the same model at the same time
+    metrics_df = validate.validate(args, model, f"metrics-{cell['dataset']}.csv")
+    return metrics_df.to_dict("records")
+
+
+def _benchmark_cell(
+    cell: Dict[str, Any], task_args: List[str], device_handle: Any
+) -> List[Dict[str, Any]]:
+    parser = model_benchmark._init_parser()
+    args = parser.parse_args(["select", "--selection", cell["model"]] + task_args)
+    args.input_size = cell["input_size"]
+    # The per-cell csv and plot are not needed, only the merged ones
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        args.output_path = tmp_dir
+        df = model_benchmark.benchmark(args, device_handle)
+    return df.to_dict("records")
+
+
+def _get_device_handle() -> Any:
+    pynvml = model_benchmark.pynvml
+    if pynvml is None:
+        return None
+
+    try:
+        device_id = int(os.environ["CUDA_VISIBLE_DEVICES"])
+    except (KeyError, ValueError):
+        device_id = 0
+
+    try:
+        pynvml.nvmlInit()
+        return pynvml.nvmlDeviceGetHandleByIndex(device_id)
+    except pynvml.NVMLError as e:
+        logging.warning("GPU memory usage will not be measured: %s", e)
+        return None
+
+
+def _get_cell_id(cell: Dict[str, Any]) -> str:
+    values = [
+        "x".join([str(x) for x in v]) if isinstance(v, list) else str(v)
+        for v in cell.values()
+    ]
+    return re.sub(r"[^\w.+-]", "_", "__".join(values))
+
+
+def _get_result_path(results_dir: Path, cell: Dict[str, Any]) -> Path:
+    return results_dir / f"{_get_cell_id(cell)}.json"
+
+
+def _read_result(
+    results_dir: Path, cell: Dict[str, Any]
+) -> Optional[List[Dict[str, Any]]]:
+    result_path = _get_result_path(results_dir, cell)
+    if not result_path.exists():
+        return None
+    with open(result_path, "r") as f:
+        return json.load(f)["rows"]
+
+
+def _write_result(
+    results_dir: Path, cell: Dict[str, Any], rows: List[Dict[str, Any]]
+) -> None:
+    result_path = _get_result_path(results_dir, cell)
+    # Write to a temporary file first, so that an interrupted write never leaves a partial result
+    tmp_path = result_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"cell": cell, "rows": rows}, f, indent=2, default=_to_builtin)
+    os.replace(tmp_path, result_path)
+
+
+def _to_builtin(obj: Any) -> Any:
+    # Convert numpy scalars, which are not JSON serializable
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if __name__ == "__main__":
+    parser = _init_parser()
+    args, task_args = parser.parse_known_args()
+    df = sweep(args, task_args)
+    print(df)
@@ -40,6 +40,7 @@ from ptlflow import get_model, get_model_reference
 from ptlflow.models.base_model.base_model import BaseModel
 from ptlflow.utils import flow_utils
 from ptlflow.utils.io_adapter import IOAdapter
+from ptlflow.utils.tiling import add_tiling_args_to_parser, get_tiled_inference
 from ptlflow.utils.utils import (
     add_datasets_to_parser,
     config_logging,
@@ -99,6 +100,7 @@ def _init_parser() -> ArgumentParser:
         action="store_true",
         help="If set, stores the previous estimation to be used a starting point for prediction.",
     )
+    parser = add_tiling_args_to_parser(parser)
     return parser
 
 
@@ -186,6 +188,8 @@ def test_one_dataloader(
     dataloader_name : str
         A string to identify this dataloader.
     """
+    tiled_inference = get_tiled_inference(model, args)
+
     prev_preds = None
     for i, inputs in enumerate(tqdm(dataloader)):
         if args.scale_factor is not None:
@@ -206,7 +210,10 @@ def test_one_dataloader(
         inputs = io_adapter.prepare_inputs(inputs=inputs)
         inputs["prev_preds"] = prev_preds
 
-        preds = model(inputs)
+        if tiled_inference is not None:
+            preds = tiled_inference(inputs)
+        else:
+            preds = model(inputs)
 
         if args.warm_start:
             if "is_seq_start" in inputs["meta"] and inputs["meta"]["is_seq_start"][0]:
@@ -17,6 +17,7 @@
 from pathlib import Path
 import shutil
 
+import numpy as np
 import torch
 
 from ptlflow.data.datasets import (
@@ -26,7 +27,9 @@ from ptlflow.data.datasets import (
     FlyingThings3DSubsetDataset,
     Hd1kDataset,
     KittiDataset,
+    ShardedFlowDataset,
     SintelDataset,
+    pack_flow_dataset,
 )
 from ptlflow.data.flow_transforms import ToTensor
 from ptlflow.utils import dummy_datasets
@@ -260,3 +263,65 @@ def test_sintel(tmp_path: Path) -> None:
                 assert min(inputs[k].shape) > 0
 
     shutil.rmtree(tmp_path)
+
+
+def test_sharded(tmp_path: Path) -> None:
+    dummy_datasets.write_sintel(tmp_path)
+
+    dataset = SintelDataset(
+        root_dir=tmp_path / "MPI-Sintel",
+        split="trainval",
+        pass_names=["clean"],
+        get_occlusion_mask=True,
+    )
+    pack_flow_dataset(dataset, tmp_path / "shards", shard_size_mb=1)
+
+    sharded = ShardedFlowDataset(tmp_path / "shards")
+    assert len(sharded) == len(dataset)
+    for i in [0, len(dataset) - 1]:
+        ref_inputs = dataset[i]
+        inputs = sharded[i]
+        assert inputs["meta"] == ref_inputs["meta"]
+        for k in ["images", "flows", "valids", "occs"]:
+            assert len(inputs[k]) == len(ref_inputs[k])
+            for v, ref_v in zip(inputs[k], ref_inputs[k]):
+                assert np.array_equal(v, ref_v)
+
+    sharded.transform = ToTensor()
+    inputs = sharded[0]
+    for k in ["images", "flows", "valids", "occs"]:
+        assert isinstance(inputs[k], torch.Tensor)
+        assert len(inputs[k].shape) == 4
+
+    shutil.rmtree(tmp_path)
+
+
+def test_index_cache(tmp_path: Path, monkeypatch) -> None:
+    dummy_datasets.write_sintel(tmp_path / "data")
+    monkeypatch.setenv("PTLFLOW_DATASET_INDEX_DIR", str(tmp_path / "index"))
+
+    ref_dataset = SintelDataset(
+        root_dir=tmp_path / "data" / "MPI-Sintel", split="trainval"
+    )
+    assert len(list((tmp_path / "index").glob("SintelDataset_*.json"))) == 1
+
+    dataset = SintelDataset(root_dir=tmp_path / "data" / "MPI-Sintel", split="trainval")
+    assert len(dataset) == len(ref_dataset)
+    assert dataset.img_paths == [[str(p) for p in v] for v in ref_dataset.img_paths]
+    assert dataset.metadata == ref_dataset.metadata
+    assert dataset[0]["flows"][0].shape == ref_dataset[0]["flows"][0].shape
+
+    # Adding a frame two levels below the root directory invalidates the index
+    training_dir = tmp_path / "data" / "MPI-Sintel" / "training"
+    for dir_name, src_name, dst_name in [
+        ("clean", "frame_0002.png", "frame_0003.png"),
+        ("final", "frame_0002.png", "frame_0003.png"),
+        ("flow", "frame_0001.flo", "frame_0002.flo"),
+        ("occlusions", "frame_0001.png", "frame_0002.png"),
+    ]:
+        seq_dir = training_dir / dir_name / "sequence_1"
+        shutil.copy(seq_dir / src_name, seq_dir / dst_name)
+    dataset = SintelDataset(root_dir=tmp_path / "data" / "MPI-Sintel", split="trainval")
+    assert len(dataset) > len(ref_dataset)
+
+    shutil.rmtree(tmp_path)
@@ -0,0 +1,25 @@
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from ptlflow.data.samplers import ShapeBucketBatchSampler
+
+
+def test_shape_bucket_batch_sampler() -> None:
+    image_sizes = [(375, 1242), (370, 1224), (375, 1242), (375, 1242), (370, 1224)]
+    sampler = ShapeBucketBatchSampler(image_sizes, batch_size=2)
+    batches = list(sampler)
+    assert batches == [[0, 2], [3], [1, 4]]
+    assert len(sampler) == len(batches)
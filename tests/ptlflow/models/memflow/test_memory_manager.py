@@ -0,0 +1,67 @@
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import math
+from argparse import Namespace
+
+import torch
+
+from ptlflow.models.memflow.memory_manager_skflow import MemoryManager
+from ptlflow.models.memflow.MemFlowNet.memory_util import do_softmax
+
+
+def _reference_readout(memory_keys, memory_values, query, key, value, scale, top_k):
+    # Readout with the memory stored as plain lists, with dense affinities
+    b, _, h, w = query.shape
+    all_keys = torch.cat([k.flatten(2) for k in memory_keys + [key]], -1)
+    all_values = torch.cat([v.flatten(2) for v in memory_values + [value]], -1)
+    if len(memory_keys) == 0:
+        top_k = None
+    scale = scale * math.log(all_keys.shape[-1], 6750)
+    similarity = torch.einsum("b c l, b c t -> b t l", query.flatten(2), all_keys)
+    affinity = do_softmax(similarity * scale, top_k=top_k)
+    return (all_values @ affinity).view(b, -1, h, w)
+
+
+def test_memory_manager() -> None:
+    for top_k in [None, 5]:
+        args = Namespace(
+            enable_long_term=False,
+            enable_long_term_count_usage=False,
+            top_k=top_k,
+            max_mid_term_frames=3,
+            min_mid_term_frames=1,
+            train_avg_length=6750,
+        )
+        memory = MemoryManager(args)
+        memory_keys, memory_values = [], []
+        for _ in range(8):
+            query, key = torch.randn(2, 1, 4, 6, 5)
+            affinity = memory.get_affinity(query, key, scale=0.5)
+            for _ in range(2):
+                value = torch.randn(1, 3, 6, 5)
+                readout = memory.read_memory(affinity, value)
+                ref = _reference_readout(
+                    memory_keys, memory_values, query, key, value, 0.5, top_k
+                )
+                assert torch.allclose(readout, ref, atol=1e-5)
+
+            memory.add_memory(key, value)
+            memory_keys.append(key)
+            memory_values.append(value)
+            if len(memory_keys) >= args.max_mid_term_frames:
+                memory_keys = memory_keys[-args.min_mid_term_frames :]
+                memory_values = memory_values[-args.min_mid_term_frames :]
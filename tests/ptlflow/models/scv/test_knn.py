@@ -0,0 +1,36 @@
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import torch
+
+from ptlflow.models.scv.knn import knn_torch_raw
+
+
+def test_knn_torch_raw() -> None:
+    fmap1 = torch.randn(2, 16, 300)
+    fmap2 = torch.randn(2, 16, 250)
+    k = 8
+
+    sim = torch.bmm(fmap1.transpose(1, 2), fmap2)
+    dist_ref, indx_ref = torch.topk(sim, k, dim=2)
+    dist_ref, indx_ref = dist_ref.transpose(1, 2), indx_ref.transpose(1, 2)
+
+    # The small budgets force several query and database tiles
+    for max_chunk_elements in [2**26, 1000, 50]:
+        dist, indx = knn_torch_raw(fmap1, fmap2, k, max_chunk_elements)
+        assert dist.shape == (2, k, 300)
+        assert torch.allclose(dist, dist_ref, atol=1e-4)
+        assert torch.equal(indx, indx_ref)
@@ -0,0 +1,95 @@
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import subprocess
+import sys
+from typing import List, Tuple
+
+import ptlflow
+
+EXCLUDE_MODELS = ["scv4", "scv8"]  # Has additional requirements
+
+# Prints the time to import ptlflow and the model packages which were loaded after running a snippet
+SCRIPT_TEMPLATE = """
+import sys
+import time
+start = time.perf_counter()
+import ptlflow
+print(time.perf_counter() - start)
+{snippet}
+print(time.perf_counter() - start)
+packages = set(
+    name.split(".")[2] for name in sys.modules if name.startswith("ptlflow.models.")
+)
+packages.discard("base_model")
+print(",".join(sorted(packages)))
+"""
+
+
+def test_import_does_not_load_models() -> None:
+    import_time, _, packages = _run_script("")
+    print(f"import ptlflow: {import_time:.3f} seconds")
+    assert packages == []
+
+
+def test_get_model_reference_loads_only_requested_model() -> None:
+    _, _, packages = _run_script("ptlflow.get_model_reference('raft')")
+    assert packages == ["raft"]
+
+
+def test_models_dict_keys_without_import() -> None:
+    _, _, packages = _run_script(
+        "assert 'raft' in ptlflow.models_dict\n"
+        "assert len(ptlflow.utils.utils.get_list_of_available_models_list()) > 0"
+    )
+    assert packages == []
+
+
+def test_import_time_benchmark() -> None:
+    snippet = "\n".join(
+        f"ptlflow.get_model_reference('{mname}')"
+        for mname in ptlflow.models_dict.keys()
+        if mname not in EXCLUDE_MODELS
+    )
+    import_time, eager_time, _ = _run_script(snippet)
+    print(
+        f"import ptlflow: {import_time:.3f} seconds, "
+        f"import ptlflow and all models: {eager_time:.3f} seconds"
+    )
+    assert import_time < eager_time
+
+
+def test_models_dict_register() -> None:
+    model_ref = ptlflow.get_model_reference("raft_small")
+    ptlflow.models_dict["test_registered_model"] = model_ref
+    try:
+        assert ptlflow.get_model_reference("test_registered_model") is model_ref
+        assert "test_registered_model" in ptlflow.models_dict.keys()
+    finally:
+        del ptlflow.models_dict["test_registered_model"]
+    assert ptlflow.RAFTSmall is model_ref
+
+
+def _run_script(snippet: str) -> Tuple[float, float, List[str]]:
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT_TEMPLATE.format(snippet=snippet)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    import_time, total_time, packages = output.split("\n")[-4:-1]
+    packages = packages.split(",") if len(packages) > 0 else []
+    return float(import_time), float(total_time), packages
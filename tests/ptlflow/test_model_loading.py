@@ -0,0 +1,69 @@
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from pathlib import Path
+
+import pytest
+import torch
+
+import ptlflow
+
+TEST_MODEL = "raft_small"
+
+
+def _save_checkpoint(tmp_path: Path) -> Path:
+    model = ptlflow.get_model(TEST_MODEL)
+    ckpt_path = tmp_path / f"{TEST_MODEL}.ckpt"
+    torch.save(
+        {
+            "state_dict": model.state_dict(),
+            "hyper_parameters": {"train_size": [368, 496]},
+        },
+        ckpt_path,
+    )
+    return ckpt_path
+
+
+@pytest.mark.skipif(
+    not ptlflow._is_fast_load_supported(), reason="fast_load requires torch>=2.1"
+)
+def test_fast_load(tmp_path: Path) -> None:
+    ckpt_path = _save_checkpoint(tmp_path)
+
+    model = ptlflow.get_model(TEST_MODEL, str(ckpt_path))
+    fast_model = ptlflow.get_model(TEST_MODEL, str(ckpt_path), fast_load=True)
+    assert fast_model.train_size == [368, 496]
+
+    state_dict = model.state_dict()
+    fast_state_dict = fast_model.state_dict()
+    assert state_dict.keys() == fast_state_dict.keys()
+    for k, v in state_dict.items():
+        assert not fast_state_dict[k].is_meta
+        assert torch.equal(v, fast_state_dict[k])
+    for p in fast_model.parameters():
+        assert isinstance(p, torch.nn.Parameter)
+
+    half_model = ptlflow.get_model(
+        TEST_MODEL, str(ckpt_path), fast_load=True, dtype=torch.float16
+    )
+    for p in half_model.parameters():
+        assert p.dtype == torch.float16
+
+    inputs = {"images": torch.rand(1, 2, 3, 64, 64)}
+    with torch.no_grad():
+        flows = model.eval()(inputs)["flows"]
+        fast_flows = fast_model.eval()(inputs)["flows"]
+    assert torch.allclose(flows, fast_flows)
@@ -0,0 +1,60 @@
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import pytest
+import torch
+
+from ptlflow.models.gmflow import matching as gmflow_matching
+from ptlflow.models.unimatch import matching as unimatch_matching
+from ptlflow.utils.attention import chunked_softmax_attention
+
+# The small budgets force tiles with a single query and key chunks smaller than a row
+MAX_CHUNK_ELEMENTS_LIST = [2**26, 300, 7]
+
+
+@pytest.mark.parametrize("max_chunk_elements", MAX_CHUNK_ELEMENTS_LIST)
+def test_chunked_softmax_attention(max_chunk_elements: int) -> None:
+    torch.manual_seed(0)
+    query = 4 * torch.randn(2, 50, 16)
+    key = 4 * torch.randn(2, 40, 16)
+    value = torch.randn(2, 40, 3)
+
+    scores = torch.bmm(query, key.transpose(1, 2)) / 4
+    expected = torch.bmm(torch.softmax(scores, dim=2), value)
+
+    out = chunked_softmax_attention(
+        query, key, value, max_chunk_elements=max_chunk_elements
+    )
+    assert out.shape == expected.shape
+    assert torch.allclose(out, expected, atol=1e-5)
+
+
+@pytest.mark.parametrize("matching", [gmflow_matching, unimatch_matching])
+@pytest.mark.parametrize("pred_bidir_flow", [False, True])
+def test_chunked_global_correlation_softmax(matching, pred_bidir_flow: bool) -> None:
+    torch.manual_seed(0)
+    feature0 = torch.randn(2, 8, 6, 7)
+    feature1 = torch.randn(2, 8, 6, 7)
+
+    expected = matching.global_correlation_softmax(
+        feature0, feature1, pred_bidir_flow
+    )[0]
+    for max_chunk_elements in MAX_CHUNK_ELEMENTS_LIST:
+        flow, prob = matching.global_correlation_softmax(
+            feature0, feature1, pred_bidir_flow, max_chunk_elements=max_chunk_elements
+        )
+        assert prob is None
+        assert torch.allclose(flow, expected, atol=1e-4)
@@ -0,0 +1,129 @@
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import hashlib
+from pathlib import Path
+
+import pytest
+import torch
+
+import ptlflow
+from ptlflow.utils import checkpoint_store
+from ptlflow.utils.checkpoint_store import CheckpointStore
+
+TEST_MODEL = "raft_small"
+
+
+def _write_checkpoint(source_dir: Path, name: str) -> str:
+    source_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = source_dir / "tmp.ckpt"
+    torch.save({"state_dict": {"weight": torch.rand(4)}}, tmp_path)
+    sha256 = hashlib.sha256(tmp_path.read_bytes()).hexdigest()
+    file_name = f"{name}-{sha256[:8]}.ckpt"
+    tmp_path.rename(source_dir / file_name)
+    return f"https://example.com/weights/{file_name}"
+
+
+def test_checkpoint_store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    source_dir = tmp_path / "source"
+    url = _write_checkpoint(source_dir, "model-things")
+    (source_dir / "unknown.ckpt").write_bytes(b"unknown")
+
+    store = CheckpointStore(tmp_path / "store")
+    unmatched = store.seed(
+        source_dir, {url: [("model", "things"), ("model_alias", "things")]}
+    )
+    assert unmatched == [source_dir / "unknown.ckpt"]
+    assert store.get_path("model", "sintel") is None
+
+    # The hash is not computed again while the file is unchanged
+    hashed_paths = []
+    compute_sha256 = checkpoint_store._compute_sha256
+    monkeypatch.setattr(
+        checkpoint_store,
+        "_compute_sha256",
+        lambda p: hashed_paths.append(p) or compute_sha256(p),
+    )
+    store = CheckpointStore(tmp_path / "store")
+    ckpt_path = store.get_path("model", "things")
+    assert ckpt_path == tmp_path / "store" / Path(url).name
+    assert store.get_path("model_alias", "things") == ckpt_path
+    assert store.get_path("model", "things", url) == ckpt_path
+    assert len(hashed_paths) == 0
+
+    # A checkpoint indexed from an outdated URL is treated as missing
+    new_url = "https://example.com/weights/model-things-v2-00000000.ckpt"
+    assert store.get_path("model", "things", new_url) is None
+
+    with open(ckpt_path, "ab") as f:
+        f.write(b"corrupted")
+    with pytest.raises(RuntimeError):
+        store.get_path("model", "things")
+
+    url = _write_checkpoint(source_dir, "other-things")
+    with pytest.raises(RuntimeError):
+        store.add(
+            "model",
+            "other",
+            source_dir / Path(url).name,
+            "https://example.com/weights/other-things-00000000.ckpt",
+        )
+
+
+def test_checkpoint_store_replace_existing(tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    url = _write_checkpoint(source_dir, "model-things")
+    source_path = source_dir / Path(url).name
+
+    # A stale file with the same name is already in the store
+    store_dir = tmp_path / "store"
+    store_dir.mkdir()
+    (store_dir / source_path.name).write_bytes(b"stale")
+
+    store = CheckpointStore(store_dir)
+    store.seed(source_dir, {url: [("model", "things")]})
+    ckpt_path = store.get_path("model", "things")
+    assert ckpt_path.read_bytes() == source_path.read_bytes()
+
+    # Adding the file from inside the store keeps it
+    assert store.add("model", "things", ckpt_path, url) == ckpt_path
+    assert ckpt_path.read_bytes() == source_path.read_bytes()
+
+
+def test_load_checkpoint_offline(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv(checkpoint_store.CHECKPOINT_DIR_ENV, str(tmp_path / "store"))
+
+    def _no_network(*args, **kwargs):
+        raise RuntimeError("No network access")
+
+    monkeypatch.setattr(checkpoint_store.hub, "download_url_to_file", _no_network)
+
+    source_dir = tmp_path / "source"
+    url = _write_checkpoint(source_dir, "raft_small-things")
+    CheckpointStore().seed(source_dir, {url: [(TEST_MODEL, "things")]})
+
+    model_ref = ptlflow.get_model_reference(TEST_MODEL)
+    monkeypatch.setattr(model_ref, "pretrained_checkpoints", {"things": url})
+    ckpt = ptlflow.load_checkpoint("things", model_ref, TEST_MODEL)
+    assert "weight" in ckpt["state_dict"]
+
+    # If the model declares a new URL, the stored checkpoint is not used
+    new_url = "https://example.com/weights/raft_small-things-v2-00000000.ckpt"
+    monkeypatch.setattr(model_ref, "pretrained_checkpoints", {"things": new_url})
+    with pytest.raises(RuntimeError, match="No network access"):
+        ptlflow.load_checkpoint("things", model_ref, TEST_MODEL)
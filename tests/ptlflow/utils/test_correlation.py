@@ -14,11 +14,122 @@
 # limitations under the License.
 # =============================================================================
 
+import pytest
+import torch
+
+from ptlflow.utils.correlation import (
+    DEFAULT_CORRELATION_MAX_CHUNK_ELEMENTS,
+    batched_spatial_correlation_sample,
+    batched_translated_spatial_correlation_sample,
+    iter_spatial_correlation_sample,
+    iter_translated_spatial_correlation_sample,
+)
+
+BATCHED_TEST_PARAMS = [
+    {
+        "patch_size": (1, 1),
+        "stride": (1, 1),
+        "padding": (0, 0),
+        "dilation_patch": (1, 1),
+    },
+    {
+        "patch_size": (9, 9),
+        "stride": (1, 1),
+        "padding": (0, 0),
+        "dilation_patch": (1, 1),
+    },
+    {
+        "patch_size": (4, 6),
+        "stride": (1, 1),
+        "padding": (0, 0),
+        "dilation_patch": (1, 1),
+    },
+    {
+        "patch_size": (5, 5),
+        "stride": (3, 2),
+        "padding": (0, 0),
+        "dilation_patch": (1, 1),
+    },
+    {
+        "patch_size": (7, 7),
+        "stride": (1, 1),
+        "padding": (2, 1),
+        "dilation_patch": (2, 2),
+    },
+    {
+        "patch_size": (9, 9),
+        "stride": (3, 3),
+        "padding": (5, 5),
+        "dilation_patch": (4, 3),
+    },
+]
+
+
+def test_batched_correlation() -> None:
+    i1 = torch.rand(2, 8, 23, 31)
+    i2 = torch.rand(2, 8, 23, 31)
+    for p in BATCHED_TEST_PARAMS:
+        cref = iter_spatial_correlation_sample(i1, i2, **p)
+        for max_chunk_elements in [None, 1, 20000, 40000]:
+            ctest = batched_spatial_correlation_sample(
+                i1, i2, max_chunk_elements=max_chunk_elements, **p
+            )
+            assert ctest.shape == cref.shape
+            assert torch.allclose(ctest, cref, atol=1e-5)
+
+
+def test_batched_correlation_default_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    # FlowNetC correlation at 1080p / 8, on the meta device to avoid allocating memory
+    i1 = torch.empty(1, 256, 135, 240, device="meta")
+    i2 = torch.empty(1, 256, 135, 240, device="meta")
+
+    product_sizes = []
+    mul = torch.Tensor.__mul__
+
+    def _record_mul(self, other):
+        out = mul(self, other)
+        product_sizes.append(out.numel())
+        return out
+
+    monkeypatch.setattr(torch.Tensor, "__mul__", _record_mul)
+    corr = batched_spatial_correlation_sample(i1, i2, patch_size=21)
+    assert corr.shape == (1, 21, 21, 135, 240)
+    # One row of the patch does not fit in the budget, so the rows are also split
+    assert len(product_sizes) > 21
+    assert max(product_sizes) <= DEFAULT_CORRELATION_MAX_CHUNK_ELEMENTS
+
+
+def test_batched_correlation_backward() -> None:
+    p = BATCHED_TEST_PARAMS[-2]
+    i1 = torch.rand(1, 4, 11, 13, requires_grad=True)
+    i2 = torch.rand(1, 4, 11, 13, requires_grad=True)
+    iter_spatial_correlation_sample(i1, i2, **p).sum().backward()
+    gref1, gref2 = i1.grad.clone(), i2.grad.clone()
+    i1.grad, i2.grad = None, None
+    batched_spatial_correlation_sample(
+        i1, i2, max_chunk_elements=1, **p
+    ).sum().backward()
+    assert torch.allclose(i1.grad, gref1, atol=1e-5)
+    assert torch.allclose(i2.grad, gref2, atol=1e-5)
+
+
+def test_batched_translated_correlation() -> None:
+    i1 = torch.rand(2, 8, 23, 31)
+    i2 = torch.rand(2, 8, 23, 31)
+    flow = 5 * torch.randn(2, 2, 23, 31)
+    for p in BATCHED_TEST_PARAMS:
+        p = {k: v for k, v in p.items() if k != "padding"}
+        cref = iter_translated_spatial_correlation_sample(i1, i2, flow=flow, **p)
+        for max_chunk_elements in [None, 1, 20000]:
+            ctest = batched_translated_spatial_correlation_sample(
+                i1, i2, flow=flow, max_chunk_elements=max_chunk_elements, **p
+            )
+            assert ctest.shape == cref.shape
+            assert torch.allclose(ctest, cref, atol=1e-4)
+
+
 try:
     from spatial_correlation_sampler import spatial_correlation_sample
-    import torch
-
-    from ptlflow.utils.correlation import iter_spatial_correlation_sample
 
     def test_correlation() -> None:
         i1 = torch.arange(200000).view(2, 10, 100, 100).float() / 10000
@@ -129,6 +240,36 @@ try:
             ctest = iter_spatial_correlation_sample(i1, i2, **p)
             diff = torch.abs(cref - ctest).max().item()
             assert diff < 10
+            ctest = batched_spatial_correlation_sample(i1, i2, **p)
+            diff = torch.abs(cref - ctest).max().item()
+            assert diff < 10
+
+except ModuleNotFoundError:
+    pass
+
+
+try:
+    import alt_cuda_corr
+
+    from ptlflow.models.raft.corr import AlternateCorrBlock
+    from ptlflow.utils.correlation import (
+        IterativeCorrBlock,
+        is_alt_cuda_corr_supported,
+    )
+
+    def test_alt_cuda_corr_cpu() -> None:
+        fmap1 = torch.rand(2, 16, 24, 32)
+        fmap2 = torch.rand(2, 16, 24, 32)
+        if not is_alt_cuda_corr_supported(alt_cuda_corr, fmap1):
+            return
+        coords = torch.stack(
+            torch.meshgrid(torch.arange(32), torch.arange(24), indexing="xy")
+        )[None].float()
+        coords = coords + 3 * torch.randn(2, 2, 24, 32)
+
+        cref = IterativeCorrBlock(fmap1, fmap2, radius=3, num_levels=2)(coords)
+        ctest = AlternateCorrBlock(fmap1, fmap2, radius=3, num_levels=2)(coords)
+        assert torch.allclose(ctest, cref, atol=1e-4)
 
 except ModuleNotFoundError:
     pass
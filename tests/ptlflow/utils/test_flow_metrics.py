@@ -0,0 +1,45 @@
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import torch
+
+from ptlflow.utils.flow_metrics import FlowMetrics
+
+
+def test_masked_totals() -> None:
+    torch.manual_seed(0)
+    metrics = FlowMetrics()
+    values = 10 * torch.rand(2, 5, 16, 24)
+    masks = (torch.rand(2, 3, 16, 24) > 0.5).float()
+    totals = metrics._compute_masked_totals(values, masks)
+    for m in range(masks.shape[1]):
+        for k in range(values.shape[1]):
+            ref = metrics._compute_total(values[:, k], masks[:, m])
+            assert torch.allclose(totals[m, k], ref, atol=1e-4)
+
+
+def test_flow_metrics_occlusion_keys() -> None:
+    metrics = FlowMetrics(prefix="val/")
+    flow = torch.zeros(1, 2, 8, 8)
+    occs = torch.zeros(1, 1, 8, 8)
+    occs[..., :4] = 1
+    preds = {"flows": flow + 1}
+    targets = {"flows": flow, "occs": occs}
+    metrics.update(preds, targets)
+    values = metrics.compute()
+    assert "val/epe_occ" in values and "val/outlier_non_occ" in values
+    assert abs(values["val/epe"].item() - 2**0.5) < 1e-5
+    assert abs(values["val/epe_occ"].item() - 2**0.5) < 1e-5
@@ -38,3 +38,33 @@ def test_read_write_pfm(tmp_path: Path) -> None:
     assert np.array_equal(flow, loaded_flow)
 
     shutil.rmtree(tmp_path)
+
+
+def test_read_mmap_and_many(tmp_path: Path) -> None:
+    flows = []
+    for i in range(3):
+        flow = np.random.randn(IMG_SIDE, IMG_SIDE + 3, 2).astype(np.float32)
+        flow[i, i] = np.nan
+        flows.append(flow)
+
+    for ext in ["flo", "pfm"]:
+        paths = [tmp_path / f"flow{i}.{ext}" for i in range(len(flows))]
+        for p, flow in zip(paths, flows):
+            flow_utils.flow_write(p, flow)
+
+        for p in paths:
+            ref_flow = flow_utils.flow_read(p)
+            mmap_flow = flow_utils.flow_read(p, mmap=True)
+            assert np.array_equal(ref_flow, mmap_flow, equal_nan=True)
+
+        many_flows = flow_utils.flow_read_many(paths)
+        assert many_flows.shape == (len(paths), IMG_SIDE, IMG_SIDE + 3, 2)
+        for i, p in enumerate(paths):
+            assert np.array_equal(
+                flow_utils.flow_read(p), many_flows[i], equal_nan=True
+            )
+
+        reused_flows = flow_utils.flow_read_many(paths, out=many_flows)
+        assert reused_flows is many_flows
+
+    shutil.rmtree(tmp_path)
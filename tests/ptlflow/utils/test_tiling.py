@@ -0,0 +1,72 @@
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from typing import Any, Dict
+
+import torch
+
+from ptlflow.utils.tiling import TiledInference
+
+
+class _CopyModel(object):
+    """Predict the first two channels of the first image as the flow, so the position of each tile can be checked."""
+
+    output_stride = 8
+
+    def __init__(self) -> None:
+        self.num_calls = 0
+
+    def __call__(self, inputs: Dict[str, Any]) -> Dict[str, torch.Tensor]:
+        self.num_calls += 1
+        return {"flows": inputs["images"][:, :1, :2].clone()}
+
+
+def test_tiled_inference() -> None:
+    images = torch.rand(2, 2, 3, 50, 70)
+    model = _CopyModel()
+    tiled = TiledInference(model, tile_size=(24, 32), overlap=8, max_pixels=4 * 24 * 32)
+    flows = tiled({"images": images})["flows"]
+    assert flows.shape == (2, 1, 2, 50, 70)
+    assert torch.allclose(flows, images[:, :1, :2], atol=1e-6)
+    # 3 x 3 tiles for each of the 2 pairs, forwarded 4 at a time
+    assert model.num_calls == 5
+
+
+def test_tiled_inference_guided() -> None:
+    images = torch.rand(1, 2, 3, 40, 40)
+    model = _CopyModel()
+    tiled = TiledInference(model, overlap=8, max_pixels=16 * 16, guided=True)
+    flows = tiled({"images": images})["flows"]
+    assert flows.shape == (1, 1, 2, 40, 40)
+    assert torch.isfinite(flows).all()
+
+
+def test_tiled_inference_single_tile() -> None:
+    images = torch.rand(1, 2, 3, 32, 32)
+    model = _CopyModel()
+    tiled = TiledInference(model, max_pixels=2**20)
+    flows = tiled({"images": images})["flows"]
+    assert torch.equal(flows, images[:, :1, :2])
+    assert model.num_calls == 1
+
+
+def test_tiled_inference_single_axis() -> None:
+    # The height fits in one tile, so only the tile width must be larger than the overlap
+    images = torch.rand(1, 2, 3, 48, 200)
+    model = _CopyModel()
+    tiled = TiledInference(model, tile_size=(64, 96), overlap=64)
+    flows = tiled({"images": images})["flows"]
+    assert torch.allclose(flows, images[:, :1, :2], atol=1e-6)
@@ -0,0 +1,107 @@
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import torch
+import torch.nn.functional as F
+
+from ptlflow.utils.utils import (
+    EarlyExitMonitor,
+    FeatureCache,
+    LRUCache,
+    forward_interpolate_batch,
+)
+
+
+def test_forward_interpolate_torch() -> None:
+    torch.manual_seed(0)
+    flow = 10 * torch.randn(2, 2, 8, 12)
+    flow = F.interpolate(flow, size=(55, 128), mode="bilinear", align_corners=True)
+
+    ref = forward_interpolate_batch(flow, method="griddata")
+    test = forward_interpolate_batch(flow, method="torch")
+    assert ref.shape == test.shape
+    assert test.dtype == flow.dtype
+
+    diff = torch.abs(ref - test).sum(1)
+    assert (diff < 1e-3).float().mean().item() > 0.95
+    assert diff.mean().item() < 0.1
+
+
+def test_forward_interpolate_torch_translation() -> None:
+    flow = torch.zeros(1, 2, 16, 24)
+    flow[:, 0] = 2
+    flow[:, 1] = 1
+    ref = forward_interpolate_batch(flow, method="griddata")
+    test = forward_interpolate_batch(flow, method="torch")
+    assert torch.allclose(ref, test)
+
+
+def test_lru_cache() -> None:
+    cache = LRUCache(max_size=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+    cache["c"] = 3
+    assert len(cache) == 2
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.get("b", -1) == -1
+
+
+def test_feature_cache() -> None:
+    cache = FeatureCache()
+    img1, img2, img3 = torch.rand(3, 1, 3, 8, 8)
+    assert cache.get(img1) is None
+    cache.update(img2, "feats2")
+    assert cache.get(img2.clone()) == "feats2"
+    assert cache.get(img3) is None
+
+    meta = {"is_seq_start": torch.tensor([True])}
+    assert cache.get(img2, {"meta": meta}) is None
+
+    meta = {"image_paths": [["a.png"], ["b.png"]], "is_seq_start": [False]}
+    cache.update(img2, "feats_b", {"meta": meta})
+    meta = {"image_paths": [["b.png"], ["c.png"]], "is_seq_start": [False]}
+    assert cache.get(img3, {"meta": meta}) == "feats_b"
+    meta = {"image_paths": [["c.png"], ["d.png"]], "is_seq_start": [False]}
+    assert cache.get(img2, {"meta": meta}) is None
+
+
+def test_early_exit_monitor() -> None:
+    monitor = EarlyExitMonitor(threshold=0.1, min_iters=2)
+    # The first sample converges at the second iteration, the second one never does
+    updates = [
+        torch.tensor([0.05, 1.0]),
+        torch.tensor([0.05, 1.0]),
+        torch.tensor([1.0, 1.0]),
+    ]
+    applied = []
+    for u in updates:
+        delta_flow = u.view(2, 1, 1, 1).expand(2, 2, 3, 4) / (2**0.5)
+        applied.append(monitor.step(delta_flow))
+        assert not monitor.all_converged
+
+    assert monitor.iters.tolist() == [2, 3]
+    assert (applied[2][0] == 0).all()
+    assert (applied[2][1] != 0).all()
+
+    monitor.reset()
+    monitor.step(torch.zeros(2, 2, 3, 4))
+    assert not monitor.all_converged
+    monitor.step(torch.zeros(2, 2, 3, 4))
+    assert monitor.all_converged
+    assert monitor.iters.tolist() == [4, 5]
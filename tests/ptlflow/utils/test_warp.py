@@ -0,0 +1,80 @@
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import math
+
+import torch
+
+from ptlflow.utils.warp import fwarp, splat
+
+
+def _fwarp_reference(img: torch.Tensor, flo: torch.Tensor) -> torch.Tensor:
+    N, C, H, W = img.shape
+    imgw = torch.zeros_like(img)
+    for n in range(N):
+        for i in range(H):
+            for j in range(W):
+                x = j + flo[n, 0, i, j].item()
+                y = i + flo[n, 1, i, j].item()
+                for yy in [math.floor(y), math.floor(y) + 1]:
+                    for xx in [math.floor(x), math.floor(x) + 1]:
+                        if 0 <= xx < W and 0 <= yy < H:
+                            w = math.exp(-((x - xx) ** 2 + (y - yy) ** 2))
+                            imgw[n, :, yy, xx] += w * img[n, :, i, j]
+    return imgw
+
+
+def test_fwarp() -> None:
+    torch.manual_seed(0)
+    img = torch.rand(2, 3, 7, 9)
+    flo = 3 * torch.randn(2, 2, 7, 9)
+    imgw, weights = fwarp(img, flo)
+    assert imgw.shape == img.shape
+    assert weights.shape == img.shape
+    assert torch.allclose(imgw, _fwarp_reference(img, flo), atol=1e-5)
+    assert torch.allclose(
+        weights, _fwarp_reference(torch.ones_like(img), flo), atol=1e-5
+    )
+
+
+def test_fwarp_bilinear_translation() -> None:
+    img = torch.rand(1, 3, 8, 8)
+    flo = torch.zeros(1, 2, 8, 8)
+    flo[:, 0] = 2
+    flo[:, 1] = 1
+    imgw, weights = fwarp(img, flo, splat_mode="bilinear")
+    assert torch.allclose(imgw[:, :, 1:, 2:], img[:, :, :-1, :-2])
+    assert (weights[:, :, 1:, 2:] == 1).all()
+    assert (weights[:, :, :1] == 0).all()
+
+
+def test_splat_bilinear_gradients() -> None:
+    torch.manual_seed(0)
+    src = torch.rand(1, 2, 5, 6, dtype=torch.float64, requires_grad=True)
+    flo = (2 * torch.rand(1, 2, 5, 6, dtype=torch.float64) - 1).requires_grad_()
+    assert torch.autograd.gradcheck(
+        lambda s, f: splat(s, f, splat_mode="bilinear"), (src, flo)
+    )
+
+
+def test_splat_fp16_accumulation() -> None:
+    # All the pixels land on the top-left corner, a sum which float16 cannot accumulate exactly
+    src = torch.ones(1, 1, 64, 64, dtype=torch.float16)
+    base_y, base_x = torch.meshgrid(torch.arange(64), torch.arange(64), indexing="ij")
+    flo = -torch.stack([base_x, base_y])[None].half()
+    out = splat(src, flo, splat_mode="bilinear")
+    assert out.dtype == torch.float16
+    assert out[0, 0, 0, 0].item() == 64 * 64
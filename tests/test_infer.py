@@ -16,12 +16,15 @@
 
 from pathlib import Path
 import shutil
+import threading
 
 import cv2 as cv
 import numpy as np
+import pytest
 
 import infer
 import ptlflow
+from ptlflow.utils import flow_utils
 
 TEST_MODEL = "raft_small"
 
@@ -52,10 +55,91 @@ def test_infer(tmp_path: Path) -> None:
     assert (tmp_path / "flows/test_infer0/img1.png").exists()
     assert (tmp_path / "flows_viz/test_infer0/img1.png").exists()
 
+    args.pipeline = True
+    args.output_path = tmp_path / "pipeline"
+    infer.infer(args, model)
+    assert (tmp_path / "pipeline/flows/test_infer0/img1.png").exists()
+    assert (tmp_path / "pipeline/flows_viz/test_infer0/img1.png").exists()
+
+    shutil.rmtree(tmp_path)
+
+
+def test_infer_batch(tmp_path: Path) -> None:
+    num_images = 4
+    input_dir = tmp_path / "inputs"
+    input_dir.mkdir()
+    _create_images(input_dir, num_images)
+
+    parser = infer._init_parser()
+
+    model_ref = ptlflow.get_model_reference(TEST_MODEL)
+    parser = model_ref.add_model_specific_args(parser)
+
+    args = parser.parse_args([TEST_MODEL, "--input_path", str(input_dir)])
+    args.write_outputs = True
+    model = ptlflow.get_model(TEST_MODEL, None, args)
+
+    # The flows of each pair must be the same with and without batching
+    for batch_size in [1, 2]:
+        args.batch_size = batch_size
+        args.output_path = tmp_path / f"outputs_bs{batch_size}"
+        infer.infer(args, model)
+
+    for i in range(num_images - 1):
+        flow_name = f"flows/inputs/img{i+1}.flo"
+        ref_flow = flow_utils.flow_read(tmp_path / "outputs_bs1" / flow_name)
+        batch_flow = flow_utils.flow_read(tmp_path / "outputs_bs2" / flow_name)
+        assert np.allclose(batch_flow, ref_flow, atol=1e-3)
+
+    shutil.rmtree(tmp_path)
+
+
+def test_infer_pipeline(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    num_images = 8
+    # Keep the outputs outside of the inputs, so the second run does not read them
+    input_dir = tmp_path / "inputs"
+    input_dir.mkdir()
+    _create_images(input_dir, num_images)
+
+    parser = infer._init_parser()
+
+    model_ref = ptlflow.get_model_reference(TEST_MODEL)
+    parser = model_ref.add_model_specific_args(parser)
+
+    # The prefetch queue is smaller than the number of frames, so the decoder must wait
+    args = parser.parse_args(
+        [
+            TEST_MODEL,
+            "--input_path",
+            str(input_dir),
+            "--pipeline",
+            "--prefetch_size",
+            "2",
+            "--num_writers",
+            "1",
+        ]
+    )
+    args.write_outputs = True
+    args.output_path = tmp_path / "outputs"
+
+    model = ptlflow.get_model(TEST_MODEL, None, args)
+    infer.infer(args, model)
+    for i in range(num_images - 1):
+        assert (tmp_path / f"outputs/flows/inputs/img{i+1}.flo").exists()
+
+    # A failure in the write stage stops the decoder
+    def _failing_write(*write_args, **write_kwargs):
+        raise RuntimeError("Write failed")
+
+    monkeypatch.setattr(infer, "write_outputs", _failing_write)
+    with pytest.raises(RuntimeError, match="Write failed"):
+        infer.infer(args, model)
+    assert "infer-decode" not in [t.name for t in threading.enumerate()]
+
     shutil.rmtree(tmp_path)
 
 
-def _create_images(tmp_path: Path) -> None:
-    for i in range(2):
+def _create_images(tmp_path: Path, num_images: int = 2) -> None:
+    for i in range(num_images):
         img = np.random.randint(0, 255, (400, 400, 3), np.uint8)
         cv.imwrite(str(tmp_path / f"img{i+1}.png"), img)
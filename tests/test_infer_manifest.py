@@ -0,0 +1,64 @@
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from pathlib import Path
+import shutil
+from typing import List
+
+import cv2 as cv
+import numpy as np
+
+import infer_manifest
+
+TEST_MODEL = "raft_small"
+
+
+def test_infer_manifest(tmp_path: Path) -> None:
+    clip_paths = _create_clips(tmp_path)
+    output_path = tmp_path / "outputs"
+
+    manifest = {
+        "output_path": str(output_path),
+        "args": ["--write_outputs", "--flow_format", "flo"],
+        "input_paths": clip_paths,
+        "runs": [{"model": TEST_MODEL}],
+    }
+    infer_manifest.run_manifest(manifest)
+    for i in range(2):
+        assert (output_path / TEST_MODEL / f"flows/clip{i}/img0.flo").exists()
+
+    progress_path = output_path / infer_manifest.PROGRESS_FILE_NAME
+    with open(progress_path, "r") as f:
+        assert len(f.readlines()) == 2
+
+    # All the runs were completed, so nothing should be executed again
+    shutil.rmtree(output_path / TEST_MODEL)
+    infer_manifest.run_manifest(manifest)
+    assert not (output_path / TEST_MODEL).exists()
+
+    shutil.rmtree(tmp_path)
+
+
+def _create_clips(tmp_path: Path) -> List[str]:
+    clip_paths = []
+    for i in range(2):
+        clip_dir = tmp_path / f"clip{i}"
+        clip_dir.mkdir(parents=True)
+        for j in range(2):
+            img = np.random.randint(0, 255, (64, 64, 3), np.uint8)
+            cv.imwrite(str(clip_dir / f"img{j}.png"), img)
+        clip_paths.append(str(clip_dir))
+    return clip_paths
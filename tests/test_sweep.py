@@ -0,0 +1,87 @@
+# =============================================================================
+# Copyright 2021 Henrique Morimitsu
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sweep
+
+TEST_MODEL = "raft_small"
+
+
+def test_sweep_resume(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    parser = sweep._init_parser()
+    args, task_args = parser.parse_known_args(
+        [
+            "benchmark",
+            "select",
+            "--selection",
+            TEST_MODEL,
+            "--input_size",
+            "64",
+            "64",
+            "--num_samples",
+            "1",
+            "--output_path",
+            str(tmp_path),
+        ]
+    )
+    assert task_args[0] == "--input_size"
+
+    # Simulate a previous run which was interrupted after the first cell
+    task_namespace = sweep._parse_task_args(args, task_args)
+    cells = sweep._get_cells(args, task_namespace)
+    assert cells == [{"model": TEST_MODEL, "input_size": [64, 64]}]
+    row = {"Model": TEST_MODEL, "Params": np.float64(1.0), "InputH": np.int64(64)}
+    sweep._write_result(tmp_path / sweep.RESULTS_DIR_NAME, cells[0], [row])
+
+    def _no_workers(*args, **kwargs):
+        raise RuntimeError("All the cells should already be completed")
+
+    monkeypatch.setattr(sweep, "_run_workers", _no_workers)
+    df = sweep.sweep(args, task_args)
+    assert df.loc[0, "Model"] == TEST_MODEL
+    assert df.loc[0, "InputH"] == 64
+    saved_df = pd.read_csv(tmp_path / "model_benchmark-select.csv")
+    assert list(saved_df.columns) == list(df.columns)
+
+
+def test_merge_validate_results(tmp_path: Path) -> None:
+    cells = [
+        {"model": TEST_MODEL, "checkpoint": "things", "dataset": "sintel-clean"},
+        {"model": TEST_MODEL, "checkpoint": "things", "dataset": "kitti-2015"},
+        {"model": TEST_MODEL, "checkpoint": "sintel", "dataset": "sintel-clean"},
+    ]
+    for cell, epe in zip(cells[:2], [1.0, 2.0]):
+        row = {
+            "model": cell["model"],
+            "checkpoint": cell["checkpoint"],
+            f"{cell['dataset']}-epe": epe,
+        }
+        sweep._write_result(tmp_path, cell, [row])
+
+    df = sweep.merge_results("validate", cells, tmp_path, None)
+    assert list(df.columns) == [
+        "model",
+        "checkpoint",
+        "sintel-clean-epe",
+        "kitti-2015-epe",
+    ]
+    assert df.shape[0] == 1
+    assert df.loc[0, "kitti-2015-epe"] == 2.0
@@ -17,6 +17,9 @@
 from pathlib import Path
 import shutil
 
+import numpy as np
+import pandas as pd
+
 import ptlflow
 import validate
 from ptlflow.utils.dummy_datasets import write_kitti, write_sintel
@@ -63,3 +66,48 @@ def test_validate(tmp_path: Path) -> None:
         assert (tmp_path / dname / "flows" / (dpath + ".png")).exists()
 
     shutil.rmtree(tmp_path)
+
+
+def test_validate_batched(tmp_path: Path) -> None:
+    parser = validate._init_parser()
+
+    model_ref = ptlflow.get_model_reference(TEST_MODEL)
+    parser = model_ref.add_model_specific_args(parser)
+
+    args = parser.parse_args([TEST_MODEL, "--val_dataset", "sintel-clean"])
+
+    args.write_individual_metrics = True
+    args.mpi_sintel_root_dir = tmp_path / "MPI-Sintel"
+
+    write_sintel(tmp_path)
+    # Add a second sample, so that the inputs can be batched
+    sintel_dir = tmp_path / "MPI-Sintel" / "training"
+    for src, dst in [
+        ("clean/sequence_1/frame_0002.png", "clean/sequence_1/frame_0003.png"),
+        ("final/sequence_1/frame_0002.png", "final/sequence_1/frame_0003.png"),
+        ("flow/sequence_1/frame_0001.flo", "flow/sequence_1/frame_0002.flo"),
+        (
+            "occlusions/sequence_1/frame_0001.png",
+            "occlusions/sequence_1/frame_0002.png",
+        ),
+    ]:
+        shutil.copy(sintel_dir / src, sintel_dir / dst)
+
+    model = ptlflow.get_model(TEST_MODEL, None, args)
+    results = []
+    for batch_size in [1, 2]:
+        args.val_batch_size = batch_size
+        args.output_path = tmp_path / f"batch{batch_size}"
+        metrics_df = validate.validate(args, model)
+        individual_df = pd.read_csv(args.output_path / "sintel-clean_epe_outlier.csv")
+        results.append((metrics_df, individual_df))
+
+    assert list(results[0][1]["filename"]) == list(results[1][1]["filename"])
+    assert np.allclose(results[0][1]["epe"], results[1][1]["epe"], atol=1e-3)
+    assert np.allclose(
+        results[0][0]["sintel-clean-val/epe"],
+        results[1][0]["sintel-clean-val/epe"],
+        atol=1e-2,
+    )
+
+    shutil.rmtree(tmp_path)
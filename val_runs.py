@@ -53,7 +53,7 @@ models = [
     'videoflow_bof',
     #'memflow_t',
     #'memflow',
-    "splatflow",    # this one requires cupy. okay.
+    "splatflow",
     ### LIGHTWEIGHT
     #"rapidflow",
     #"neuflow",
@@ -18,6 +18,7 @@
 
 import logging
 import sys
+import time
 from argparse import ArgumentParser, Namespace
 from pathlib import Path
 from typing import Any, Dict, List, Optional
@@ -34,7 +35,9 @@ from ptlflow import get_model, get_model_reference
 from ptlflow.models.base_model.base_model import BaseModel
 from ptlflow.utils import flow_utils
 from ptlflow.utils.io_adapter import IOAdapter
+from ptlflow.utils.tiling import add_tiling_args_to_parser, get_tiled_inference
 from ptlflow.utils.utils import (
+    LRUCache,
     add_datasets_to_parser,
     config_logging,
     get_list_of_available_models_list,
@@ -151,11 +154,30 @@ def _init_parser() -> ArgumentParser:
             "Used only when the model predicts outputs for more than one frame. Select which predictions will be used for evaluation."
         ),
     )
+    parser.add_argument(
+        "--metrics_sync_interval",
+        type=int,
+        default=10,
+        help=(
+            "The metrics are accumulated on the device and only read back to update the progress bar every this "
+            "number of batches. Use 0 to read them only at the end of each dataloader."
+        ),
+    )
     parser.add_argument(
         "--write_individual_metrics",
         action="store_true",
         help="If set, save a table of metrics for every image.",
     )
+    parser.add_argument(
+        "--report_latency",
+        action="store_true",
+        help=(
+            "If set, the forward time of the model is measured for every batch and reported as the time_ms metric. "
+            "This synchronizes the GPU after every batch. Together with the iters metric reported by the models that "
+            "support --early_exit_threshold, it can be used to compare the accuracy and latency of different thresholds."
+        ),
+    )
+    parser = add_tiling_args_to_parser(parser)
     return parser
 
 
@@ -200,7 +222,9 @@ def generate_outputs(
         _write_to_file(args, preds, dataloader_name, batch_idx, metadata)
 
 
-def validate(args: Namespace, model: BaseModel) -> pd.DataFrame:
+def validate(
+    args: Namespace, model: BaseModel, metrics_file_name: str = "metrics.csv"
+) -> pd.DataFrame:
     """Perform the validation.
 
     Parameters
@@ -209,6 +233,8 @@ def validate(args: Namespace, model: BaseModel) -> pd.DataFrame:
         Arguments to configure the model and the validation.
     model : BaseModel
         The model to be used for validation.
+    metrics_file_name : str, default "metrics.csv"
+        Name of the file inside args.output_path where the metrics are saved.
 
     Returns
     -------
@@ -225,6 +251,12 @@ def validate(args: Namespace, model: BaseModel) -> pd.DataFrame:
         if args.fp16:
             model = model.half()
 
+    if args.warm_start and model.args.val_batch_size > 1:
+        logging.warning(
+            "--warm_start requires the inputs to be processed one by one. --val_batch_size will be set to 1."
+        )
+        model.args.val_batch_size = 1
+
     dataloaders = model.val_dataloader()
     dataloaders = {
         model.val_dataloader_names[i]: dataloaders[i] for i in range(len(dataloaders))
@@ -240,7 +272,7 @@ def validate(args: Namespace, model: BaseModel) -> pd.DataFrame:
             metrics_mean.values()
         )
         args.output_path.mkdir(parents=True, exist_ok=True)
-        metrics_df.T.to_csv(args.output_path / "metrics.csv", header=False)
+        metrics_df.T.to_csv(args.output_path / metrics_file_name, header=False)
     metrics_df = metrics_df.round(3)
     return metrics_df
 
@@ -333,6 +365,12 @@ def validate_one_dataloader(
     if args.write_individual_metrics:
         metrics_individual = {"filename": [], "epe": [], "outlier": []}
 
+    # The adapters only depend on the input size, and most datasets contain only a few different sizes
+    io_adapters = LRUCache(max_size=8)
+
+    tiled_inference = get_tiled_inference(model, args)
+
+    num_samples = 0
     with tqdm(dataloader) as tdl:
         prev_preds = None
         for i, inputs in enumerate(tdl):
@@ -345,17 +383,36 @@ def validate_one_dataloader(
                     else float(args.max_forward_side) / min(inputs["images"].shape[-2:])
                 )
 
-            io_adapter = IOAdapter(
-                model,
-                inputs["images"].shape[-2:],
-                target_scale_factor=scale_factor,
-                cuda=torch.cuda.is_available(),
-                fp16=args.fp16,
-            )
+            adapter_key = (tuple(inputs["images"].shape[-2:]), scale_factor)
+            io_adapter = io_adapters.get(adapter_key)
+            if io_adapter is None:
+                io_adapter = IOAdapter(
+                    model,
+                    inputs["images"].shape[-2:],
+                    target_scale_factor=scale_factor,
+                    cuda=torch.cuda.is_available(),
+                    fp16=args.fp16,
+                )
+                io_adapters[adapter_key] = io_adapter
             inputs = io_adapter.prepare_inputs(inputs=inputs, image_only=True)
             inputs["prev_preds"] = prev_preds
 
-            preds = model(inputs)
+            if args.report_latency:
+                if torch.cuda.is_available():
+                    torch.cuda.synchronize()
+                start_time = time.perf_counter()
+            if tiled_inference is not None:
+                preds = tiled_inference(inputs)
+            else:
+                preds = model(inputs)
+            if args.report_latency:
+                if torch.cuda.is_available():
+                    torch.cuda.synchronize()
+                latency_ms = 1000 * (time.perf_counter() - start_time)
+
+            # Number of refinement iterations of each sample, reported by the models with early exit.
+            # It is removed from preds because it does not have the shape of the other predictions.
+            iters = preds.pop("iters", None)
 
             if args.warm_start:
                 if (
@@ -372,57 +429,101 @@ def validate_one_dataloader(
             inputs = io_adapter.unscale(inputs, image_only=True)
             preds = io_adapter.unscale(preds)
 
-            if inputs["flows"].shape[1] > 1 and args.seq_val_mode != "all":
-                if args.seq_val_mode == "first":
-                    k = 0
-                elif args.seq_val_mode == "middle":
-                    k = inputs["images"].shape[1] // 2
-                elif args.seq_val_mode == "last":
-                    k = inputs["flows"].shape[1] - 1
-                for key, val in inputs.items():
-                    if key == "meta":
-                        inputs["meta"]["image_paths"] = inputs["meta"]["image_paths"][
-                            k : k + 1
-                        ]
-                    elif key == "images":
-                        inputs[key] = val[:, k : k + 2]
-                    elif isinstance(val, torch.Tensor) and len(val.shape) == 5:
-                        inputs[key] = val[:, k : k + 1]
-
-            metrics = model.val_metrics(preds, inputs)
-
-            for k in metrics.keys():
-                if metrics_sum.get(k) is None:
-                    metrics_sum[k] = 0.0
-                metrics_sum[k] += metrics[k].item()
-            tdl.set_postfix(
-                epe=metrics_sum["val/epe"] / (i + 1),
-                outlier=metrics_sum["val/outlier"] / (i + 1),
-            )
-
-            filename = ""
-            if "sintel" in inputs["meta"]["dataset_name"][0].lower():
-                filename = f'{Path(inputs["meta"]["image_paths"][0][0]).parent.name}/'
-            elif "spring" in inputs["meta"]["dataset_name"][0].lower():
-                filename = (
-                    f'{Path(inputs["meta"]["image_paths"][0][0]).parent.parent.name}/'
-                )
-            filename += Path(inputs["meta"]["image_paths"][0][0]).stem
+            # The metrics and outputs are computed for each sample of the batch, as when the batch size is 1
+            batch_size = inputs["images"].shape[0]
+            for b in range(batch_size):
+                if batch_size > 1:
+                    sample_inputs = _select_sample(inputs, b)
+                    sample_preds = _select_sample(preds, b)
+                else:
+                    sample_inputs = inputs
+                    sample_preds = preds
 
-            if metrics_individual is not None:
-                metrics_individual["filename"].append(filename)
-                metrics_individual["epe"].append(metrics["val/epe"].item())
-                metrics_individual["outlier"].append(metrics["val/outlier"].item())
+                if (
+                    sample_inputs["flows"].shape[1] > 1
+                    and args.seq_val_mode != "all"
+                ):
+                    if args.seq_val_mode == "first":
+                        k = 0
+                    elif args.seq_val_mode == "middle":
+                        k = sample_inputs["images"].shape[1] // 2
+                    elif args.seq_val_mode == "last":
+                        k = sample_inputs["flows"].shape[1] - 1
+                    for key, val in sample_inputs.items():
+                        if key == "meta":
+                            sample_inputs["meta"]["image_paths"] = sample_inputs[
+                                "meta"
+                            ]["image_paths"][k : k + 1]
+                        elif key == "images":
+                            sample_inputs[key] = val[:, k : k + 2]
+                        elif isinstance(val, torch.Tensor) and len(val.shape) == 5:
+                            sample_inputs[key] = val[:, k : k + 1]
+
+                metrics = model.val_metrics(sample_preds, sample_inputs)
+                if iters is not None:
+                    metrics["iters"] = iters[b].float().mean()
+                if args.report_latency:
+                    metrics["time_ms"] = torch.tensor(latency_ms / batch_size)
+
+                # The sums are kept on the device and only read back every metrics_sync_interval batches,
+                # to avoid synchronizing the GPU after every sample
+                for k in metrics.keys():
+                    if metrics_sum.get(k) is None:
+                        metrics_sum[k] = 0.0
+                    metrics_sum[k] = metrics_sum[k] + metrics[k].detach()
+                num_samples += 1
+
+                meta = sample_inputs["meta"]
+                filename = ""
+                if "sintel" in meta["dataset_name"][0].lower():
+                    filename = f'{Path(meta["image_paths"][0][0]).parent.name}/'
+                elif "spring" in meta["dataset_name"][0].lower():
+                    filename = f'{Path(meta["image_paths"][0][0]).parent.parent.name}/'
+                filename += Path(meta["image_paths"][0][0]).stem
+
+                if metrics_individual is not None:
+                    metrics_individual["filename"].append(filename)
+                    metrics_individual["epe"].append(metrics["val/epe"].detach())
+                    metrics_individual["outlier"].append(
+                        metrics["val/outlier"].detach()
+                    )
+
+                if args.show or args.write_outputs:
+                    generate_outputs(
+                        args,
+                        sample_inputs,
+                        sample_preds,
+                        dataloader_name,
+                        num_samples - 1,
+                        sample_inputs.get("meta"),
+                    )
+
+                if args.max_samples is not None and num_samples >= args.max_samples:
+                    break
 
-            generate_outputs(
-                args, inputs, preds, dataloader_name, i, inputs.get("meta")
-            )
+            if (
+                args.metrics_sync_interval > 0
+                and (i + 1) % args.metrics_sync_interval == 0
+            ):
+                tdl.set_postfix(
+                    epe=metrics_sum["val/epe"].item() / num_samples,
+                    outlier=metrics_sum["val/outlier"].item() / num_samples,
+                )
 
-            if args.max_samples is not None and i >= (args.max_samples - 1):
+            if args.max_samples is not None and num_samples >= args.max_samples:
                 break
 
     if args.write_individual_metrics:
+        for k in ("epe", "outlier"):
+            if len(metrics_individual[k]) > 0:
+                metrics_individual[k] = (
+                    torch.stack(metrics_individual[k]).cpu().tolist()
+                )
         ind_df = pd.DataFrame(metrics_individual)
+        # Batches group the samples by image size, so restore the order of the dataset
+        sample_order = [idx for batch in dataloader.batch_sampler for idx in batch]
+        ind_df.index = sample_order[: len(ind_df)]
+        ind_df = ind_df.sort_index()
         args.output_path.mkdir(parents=True, exist_ok=True)
         ind_df.to_csv(
             Path(args.output_path) / f"{dataloader_name}_epe_outlier.csv", index=None
@@ -430,10 +531,26 @@ def validate_one_dataloader(
 
     metrics_mean = {}
     for k, v in metrics_sum.items():
-        metrics_mean[k] = v / len(dataloader)
+        metrics_mean[k] = float(v) / num_samples
     return metrics_mean
 
 
+def _select_sample(data: Any, b: int) -> Any:
+    # Extract the b-th sample of a batch, keeping the batch dimension of the tensors and the structure
+    # that the default collate function gives to the metadata (lists of values along the batch)
+    if isinstance(data, torch.Tensor):
+        return data[b : b + 1]
+    elif isinstance(data, dict):
+        return {k: _select_sample(v, b) for k, v in data.items()}
+    elif isinstance(data, (list, tuple)):
+        if len(data) > 0 and all(
+            [isinstance(v, (list, tuple, torch.Tensor, dict)) for v in data]
+        ):
+            return [_select_sample(v, b) for v in data]
+        return [data[b]]
+    return data
+
+
 def _get_model_names(args: Namespace) -> List[str]:
     if args.model == "all":
         model_names = ptlflow.models_dict.keys()
@@ -1,5 +1,9 @@
 import os
 
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "1")
+
+from infer_manifest import run_manifest  # noqa: E402
+
 # all 15 test clips
 test_clips = [
     "/home/taewoosuh/ptlflow/datasets_realvideo/XVFI/Longer_testset/Type1/TEST01_003_f0433",
@@ -48,10 +52,16 @@ checkpoints = [
 OUT_DIR = "/results/XVFI_runs_auto"
 
 # start iterating
-for idx_model, model in enumerate(models):
-    for checkpoint in checkpoints[idx_model]:
-        for test_clip in test_clips:
-            command = f"CUDA_VISIBLE_DEVICES=1 python infer_warpvis.py {model} --input_path {test_clip}  \
-                --write_outputs --output_path {OUT_DIR} --flow_format flo --pretrained_ckpt {checkpoint}"
-            #print(command)
-            os.system(command)
\ No newline at end of file
+# All the clips of one model/checkpoint are processed in a single process, so each model is only loaded once.
+# Completed clips are recorded in OUT_DIR, so running this script again resumes an interrupted sweep.
+manifest = {
+    "script": "infer_warpvis",
+    "output_path": OUT_DIR,
+    "args": ["--write_outputs", "--flow_format", "flo"],
+    "input_paths": test_clips,
+    "runs": [
+        {"model": model, "checkpoints": checkpoints[idx_model]}
+        for idx_model, model in enumerate(models)
+    ],
+}
+run_manifest(manifest)